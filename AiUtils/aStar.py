@@ -1,65 +1,142 @@
 import heapq
 import math
-import time
+import numpy as np
 from collections import OrderedDict
 from Controller.utils import get_snapped_angle, get_angle
+from AiUtils.path_smoothing import line_of_sight, smooth_path
 
-# Cache LRU pour les chemins A*
-_path_cache = OrderedDict()
 MAX_PATH_CACHE_SIZE = 500
-PATH_CACHE_TTL = 2.0  # Durée de vie du cache en secondes
+# Côté (en tuiles) des régions dont les obstacles sont versionnés par PathCache
+PATH_CACHE_REGION_SIZE = 16
+
+class PathCache:
+    """
+    Cache LRU des chemins a_star d'une GameMap.
+
+    La carte est découpée en régions carrées portant chacune un numéro de
+    version (epoch), incrémenté quand un obstacle y apparaît ou disparaît
+    (GameMap._walkability_changed). Une entrée retient l'epoch des régions
+    que son chemin traverse et n'est servie que si aucune n'a changé : pas
+    d'expiration sur l'horloge, et un chemin barré n'est jamais resservi.
+    """
+
+    def __init__(self, width, height, max_size=MAX_PATH_CACHE_SIZE, region_size=PATH_CACHE_REGION_SIZE):
+        self.max_size = max_size
+        self.region_size = region_size
+        self.regions_x = max(width, 0) // region_size + 1
+        self.regions_y = max(height, 0) // region_size + 1
+        self.epochs = [0] * (self.regions_x * self.regions_y)
+        self.entries = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'stale': 0, 'evictions': 0}
+
+    def _region(self, x, y):
+        size = self.region_size
+        rx = min(max(x // size, 0), self.regions_x - 1)
+        ry = min(max(y // size, 0), self.regions_y - 1)
+        return rx * self.regions_y + ry
+
+    def get(self, start, goal):
+        """Copie du chemin en cache entre start et goal, ou None."""
+        key = get_path_cache_key(start, goal)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+        path, dependencies = entry
+        epochs = self.epochs
+        for region, epoch in dependencies:
+            if epochs[region] != epoch:
+                del self.entries[key]
+                self.stats['stale'] += 1
+                self.stats['misses'] += 1
+                return None
+        self.entries.move_to_end(key)
+        self.stats['hits'] += 1
+        # Retourner une copie du chemin (pour éviter les modifications)
+        return list(path)
+
+    def put(self, start, goal, path):
+        """Met en cache un chemin non vide avec l'epoch des régions qu'il traverse."""
+        if not path:
+            return
+        # Les chemins lissés sautent des cases : relever les régions tout le long des segments
+        points = [start] + path
+        regions = set()
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            steps = max(1, math.ceil(max(abs(x1 - x0), abs(y1 - y0))))
+            for k in range(steps + 1):
+                regions.add(self._region(round(x0 + (x1 - x0) * k / steps), round(y0 + (y1 - y0) * k / steps)))
+        epochs = self.epochs
+        key = get_path_cache_key(start, goal)
+        self.entries[key] = (list(path), tuple((region, epochs[region]) for region in regions))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def invalidate_tiles(self, tiles):
+        """
+        Incrémente l'epoch des régions touchées par ces tuiles ou leurs voisines
+        (une case bloquée interdit aussi les diagonales qui la longent).
+        """
+        touched = set()
+        for x, y in tiles:
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    touched.add(self._region(x + dx, y + dy))
+        epochs = self.epochs
+        for region in touched:
+            epochs[region] += 1
+
+    def clear(self):
+        """Vide complètement le cache des chemins."""
+        self.entries.clear()
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['size'] = len(self.entries)
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
 
 def get_path_cache_key(start, goal):
     """Génère une clé de cache pour un chemin."""
     return (round(start[0]), round(start[1]), round(goal[0]), round(goal[1]))
 
-def get_cached_path(start, goal):
-    """Récupère un chemin depuis le cache s'il existe et est valide."""
-    key = get_path_cache_key(start, goal)
-    if key in _path_cache:
-        cached_path, timestamp = _path_cache[key]
-        if time.time() - timestamp < PATH_CACHE_TTL:
-            _path_cache.move_to_end(key)
-            # Retourner une copie du chemin (pour éviter les modifications)
-            return list(cached_path)
-        else:
-            # Cache expiré
-            del _path_cache[key]
-    return None
 
-def cache_path(start, goal, path):
-    """Met en cache un chemin."""
-    if not path:
-        return
-    
-    key = get_path_cache_key(start, goal)
-    _path_cache[key] = (list(path), time.time())
-    _path_cache.move_to_end(key)
-    
-    # Nettoyer le cache si trop grand
-    while len(_path_cache) > MAX_PATH_CACHE_SIZE:
-        _path_cache.popitem(last=False)
-
-def invalidate_path_cache_near(x, y, radius=5):
-    """Invalide les chemins qui passent près d'une position (quand un obstacle change)."""
-    keys_to_remove = []
-    for key in _path_cache:
-        start_x, start_y, goal_x, goal_y = key
-        # Si le départ ou l'arrivée est proche de la position modifiée
-        if (abs(start_x - x) <= radius and abs(start_y - y) <= radius) or \
-           (abs(goal_x - x) <= radius and abs(goal_y - y) <= radius):
-            keys_to_remove.append(key)
-    
-    for key in keys_to_remove:
-        del _path_cache[key]
-
-def clear_path_cache():
-    """Vide complètement le cache des chemins."""
-    _path_cache.clear()
+# Coûts entiers (orthogonal 10, diagonal 14 ~ 10 * sqrt(2)) : les égalités de f
+# sont exactes et le départage sur h fonctionne, sans bruit d'arrondi flottant
+ORTHOGONAL_COST = 10
+DIAGONAL_COST = 14
+
+# Compteurs cumulés des recherches (remis à zéro par reset_search_stats)
+search_stats = {
+    'searches': 0,        # appels à search_path
+    'expansions': 0,      # noeuds développés au total
+    'last_expansions': 0, # noeuds développés par la dernière recherche
+    'found': 0,
+    'unreachable': 0,     # région de départ épuisée sans atteindre le but
+    'budget': 0,          # arrêt sur max_expansions
+    'rejected': 0,        # but dans une autre composante connexe, refusé sans recherche
+    'direct': 0,          # but en ligne de vue depuis le départ, atteint sans recherche
+    'cache_hits': 0,
+}
+
+def reset_search_stats():
+    for key in search_stats:
+        search_stats[key] = 0
+
+def get_search_stats():
+    return dict(search_stats)
 
 
 def heuristic(a, b):
-    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+    """Distance octile (coûts 10/14) : admissible et cohérente pour search_path."""
+    dx = abs(a[0] - b[0])
+    dy = abs(a[1] - b[1])
+    if dx < dy:
+        dx, dy = dy, dx
+    return ORTHOGONAL_COST * dx + (DIAGONAL_COST - ORTHOGONAL_COST) * dy
 
 def get_neighbors(game_map, position):
     directions = [
@@ -103,21 +180,21 @@ def walkable_goal(start, rounded_goal, game_map):
         float_offset = float_goal
         rg = (round(float_goal[0]), round(float_goal[1]))
         if game_map.walkable_position(rg):
-            return rg, float_offset
-        tile = find_nearest_walkable_tile(rg, game_map)
+            tile = rg
+        else:
+            tile = find_nearest_walkable_tile(rg, game_map)
+        if tile:
+            # Côté injoignable depuis start (entité adossée à un obstacle) : viser un autre côté
+            tile = game_map.get_components().nearest_contact_tile(start, entity, tile) or tile
         return tile, float_offset
     return rounded_goal, None
 
-def a_star(start, float_goal, game_map):
+def resolve_goal(start, float_goal, game_map):
     """
-    Algorithme A* avec cache LRU.
-    Le cache permet de réutiliser les chemins calculés récemment.
+    Tuile praticable visée pour float_goal et, si le but est un bâtiment ou
+    une ressource, le point flottant sur son bord (sinon None).
+    Retourne (None, None) s'il n'existe aucune tuile praticable.
     """
-    # Vérifier le cache d'abord
-    cached = get_cached_path(start, float_goal)
-    if cached is not None:
-        return cached
-    
     rounded_goal = (round(float_goal[0]), round(float_goal[1]))
     if not game_map.walkable_position(rounded_goal):
         rounded_goal, float_building_goal = walkable_goal(start, rounded_goal, game_map)
@@ -125,40 +202,256 @@ def a_star(start, float_goal, game_map):
         float_building_goal = None
 
     if not rounded_goal or not game_map.walkable_position(rounded_goal):
-        return []
+        return None, None
+    return rounded_goal, float_building_goal
 
-    open_set = []
-    rs = (round(start[0]), round(start[1]))
-    heapq.heappush(open_set, (0, rs))
-    came_from = {}
-    g_score = {rs: 0}
-    f_score = {rs: heuristic(rs, rounded_goal)}
+def search_path(start, goal, game_map, max_expansions=None, partial=False):
+    """
+    A* entre deux tuiles entières de la carte.
 
-    while open_set:
-        _, current = heapq.heappop(open_set)
+    Liste fermée, heuristique octile, diagonales interdites entre deux cases
+    bloquées (pas de coupe de coin) et départage déterministe des égalités
+    (f, puis h, puis ordre d'insertion). Si max_expansions est donné, la
+    recherche s'arrête après ce nombre de noeuds développés.
 
-        if current == rounded_goal:
-            path = []
-            while current in came_from:
-                path.append(current)
-                current = came_from[current]
-            path.reverse()
-            if float_building_goal and game_map.walkable_position((round(float_building_goal[0]), round(float_building_goal[1]))):
-                path.append(float_building_goal)
-            elif game_map.walkable_position(float_goal):
-                path.append(float_goal)
-            
-            # Mettre en cache le résultat
-            cache_path(start, float_goal, path)
-            return path
+    Retourne (chemin, statut) : le chemin exclut la tuile de départ et se
+    termine sur goal ; statut vaut 'found', 'unreachable' ou 'budget'. En cas
+    d'échec le chemin est vide, sauf si partial est vrai : il mène alors à
+    la tuile explorée la plus proche du but.
+    """
+    if not partial and game_map.get_components().separated(start, goal):
+        # Départ et but dans deux composantes différentes : inutile d'inonder la zone de départ
+        search_stats['searches'] += 1
+        search_stats['last_expansions'] = 0
+        search_stats['unreachable'] += 1
+        search_stats['rejected'] += 1
+        return [], 'unreachable'
+    landmarks = game_map.get_landmarks().bounds(start, goal)
+    return search_grid(game_map.get_padded_walkable(), game_map.num_tiles_x, game_map.num_tiles_y,
+                       start, goal, max_expansions, partial, landmarks)
 
-        for neighbor in get_neighbors(game_map, current):
-            tentative_g_score = g_score[current] + 1
-            if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
+def grid_steps(stride):
+    """
+    Pas vers les 8 voisines sur une grille bordée et aplatie de hauteur
+    stride - 2 : (décalage, coût, côtés a et b). Une diagonale n'est
+    praticable que si les deux cases orthogonales qu'elle longe (noeud + a,
+    noeud + b) le sont ; a vaut 0 pour les pas orthogonaux.
+    """
+    return (
+        (stride, ORTHOGONAL_COST, 0, 0), (-stride, ORTHOGONAL_COST, 0, 0),
+        (1, ORTHOGONAL_COST, 0, 0), (-1, ORTHOGONAL_COST, 0, 0),
+        (stride + 1, DIAGONAL_COST, stride, 1), (stride - 1, DIAGONAL_COST, stride, -1),
+        (-stride + 1, DIAGONAL_COST, -stride, 1), (-stride - 1, DIAGONAL_COST, -stride, -1),
+    )
+
+def padded_walkable(walkable_grid):
+    """
+    Praticabilité walkable_grid[x, y] bordée d'une case bloquée et aplatie
+    (octets modifiables) : la case (x, y) est à l'indice (x + 1) * (hauteur + 2) + y + 1.
+    """
+    width, height = walkable_grid.shape
+    padded = np.zeros((width + 2, height + 2), dtype=np.uint8)
+    padded[1:-1, 1:-1] = walkable_grid
+    return bytearray(padded.tobytes())
+
+def search_grid(walkable, width, height, start, goal, max_expansions=None, partial=False, landmarks=None):
+    """
+    Recherche de search_path sur la praticabilité bordée walkable
+    (padded_walkable) d'une carte width x height, sans GameMap : sert aussi aux
+    processus de AiUtils.path_workers. walkable n'est jamais recopiée, son
+    propriétaire la tient à jour. landmarks, s'il est donné
+    (LandmarkTables.bounds), renforce l'heuristique octile par les minorants
+    ALT de ces repères.
+    """
+    search_stats['searches'] += 1
+    sx, sy = start
+    if not (0 <= sx < width and 0 <= sy < height):
+        search_stats['last_expansions'] = 0
+        search_stats['unreachable'] += 1
+        return [], 'unreachable'
+
+    # Grille aplatie bordée d'une case bloquée : un noeud est l'entier
+    # (x + 1) * stride + (y + 1) et les voisins ne demandent aucun test de bornes
+    stride = height + 2
+    steps = grid_steps(stride)
+    start_node = (sx + 1) * stride + sy + 1
+    goal_node = (goal[0] + 1) * stride + goal[1] + 1
+    goal_x, goal_y = goal[0] + 1, goal[1] + 1
+    diagonal_extra = DIAGONAL_COST - ORTHOGONAL_COST
+
+    start_h = heuristic(start, goal)
+    if landmarks is not None:
+        for goal_distance, table in landmarks:
+            start_h = max(start_h, abs(table[start_node] - goal_distance))
+    open_heap = [(start_h, start_h, 0, start_node)]
+    g_score = {start_node: 0}
+    came_from = {}
+    closed = set()
+    best, best_h = start_node, start_h
+    expansions = 0
+    counter = 0
+    status = 'unreachable'
+
+    while open_heap:
+        _, h, _, current = heapq.heappop(open_heap)
+        if current in closed:
+            continue
+        if current == goal_node:
+            status = 'found'
+            break
+        if max_expansions is not None and expansions >= max_expansions:
+            status = 'budget'
+            break
+        closed.add(current)
+        expansions += 1
+        if h < best_h:
+            best, best_h = current, h
+
+        g = g_score[current]
+        for offset, cost, side_a, side_b in steps:
+            neighbor = current + offset
+            if not walkable[neighbor] or neighbor in closed:
+                continue
+            if side_a and not (walkable[current + side_a] and walkable[current + side_b]):
+                continue
+            tentative_g = g + cost
+            known_g = g_score.get(neighbor)
+            if known_g is None or tentative_g < known_g:
+                g_score[neighbor] = tentative_g
                 came_from[neighbor] = current
-                g_score[neighbor] = tentative_g_score
-                f_score[neighbor] = g_score[neighbor] + heuristic(neighbor, rounded_goal)
-                heapq.heappush(open_set, (f_score[neighbor], neighbor))
+                nx, ny = divmod(neighbor, stride)
+                dx = nx - goal_x if nx > goal_x else goal_x - nx
+                dy = ny - goal_y if ny > goal_y else goal_y - ny
+                nh = ORTHOGONAL_COST * (dx + dy) + (diagonal_extra - ORTHOGONAL_COST) * (dx if dx < dy else dy)
+                if landmarks is not None:
+                    for goal_distance, table in landmarks:
+                        bound = table[neighbor] - goal_distance
+                        if bound < 0:
+                            bound = -bound
+                        if bound > nh:
+                            nh = bound
+                counter += 1
+                heapq.heappush(open_heap, (tentative_g + nh, nh, counter, neighbor))
 
-    return []
+    search_stats['expansions'] += expansions
+    search_stats['last_expansions'] = expansions
+    search_stats[status] += 1
+
+    if status == 'found':
+        end = goal_node
+    elif partial and best != start_node:
+        end = best
+    else:
+        return [], status
 
+    path = []
+    while end in came_from:
+        x, y = divmod(end, stride)
+        path.append((x - 1, y - 1))
+        end = came_from[end]
+    path.reverse()
+    return path, status
+
+# Noeuds développés au plus pour raccorder un chemin à un but déplacé (repair_path)
+REPAIR_MAX_EXPANSIONS = 400
+
+def repair_path(path, float_goal, game_map, max_expansions=REPAIR_MAX_EXPANSIONS):
+    """
+    Raccorde un chemin existant à un but qui s'est déplacé : le chemin est
+    conservé jusqu'à son point le plus proche du nouveau but et seule la fin
+    est recherchée (A* borné par max_expansions). Retourne le nouveau chemin,
+    ou None si le raccord échoue (il faut alors replanifier entièrement).
+    """
+    if not path:
+        return None
+    gx, gy = float_goal
+    junction_index = min(range(len(path)), key=lambda i: (path[i][0] - gx) ** 2 + (path[i][1] - gy) ** 2)
+    junction = (round(path[junction_index][0]), round(path[junction_index][1]))
+    if not game_map.walkable_position(junction):
+        return None
+    rounded_goal, float_building_goal = resolve_goal(junction, float_goal, game_map)
+    if not rounded_goal:
+        return None
+    tail, status = search_path(junction, rounded_goal, game_map, max_expansions)
+    if status != 'found':
+        return None
+
+    if float_building_goal and game_map.walkable_position(float_building_goal):
+        tail.append(float_building_goal)
+    elif game_map.walkable_position(float_goal):
+        tail.append(float_goal)
+    return path[:junction_index] + [junction] + smooth_path(junction, tail, game_map)
+
+def rejoin_path(position, path, game_map, max_expansions=REPAIR_MAX_EXPANSIONS):
+    """
+    Raccorde position au premier point de path quand il n'est plus en vue
+    (obstacle apparu sur un segment lissé) : A* borné jusqu'à ce point, puis
+    lissage. Retourne le nouveau chemin ou None si le raccord échoue.
+    """
+    if not path:
+        return None
+    tile = (round(position[0]), round(position[1]))
+    target = (round(path[0][0]), round(path[0][1]))
+    if not game_map.walkable_position(tile) or not game_map.walkable_position(target):
+        return None
+    detour, status = search_path(tile, target, game_map, max_expansions)
+    if status != 'found':
+        return None
+    rest = path[1:] if tuple(path[0]) == target else path
+    return smooth_path(tile, detour + rest, game_map)
+
+def prepare_a_star(start, float_goal, game_map):
+    """
+    Tout a_star sauf la recherche : cache, tuile praticable visée, ligne de vue.
+    Retourne (path, None) quand le chemin est connu sans recherche ([] si le
+    but n'a aucune tuile praticable), sinon (None, query) : query[2] et
+    query[3] sont les tuiles de départ et d'arrivée à passer à search_path,
+    dont le chemin trouvé se termine par complete_a_star(query, path, game_map).
+    """
+    # Vérifier le cache d'abord
+    cached = game_map.path_cache.get(start, float_goal)
+    if cached is not None:
+        search_stats['cache_hits'] += 1
+        return cached, None
+
+    rounded_goal, float_building_goal = resolve_goal(start, float_goal, game_map)
+    if not rounded_goal:
+        return [], None
+
+    rs = (round(start[0]), round(start[1]))
+    query = (start, float_goal, rs, rounded_goal, float_building_goal)
+    if line_of_sight(rs, rounded_goal, game_map):
+        search_stats['direct'] += 1
+        return complete_a_star(query, [rounded_goal], game_map), None
+    return None, query
+
+def complete_a_star(query, path, game_map):
+    """Termine le chemin trouvé pour query sur le but flottant, le lisse et le met en cache."""
+    start, float_goal, rs, _, float_building_goal = query
+    if float_building_goal and game_map.walkable_position((round(float_building_goal[0]), round(float_building_goal[1]))):
+        path.append(float_building_goal)
+    elif game_map.walkable_position(float_goal):
+        path.append(float_goal)
+    # Lissé depuis le centre de la case de départ : le chemin en cache vaut pour toute la case
+    path = smooth_path(rs, path, game_map)
+
+    # Mettre en cache le résultat
+    game_map.path_cache.put(start, float_goal, path)
+    return path
+
+def a_star(start, float_goal, game_map, max_expansions=None, partial=False):
+    """
+    Algorithme A* avec le cache LRU de la carte (game_map.path_cache).
+    Le cache permet de réutiliser les chemins calculés récemment.
+    max_expansions et partial sont transmis à search_path ; un chemin
+    partiel n'est pas mis en cache et ne se termine pas sur float_goal.
+    Un but en ligne de vue est atteint sans recherche, et le chemin trouvé
+    est lissé (smooth_path) : il ne contient que les points de passage utiles.
+    """
+    path, query = prepare_a_star(start, float_goal, game_map)
+    if query is None:
+        return path
+    path, status = search_path(query[2], query[3], game_map, max_expansions, partial)
+    if status != 'found':
+        return path
+    return complete_a_star(query, path, game_map)
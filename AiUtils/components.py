@@ -0,0 +1,192 @@
+"""
+Composantes connexes de l'espace praticable.
+
+Deux cases praticables sont dans la même composante si une unité peut aller
+de l'une à l'autre. search_path n'autorisant une diagonale que si les deux
+cases orthogonales qu'elle longe sont libres, la 4-connexité suffit.
+
+La carte est découpée en régions de COMPONENT_REGION_SIZE cases, étiquetées
+séparément (propagation du plus petit indice de case, vectorisée avec NumPy) ;
+les étiquettes de régions voisines sont ensuite fusionnées par union-find le
+long de leurs frontières. Un changement d'obstacle (invalidate_tiles) ne fait
+réétiqueter que les régions touchées, au prochain appel. Une fois à jour,
+savoir si un but est joignable coûte O(1) au lieu d'un A* qui inonde toute
+la zone de départ.
+"""
+import numpy as np
+
+COMPONENT_REGION_SIZE = 16
+
+_UNSET = np.iinfo(np.int64).max
+
+
+class WalkableComponents:
+    """Étiquetage des composantes praticables d'une GameMap."""
+
+    def __init__(self, game_map, region_size=COMPONENT_REGION_SIZE):
+        self.game_map = game_map
+        self.region_size = region_size
+        self.width = game_map.num_tiles_x
+        self.height = game_map.num_tiles_y
+        self.flat_index = np.arange(self.width * self.height, dtype=np.int64).reshape(self.width, self.height)
+        # Étiquette locale d'une case : indice de la plus petite case de sa composante dans la région (-1 si bloquée)
+        self.labels = np.full((self.width, self.height), -1, dtype=np.int64)
+        self._labels_view = memoryview(self.labels)
+        # Étiquette locale -> étiquette de sa composante sur toute la carte (absente si identique)
+        self.roots = {}
+        self.dirty_regions = set()
+        self.stats = {'relabelled_regions': 0, 'merges': 0}
+        # Étiquettes résolues de toute la carte (component_grid), et merges à leur calcul
+        self._grid = None
+        self._grid_merges = -1
+        self._label_block(0, self.width, 0, self.height)
+        self._merge()
+
+    def _label_block(self, x0, x1, y0, y1):
+        """Étiquette les régions entières comprises dans [x0, x1) x [y0, y1)."""
+        walkable = self.game_map.walkable_grid[x0:x1, y0:y1] != 0
+        labels = np.where(walkable, self.flat_index[x0:x1, y0:y1], _UNSET)
+        size = self.region_size
+        # Liens entre cases voisines praticables d'une même région
+        link_x = walkable[1:, :] & walkable[:-1, :] & (np.arange(x0 + 1, x1) % size != 0)[:, None]
+        link_y = walkable[:, 1:] & walkable[:, :-1] & (np.arange(y0 + 1, y1) % size != 0)[None, :]
+        while True:
+            previous = labels.copy()
+            np.minimum(labels[1:, :], np.where(link_x, labels[:-1, :], _UNSET), out=labels[1:, :])
+            np.minimum(labels[:-1, :], np.where(link_x, labels[1:, :], _UNSET), out=labels[:-1, :])
+            np.minimum(labels[:, 1:], np.where(link_y, labels[:, :-1], _UNSET), out=labels[:, 1:])
+            np.minimum(labels[:, :-1], np.where(link_y, labels[:, 1:], _UNSET), out=labels[:, :-1])
+            if np.array_equal(previous, labels):
+                break
+        self.labels[x0:x1, y0:y1] = np.where(walkable, labels, -1)
+
+    def _merge(self):
+        """Relie par union-find les étiquettes qui se touchent d'une région à l'autre."""
+        labels = self.labels
+        size = self.region_size
+        count = self.width * self.height
+        codes = []
+        for x in range(size, self.width, size):
+            a, b = labels[x - 1, :], labels[x, :]
+            linked = (a >= 0) & (b >= 0)
+            codes.append(a[linked] * count + b[linked])
+        for y in range(size, self.height, size):
+            a, b = labels[:, y - 1], labels[:, y]
+            linked = (a >= 0) & (b >= 0)
+            codes.append(a[linked] * count + b[linked])
+
+        parent = {}
+
+        def find(label):
+            root = parent.setdefault(label, label)
+            while root != parent[root]:
+                parent[root] = parent[parent[root]]
+                root = parent[root]
+            return root
+
+        if codes:
+            for code in np.unique(np.concatenate(codes)).tolist():
+                a, b = divmod(code, count)
+                root_a, root_b = find(a), find(b)
+                if root_a != root_b:
+                    if root_b < root_a:
+                        root_a, root_b = root_b, root_a
+                    parent[root_b] = root_a
+        self.roots = {label: find(label) for label in parent if find(label) != label}
+        self.stats['merges'] += 1
+
+    def _refresh(self):
+        size = self.region_size
+        for rx, ry in self.dirty_regions:
+            x0, y0 = rx * size, ry * size
+            self._label_block(x0, min(x0 + size, self.width), y0, min(y0 + size, self.height))
+        self.stats['relabelled_regions'] += len(self.dirty_regions)
+        self.dirty_regions.clear()
+        self._merge()
+
+    def invalidate_tiles(self, tiles):
+        """Marque à réétiqueter les régions de ces cases (praticabilité modifiée)."""
+        size = self.region_size
+        for x, y in tiles:
+            if 0 <= x < self.width and 0 <= y < self.height:
+                self.dirty_regions.add((x // size, y // size))
+
+    def component(self, tile):
+        """Identifiant de la composante de tile, ou -1 si la case est bloquée ou hors carte."""
+        if self.dirty_regions:
+            self._refresh()
+        x, y = tile
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return -1
+        label = self._labels_view[x, y]
+        if label < 0:
+            return -1
+        return self.roots.get(label, label)
+
+    def component_grid(self):
+        """
+        Identifiant de composante de chaque case (-1 si bloquée), en tableau
+        NumPy (width, height) : même valeur que component, pour toute la carte.
+        Recalculé seulement après un changement d'obstacle.
+        """
+        if self.dirty_regions:
+            self._refresh()
+        if self._grid is None or self._grid_merges != self.stats['merges']:
+            if self.roots:
+                values, inverse = np.unique(self.labels, return_inverse=True)
+                resolved = np.array([self.roots.get(label, label) for label in values.tolist()], dtype=np.int64)
+                self._grid = resolved[inverse].reshape(self.labels.shape)
+            else:
+                self._grid = self.labels.copy()
+            self._grid_merges = self.stats['merges']
+        return self._grid
+
+    def separated(self, a, b):
+        """Vrai si a et b sont praticables et qu'aucun chemin ne les relie."""
+        component_a = self.component(a)
+        if component_a < 0:
+            return False
+        component_b = self.component(b)
+        return component_b >= 0 and component_a != component_b
+
+    def _contact_tiles(self, entity):
+        """Cases voisines (8-connexité) de l'emprise de entity."""
+        footprint = self.game_map.entity_tiles.get(entity.entity_id) or [(round(entity.x), round(entity.y))]
+        footprint_set = set(footprint)
+        contacts = set()
+        for x, y in footprint:
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    tile = (x + dx, y + dy)
+                    if tile not in footprint_set:
+                        contacts.add(tile)
+        return footprint, contacts
+
+    def reaches_entity(self, start, entity):
+        """
+        Vrai si une unité partant de start peut atteindre entity (une case de
+        son emprise ou à son contact). Vrai aussi quand start n'est pas
+        praticable : on ne sait pas conclure, la recherche tranchera.
+        """
+        start = (round(start[0]), round(start[1]))
+        component = self.component(start)
+        if component < 0:
+            return True
+        footprint, contacts = self._contact_tiles(entity)
+        return any(self.component(tile) == component for tile in footprint) or \
+            any(self.component(tile) == component for tile in contacts)
+
+    def nearest_contact_tile(self, start, entity, near):
+        """
+        near s'il est joignable depuis start, sinon la case au contact de entity
+        joignable depuis start la plus proche de near (None s'il n'y en a pas).
+        """
+        start = (round(start[0]), round(start[1]))
+        component = self.component(start)
+        if component < 0 or self.component(near) == component:
+            return near
+        _, contacts = self._contact_tiles(entity)
+        reachable = [tile for tile in contacts if self.component(tile) == component]
+        if not reachable:
+            return None
+        return min(reachable, key=lambda tile: ((tile[0] - near[0]) ** 2 + (tile[1] - near[1]) ** 2, tile))
@@ -0,0 +1,249 @@
+"""
+Champs de flux pour les groupes d'unités qui visent le même but.
+
+Quand plusieurs unités demandent un chemin vers la même case (ordre
+d'attaque d'une armée, poursuite d'une même cible), un seul Dijkstra part
+du but et chaque case atteinte retient sa case suivante vers le but :
+le pas suivant d'une unité se lit en O(1) et son chemin complet en suivant
+ces pointeurs. Le Dijkstra n'est développé que jusqu'aux unités qui l'ont
+interrogé, puis repris à la demande pour les suivantes.
+
+Un champ reste en cache tant que le but et les obstacles qu'il a explorés
+ne changent pas (invalidate_tiles). Une unité seule continue d'utiliser
+A* : request_path retourne None tant que le but n'est pas partagé.
+"""
+import heapq
+from collections import Counter, OrderedDict
+
+from AiUtils.aStar import ORTHOGONAL_COST, DIAGONAL_COST, grid_steps
+from AiUtils.path_smoothing import line_of_sight, smooth_path
+
+# Nombre de demandes vers un même but (tick courant et précédent) à partir duquel un champ est construit
+FLOW_FIELD_MIN_UNITS = 4
+MAX_FLOW_FIELDS = 16
+
+
+class FlowField:
+    """
+    A* inverse reprenable depuis les cases but (voir le module).
+
+    La recherche part du but et vise l'unité qui interroge le champ ; quand
+    une autre unité l'interroge, la frontière est simplement réordonnée
+    vers elle. L'heuristique octile étant cohérente, toute case fixée l'est
+    avec sa distance exacte au but, quelle que soit l'unité visée à ce moment.
+    """
+
+    def __init__(self, walkable, stride, seeds):
+        self.walkable = walkable
+        self.stride = stride
+        self.steps = grid_steps(stride)
+        # Tableaux plats indexés par noeud ; -1 : case pas encore atteinte
+        self.distance = [-1] * len(walkable)
+        # Case suivante vers le but (-1 pour les cases but)
+        self.next_node = [-1] * len(walkable)
+        self.settled = bytearray(len(walkable))
+        self.frontier = set(seeds)
+        self.heap = []
+        self.seeds = seeds
+        self.target = None
+        # Entité visée quand le but est une case bloquée (bâtiment, ressource)
+        self.entity = None
+        for seed in seeds:
+            self.distance[seed] = 0
+
+    def _aim(self, node):
+        """Réordonne la frontière selon la distance octile à node."""
+        self.target = node
+        tx, ty = divmod(node, self.stride)
+        stride = self.stride
+        distance = self.distance
+        heap = []
+        for current in self.frontier:
+            x, y = divmod(current, stride)
+            dx = abs(x - tx)
+            dy = abs(y - ty)
+            if dx < dy:
+                dx, dy = dy, dx
+            h = ORTHOGONAL_COST * dx + (DIAGONAL_COST - ORTHOGONAL_COST) * dy
+            heap.append((distance[current] + h, h, current))
+        heapq.heapify(heap)
+        self.heap = heap
+
+    def _settle(self, node):
+        """Développe la recherche jusqu'à fixer node ; False si node n'est pas atteignable."""
+        settled = self.settled
+        if settled[node]:
+            return True
+        if self.target != node:
+            self._aim(node)
+        walkable = self.walkable
+        distance = self.distance
+        next_node = self.next_node
+        frontier = self.frontier
+        heap = self.heap
+        steps = self.steps
+        stride = self.stride
+        tx, ty = divmod(node, stride)
+        heappop = heapq.heappop
+        heappush = heapq.heappush
+        while heap:
+            _, _, current = heappop(heap)
+            if settled[current]:
+                continue
+            settled[current] = 1
+            frontier.discard(current)
+            if current == node:
+                return True
+            cost = distance[current]
+            for offset, step_cost, side_a, side_b in steps:
+                neighbor = current + offset
+                if not walkable[neighbor] or settled[neighbor]:
+                    continue
+                if side_a and not (walkable[current + side_a] and walkable[current + side_b]):
+                    continue
+                new_cost = cost + step_cost
+                old_cost = distance[neighbor]
+                if old_cost < 0 or new_cost < old_cost:
+                    distance[neighbor] = new_cost
+                    next_node[neighbor] = current
+                    frontier.add(neighbor)
+                    x, y = divmod(neighbor, stride)
+                    dx = abs(x - tx)
+                    dy = abs(y - ty)
+                    if dx < dy:
+                        dx, dy = dy, dx
+                    h = ORTHOGONAL_COST * dx + (DIAGONAL_COST - ORTHOGONAL_COST) * dy
+                    heappush(heap, (new_cost + h, h, neighbor))
+        return False
+
+    def next_step(self, node):
+        """Case suivante depuis node vers le but (-1 si node est un but, None s'il est inatteignable)."""
+        if not self._settle(node):
+            return None
+        return self.next_node[node]
+
+    def path_from(self, node):
+        """Suite de noeuds de node (exclu) jusqu'au but, ou None si le but est inatteignable."""
+        if not self._settle(node):
+            return None
+        next_node = self.next_node
+        path = []
+        current = next_node[node]
+        while current >= 0:
+            path.append(current)
+            current = next_node[current]
+        return path
+
+    def touches(self, node):
+        """Vrai si node ou une case voisine a déjà été atteinte par le Dijkstra."""
+        distance = self.distance
+        if distance[node] >= 0:
+            return True
+        return any(distance[node + offset] >= 0 for offset, _, _, _ in self.steps)
+
+
+class FlowFieldService:
+    """Champs de flux d'une GameMap, indexés par case but (cache LRU)."""
+
+    def __init__(self, game_map):
+        self.game_map = game_map
+        self.stride = game_map.num_tiles_y + 2
+        # Praticabilité bordée de la carte (GameMap.get_padded_walkable), tenue à jour par la carte
+        self.walkable = game_map.get_padded_walkable()
+        self.fields = OrderedDict()
+        self.demand = Counter()
+        self.previous_demand = Counter()
+        self.stats = {'fields_built': 0, 'paths': 0}
+
+    def _node(self, tile):
+        return (tile[0] + 1) * self.stride + tile[1] + 1
+
+    def _tile(self, node):
+        x, y = divmod(node, self.stride)
+        return (x - 1, y - 1)
+
+    def new_tick(self):
+        """Fait glisser la fenêtre de demandes (appelé à chaque GameMap.patch)."""
+        self.previous_demand = self.demand
+        self.demand = Counter()
+
+    def _seeds(self, goal):
+        """
+        Cases but : goal s'il est praticable, sinon les cases praticables au
+        contact de l'entité qui l'occupe. Retourne (noeuds, entité ou None).
+        """
+        game_map = self.game_map
+        if game_map.walkable_position(goal):
+            return [self._node(goal)], None
+        entities = game_map.grid.get(goal)
+        if not entities:
+            return [], None
+        entity = next(iter(entities))
+        footprint = set(game_map.entity_tiles.get(entity.entity_id, [goal]))
+        seeds = set()
+        # Contact orthogonal seulement : une case en diagonale est hors de portée des unités au corps à corps
+        for x, y in footprint:
+            for tile in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if tile not in footprint and game_map.walkable_position(tile):
+                    seeds.add(self._node(tile))
+        return sorted(seeds), entity
+
+    def request_path(self, start, destination):
+        """
+        Chemin de start vers destination lu dans le champ de ce but, s'il est
+        partagé par au moins FLOW_FIELD_MIN_UNITS demandes récentes.
+        Retourne None quand l'appelant doit utiliser A* (but non partagé
+        ou en vue, départ bloqué) et [] quand le but est inatteignable.
+        """
+        goal = (round(destination[0]), round(destination[1]))
+        self.demand[goal] += 1
+        start_tile = (round(start[0]), round(start[1]))
+        if not self.game_map.walkable_position(start_tile):
+            return None
+        if line_of_sight(start_tile, goal, self.game_map):
+            # But en vue : a_star y va tout droit sans recherche
+            return None
+        field = self.fields.get(goal)
+        if field is None:
+            if self.demand[goal] + self.previous_demand[goal] < FLOW_FIELD_MIN_UNITS:
+                return None
+            seeds, entity = self._seeds(goal)
+            if not seeds:
+                return None
+            field = FlowField(self.walkable, self.stride, seeds)
+            field.entity = entity
+            self.fields[goal] = field
+            self.stats['fields_built'] += 1
+            while len(self.fields) > MAX_FLOW_FIELDS:
+                self.fields.popitem(last=False)
+        self.fields.move_to_end(goal)
+
+        components = self.game_map.get_components()
+        if all(components.separated(start_tile, self._tile(seed)) for seed in field.seeds):
+            # Aucune case but joignable : inutile de développer le champ sur toute la zone du but
+            return []
+        nodes = field.path_from(self._node(start_tile))
+        if nodes is None:
+            return []
+        self.stats['paths'] += 1
+        path = [self._tile(node) for node in nodes]
+        if field.entity is not None:
+            path.append(self._contact_point(path[-1] if path else start_tile, field.entity))
+        elif self.game_map.walkable_position(destination):
+            path.append(destination)
+        return smooth_path(start_tile, path, self.game_map)
+
+    @staticmethod
+    def _contact_point(tile, entity):
+        """Point de la case tile presque au bord de entity, à portée des unités au corps à corps."""
+        half = entity.size / 2.0
+        closest_x = max(entity.x - half, min(tile[0], entity.x + half))
+        closest_y = max(entity.y - half, min(tile[1], entity.y + half))
+        return (tile[0] + (closest_x - tile[0]) * 0.9, tile[1] + (closest_y - tile[1]) * 0.9)
+
+    def invalidate_tiles(self, tiles):
+        """Oublie les champs qui avaient exploré ces cases (la carte a déjà mis à jour walkable)."""
+        for tile in tiles:
+            node = self._node(tile)
+            for goal in [goal for goal, field in self.fields.items() if field.touches(node)]:
+                del self.fields[goal]
@@ -0,0 +1,316 @@
+"""
+Pathfinding hiérarchique (HPA*) pour les grandes cartes.
+
+La carte est découpée en clusters de CLUSTER_SIZE x CLUSTER_SIZE cases. Sur
+chaque frontière entre deux clusters voisins, chaque segment de cases
+praticables des deux côtés donne une ou deux transitions ; les entrées d'un
+cluster sont reliées entre elles par leur distance exacte (Dijkstra restreint
+au cluster). Un long trajet est planifié sur ce graphe abstrait, puis affiné
+un cluster à la fois pendant le déplacement de l'unité (next_segment).
+
+Tout est calculé à la demande : un cluster n'est prétraité que lorsqu'une
+recherche le traverse, et invalidate_tiles oublie les clusters (et frontières)
+dont la praticabilité a changé, ils seront recalculés au prochain passage.
+"""
+import heapq
+
+import numpy as np
+
+from AiUtils.aStar import ORTHOGONAL_COST, DIAGONAL_COST, grid_steps, heuristic, a_star, search_path, resolve_goal
+from AiUtils.path_smoothing import line_of_sight, smooth_path
+
+CLUSTER_SIZE = 16
+# Un segment de frontière plus long reçoit deux transitions (aux extrémités) au lieu d'une
+MAX_SINGLE_TRANSITION_RUN = 6
+# En dessous de cette distance (en cases), a_star direct reste le plus rapide
+HIERARCHICAL_MIN_DISTANCE = 64
+# Budget de l'affinage d'un segment : au-delà, la route est replanifiée
+SEGMENT_MAX_EXPANSIONS = 4 * CLUSTER_SIZE * CLUSTER_SIZE
+
+
+def _dijkstra(walkable, stride, source, targets):
+    """
+    Dijkstra sur une grille aplatie bordée de cases bloquées (même codage que
+    search_path). targets associe un index de noeud à une clé ; retourne
+    {clé: coût} pour les cibles atteintes, en s'arrêtant quand toutes le sont.
+    """
+    steps = grid_steps(stride)
+    remaining = len(targets)
+    found = {}
+    distances = {source: 0}
+    heap = [(0, source)]
+    while heap and remaining:
+        cost, current = heapq.heappop(heap)
+        if cost > distances[current]:
+            continue
+        key = targets.get(current)
+        if key is not None and key not in found:
+            found[key] = cost
+            remaining -= 1
+        for offset, step_cost, side_a, side_b in steps:
+            neighbor = current + offset
+            if not walkable[neighbor]:
+                continue
+            if side_a and not (walkable[current + side_a] and walkable[current + side_b]):
+                continue
+            new_cost = cost + step_cost
+            if new_cost < distances.get(neighbor, new_cost + 1):
+                distances[neighbor] = new_cost
+                heapq.heappush(heap, (new_cost, neighbor))
+    return found
+
+
+class PathHierarchy:
+    """Graphe abstrait des entrées de clusters d'une GameMap (voir le module)."""
+
+    def __init__(self, game_map, cluster_size=CLUSTER_SIZE):
+        self.game_map = game_map
+        self.cluster_size = cluster_size
+        self.clusters_x = -(-game_map.num_tiles_x // cluster_size)
+        self.clusters_y = -(-game_map.num_tiles_y // cluster_size)
+        # ('v', cx, cy) : frontière entre (cx, cy) et (cx + 1, cy) ; ('h', cx, cy) : entre (cx, cy) et (cx, cy + 1)
+        # -> liste de transitions (tuile côté (cx, cy), tuile côté voisin)
+        self._borders = {}
+        # cluster -> {entrée: [(voisin, coût), ...]} (arêtes internes et transitions)
+        self._edges = {}
+        self.stats = {'clusters_built': 0, 'abstract_expansions': 0, 'routes': 0}
+
+    # ---------------- Clusters ----------------
+    def cluster_of(self, tile):
+        return (tile[0] // self.cluster_size, tile[1] // self.cluster_size)
+
+    def _bounds(self, cluster):
+        x0 = cluster[0] * self.cluster_size
+        y0 = cluster[1] * self.cluster_size
+        return (x0, y0, min(x0 + self.cluster_size, self.game_map.num_tiles_x),
+                min(y0 + self.cluster_size, self.game_map.num_tiles_y))
+
+    def _local_grid(self, cluster):
+        """walkable_grid du cluster, bordé de cases bloquées et aplati : (octets, stride, x0, y0)."""
+        x0, y0, x1, y1 = self._bounds(cluster)
+        stride = y1 - y0 + 2
+        padded = np.zeros((x1 - x0 + 2, stride), dtype=np.uint8)
+        padded[1:-1, 1:-1] = self.game_map.walkable_grid[x0:x1, y0:y1]
+        return padded.tobytes(), stride, x0, y0
+
+    def _border(self, key):
+        transitions = self._borders.get(key)
+        if transitions is not None:
+            return transitions
+        kind, cx, cy = key
+        walkable = self.game_map.walkable_grid
+        x0, y0, x1, y1 = self._bounds((cx, cy))
+        if kind == 'v':
+            side = x1 - 1
+            open_tiles = (walkable[side, y0:y1] & walkable[side + 1, y0:y1]).tolist()
+            pair = lambda i: ((side, y0 + i), (side + 1, y0 + i))
+        else:
+            side = y1 - 1
+            open_tiles = (walkable[x0:x1, side] & walkable[x0:x1, side + 1]).tolist()
+            pair = lambda i: ((x0 + i, side), (x0 + i, side + 1))
+
+        transitions = []
+        run_start = None
+        for i, is_open in enumerate(open_tiles + [0]):
+            if is_open and run_start is None:
+                run_start = i
+            elif not is_open and run_start is not None:
+                run_end = i - 1
+                if run_end - run_start + 1 < MAX_SINGLE_TRANSITION_RUN:
+                    transitions.append(pair((run_start + run_end) // 2))
+                else:
+                    transitions.append(pair(run_start))
+                    transitions.append(pair(run_end))
+                run_start = None
+        self._borders[key] = transitions
+        return transitions
+
+    def _cluster_borders(self, cluster):
+        """(clé de frontière, True si le cluster est le premier côté) pour chaque voisin existant."""
+        cx, cy = cluster
+        borders = []
+        if cx + 1 < self.clusters_x:
+            borders.append((('v', cx, cy), True))
+        if cx > 0:
+            borders.append((('v', cx - 1, cy), False))
+        if cy + 1 < self.clusters_y:
+            borders.append((('h', cx, cy), True))
+        if cy > 0:
+            borders.append((('h', cx, cy - 1), False))
+        return borders
+
+    def _cluster_edges(self, cluster):
+        edges = self._edges.get(cluster)
+        if edges is not None:
+            return edges
+        edges = {}
+        for key, first_side in self._cluster_borders(cluster):
+            for tile_a, tile_b in self._border(key):
+                entrance, other = (tile_a, tile_b) if first_side else (tile_b, tile_a)
+                edges.setdefault(entrance, []).append((other, ORTHOGONAL_COST))
+
+        entrances = list(edges)
+        x0, y0, x1, y1 = self._bounds(cluster)
+        if len(entrances) > 1 and self.game_map.walkable_grid[x0:x1, y0:y1].all():
+            # Cluster sans obstacle : la distance octile est exacte
+            for position, entrance in enumerate(entrances[:-1]):
+                for tile in entrances[position + 1:]:
+                    cost = heuristic(entrance, tile)
+                    edges[entrance].append((tile, cost))
+                    edges[tile].append((entrance, cost))
+        elif len(entrances) > 1:
+            walkable, stride, x0, y0 = self._local_grid(cluster)
+            index = {(x - x0 + 1) * stride + (y - y0 + 1): (x, y) for x, y in entrances}
+            for position, entrance in enumerate(entrances[:-1]):
+                # Distances symétriques : chaque paire n'est calculée qu'une fois
+                later = set(entrances[position + 1:])
+                targets = {i: tile for i, tile in index.items() if tile in later}
+                source = (entrance[0] - x0 + 1) * stride + (entrance[1] - y0 + 1)
+                for tile, cost in _dijkstra(walkable, stride, source, targets).items():
+                    edges[entrance].append((tile, cost))
+                    edges[tile].append((entrance, cost))
+
+        self._edges[cluster] = edges
+        self.stats['clusters_built'] += 1
+        return edges
+
+    def _connect(self, tile, cluster):
+        """Coût de tile vers chaque entrée atteignable de son cluster."""
+        edges = self._cluster_edges(cluster)
+        walkable, stride, x0, y0 = self._local_grid(cluster)
+        targets = {(x - x0 + 1) * stride + (y - y0 + 1): (x, y) for x, y in edges if (x, y) != tile}
+        source = (tile[0] - x0 + 1) * stride + (tile[1] - y0 + 1)
+        return _dijkstra(walkable, stride, source, targets)
+
+    def invalidate_tiles(self, tiles):
+        """Oublie les clusters et frontières touchés par un changement de praticabilité."""
+        size = self.cluster_size
+        for x, y in tiles:
+            cx, cy = x // size, y // size
+            self._edges.pop((cx, cy), None)
+            if x % size == size - 1 and cx + 1 < self.clusters_x:
+                self._borders.pop(('v', cx, cy), None)
+                self._edges.pop((cx + 1, cy), None)
+            if x % size == 0 and cx > 0:
+                self._borders.pop(('v', cx - 1, cy), None)
+                self._edges.pop((cx - 1, cy), None)
+            if y % size == size - 1 and cy + 1 < self.clusters_y:
+                self._borders.pop(('h', cx, cy), None)
+                self._edges.pop((cx, cy + 1), None)
+            if y % size == 0 and cy > 0:
+                self._borders.pop(('h', cx, cy - 1), None)
+                self._edges.pop((cx, cy - 1), None)
+
+    # ---------------- Recherche abstraite ----------------
+    def find_route(self, start, goal):
+        """
+        Route de start à goal (tuiles entières) sur le graphe abstrait : la
+        liste des tuiles d'entrée dans chaque cluster traversé, terminée par
+        goal. Retourne None si goal n'est pas atteignable.
+        """
+        self.stats['routes'] += 1
+        start_cluster = self.cluster_of(start)
+        goal_cluster = self.cluster_of(goal)
+        start_edges = list(self._connect(start, start_cluster).items())
+        goal_edges = self._connect(goal, goal_cluster)
+        if start_cluster == goal_cluster:
+            walkable, stride, x0, y0 = self._local_grid(start_cluster)
+            direct = _dijkstra(walkable, stride, (start[0] - x0 + 1) * stride + (start[1] - y0 + 1),
+                               {(goal[0] - x0 + 1) * stride + (goal[1] - y0 + 1): goal})
+            start_edges.extend(direct.items())
+
+        start_h = heuristic(start, goal)
+        open_heap = [(start_h, start_h, 0, start)]
+        g_score = {start: 0}
+        came_from = {}
+        closed = set()
+        counter = 0
+        expansions = 0
+        while open_heap:
+            _, _, _, current = heapq.heappop(open_heap)
+            if current == goal:
+                break
+            if current in closed:
+                continue
+            closed.add(current)
+            expansions += 1
+
+            neighbors = self._cluster_edges(self.cluster_of(current)).get(current, [])
+            if current == start:
+                neighbors = neighbors + start_edges
+            goal_cost = goal_edges.get(current)
+            if goal_cost is not None:
+                neighbors = neighbors + [(goal, goal_cost)]
+
+            g = g_score[current]
+            for neighbor, cost in neighbors:
+                if neighbor in closed:
+                    continue
+                tentative_g = g + cost
+                if tentative_g < g_score.get(neighbor, tentative_g + 1):
+                    g_score[neighbor] = tentative_g
+                    came_from[neighbor] = current
+                    h = heuristic(neighbor, goal)
+                    counter += 1
+                    heapq.heappush(open_heap, (tentative_g + h, h, counter, neighbor))
+        self.stats['abstract_expansions'] += expansions
+
+        if goal not in came_from and goal != start:
+            return None
+        nodes = []
+        current = goal
+        while current in came_from:
+            nodes.append(current)
+            current = came_from[current]
+        nodes.reverse()
+
+        # Ne garder que l'entrée dans chaque nouveau cluster : un segment = une traversée
+        route = []
+        previous_cluster = start_cluster
+        for node in nodes[:-1]:
+            cluster = self.cluster_of(node)
+            if cluster != previous_cluster:
+                route.append(node)
+                previous_cluster = cluster
+        route.append(goal)
+        return route
+
+
+def needs_hierarchy(rounded_start, goal_tile, game_map):
+    """Vrai si le trajet est assez long, et sans ligne de vue, pour passer par le graphe de clusters."""
+    return heuristic(rounded_start, goal_tile) >= HIERARCHICAL_MIN_DISTANCE * ORTHOGONAL_COST \
+        and not line_of_sight(rounded_start, goal_tile, game_map)
+
+
+def plan_path(start, float_goal, game_map):
+    """
+    Chemin vers float_goal, hiérarchique sur les longues distances.
+    Retourne (path, route) : path est le chemin complet (a_star) ou le premier
+    segment affiné, route les points de passage restants à affiner avec
+    next_segment (vide quand path va jusqu'au but).
+    """
+    rounded_start = (round(start[0]), round(start[1]))
+    goal_tile, _ = resolve_goal(start, float_goal, game_map)
+    if not goal_tile:
+        return [], []
+    if not needs_hierarchy(rounded_start, goal_tile, game_map):
+        return a_star(start, float_goal, game_map), []
+
+    route = game_map.get_path_hierarchy().find_route(rounded_start, goal_tile)
+    if route is None:
+        return [], []
+    return next_segment(start, route, float_goal, game_map), route
+
+
+def next_segment(position, route, float_goal, game_map):
+    """
+    Affine (et retire de route) le prochain point de passage depuis position.
+    Le dernier segment passe par a_star pour finir sur float_goal. Un chemin
+    vide signale un segment devenu impraticable : la route est à replanifier.
+    """
+    waypoint = route.pop(0)
+    if not route:
+        return a_star(position, float_goal, game_map, max_expansions=SEGMENT_MAX_EXPANSIONS)
+    rounded_position = (round(position[0]), round(position[1]))
+    path, _ = search_path(rounded_position, waypoint, game_map, max_expansions=SEGMENT_MAX_EXPANSIONS)
+    return smooth_path(rounded_position, path, game_map)
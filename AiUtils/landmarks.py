@@ -0,0 +1,213 @@
+"""
+Heuristique ALT (A*, Landmarks, inégalité triangulaire) pour search_path.
+
+Pour quelques cases repères L (coins de la carte, TownCentres), une table
+donne la distance de L à chaque case. Pour tout chemin de v à g,
+|d(L, g) - d(L, v)| <= coût(v, g) : ce minorant, souvent bien meilleur que
+l'octile quand des forêts obligent à contourner, est admissible et cohérent
+dès que |d(L, v) - d(L, w)| <= coût(v, w) pour chaque pas possible (v, w).
+
+Cette condition suffit : les tables n'ont pas besoin d'être exactes. Un
+obstacle ajouté ne fait que retirer des pas, elle reste vraie ; une case
+libérée ajoute des pas, et les tables sont relâchées (Dijkstra limité aux
+distances qui diminuent) depuis les cases modifiées, à la question suivante.
+
+Les tables sont calculées à la demande, une à la fois, par un Dijkstra
+reprenable qui avance de ALT_BUILD_BUDGET par tick (GameMap.patch) sur la
+praticabilité bordée de la carte (GameMap.get_padded_walkable). Un obstacle
+posé en cours de calcul ne fait que retirer des pas ; les cases libérées
+pendant le calcul sont relâchées une fois la table finie.
+"""
+import heapq
+import time
+
+import numpy as np
+
+from AiUtils.aStar import ORTHOGONAL_COST, DIAGONAL_COST, grid_steps
+
+# Nombre de repères (coins compris) ; 0 désactive l'heuristique
+ALT_LANDMARKS = 8
+# Repères retenus pour une recherche : ceux qui minorent le mieux le trajet départ -> but
+ALT_ACTIVE_LANDMARKS = 3
+# Distance (en cases, octile) en deçà de laquelle l'octile suffit
+ALT_MIN_DISTANCE = 24
+# Temps de calcul des tables accordé par tick (en secondes)
+ALT_BUILD_BUDGET = 0.002
+
+_INFINITY = 1 << 30
+
+
+def _relax(distances, heap, walkable, stride, deadline=None):
+    """
+    Dijkstra (même codage de grille que search_path) depuis les noeuds du tas,
+    sans jamais augmenter une distance. S'arrête à deadline si elle est donnée ;
+    retourne True quand le tas est vidé.
+    """
+    steps = grid_steps(stride)
+    pops = 0
+    while heap:
+        pops += 1
+        if deadline is not None and not pops & 255 and time.perf_counter() >= deadline:
+            return False
+        cost, current = heapq.heappop(heap)
+        if cost > distances[current]:
+            continue
+        for offset, step_cost, side_a, side_b in steps:
+            neighbor = current + offset
+            if not walkable[neighbor]:
+                continue
+            if side_a and not (walkable[current + side_a] and walkable[current + side_b]):
+                continue
+            new_cost = cost + step_cost
+            if new_cost < distances[neighbor]:
+                distances[neighbor] = new_cost
+                heapq.heappush(heap, (new_cost, neighbor))
+    return True
+
+
+class LandmarkTables:
+    """Tables de distances aux repères d'une GameMap."""
+
+    def __init__(self, game_map, count=ALT_LANDMARKS):
+        self.game_map = game_map
+        self.width = game_map.num_tiles_x
+        self.height = game_map.num_tiles_y
+        self.stride = self.height + 2
+        self.landmarks = self._choose_landmarks(count)
+        # Tables terminées : tableaux int32 indexés par noeud, et leur memoryview
+        self.tables = []
+        self._views = []
+        # Table en cours : (distances, tas, praticabilité figée) ; cases modifiées depuis son lancement
+        self.build = None
+        self.build_changed = set()
+        # Cases dont la praticabilité a changé depuis le dernier relâchement des tables terminées
+        self.changed = set()
+        self.stats = {'tables_built': 0, 'relaxations': 0, 'queries': 0, 'used': 0}
+
+    def _choose_landmarks(self, count):
+        """Coins de la carte, puis TownCentres les plus éloignés des repères déjà choisis."""
+        if count <= 0 or self.width <= 0 or self.height <= 0:
+            return []
+        game_map = self.game_map
+        candidates = [(0, 0), (self.width - 1, 0), (0, self.height - 1), (self.width - 1, self.height - 1)]
+        chosen = []
+        for corner in candidates:
+            tile = self._nearest_walkable(corner)
+            if tile and tile not in chosen:
+                chosen.append(tile)
+        town_centres = []
+        for player in getattr(game_map, 'players', None) or []:
+            for building in player.buildings:
+                if type(building).__name__ == "TownCentre" and building.isAlive():
+                    tile = self._nearest_walkable((round(building.x), round(building.y)))
+                    if tile and tile not in chosen and tile not in town_centres:
+                        town_centres.append(tile)
+        while town_centres and len(chosen) < count:
+            farthest = max(town_centres, key=lambda tile: (min(abs(tile[0] - x) + abs(tile[1] - y) for x, y in chosen), tile))
+            town_centres.remove(farthest)
+            chosen.append(farthest)
+        return chosen[:count]
+
+    def _nearest_walkable(self, tile):
+        """Case praticable la plus proche de tile (anneaux de distance croissante), ou None."""
+        walkable_view = self.game_map._walkable_view
+        x, y = tile
+        for radius in range(max(self.width, self.height)):
+            for dx in range(-radius, radius + 1):
+                for dy in range(-radius, radius + 1):
+                    if max(abs(dx), abs(dy)) != radius:
+                        continue
+                    nx, ny = x + dx, y + dy
+                    if 0 <= nx < self.width and 0 <= ny < self.height and walkable_view[nx, ny]:
+                        return (nx, ny)
+        return None
+
+    def _node(self, tile):
+        return (tile[0] + 1) * self.stride + tile[1] + 1
+
+    def invalidate_tiles(self, tiles):
+        """Note les cases dont la praticabilité a changé (relâchement à la prochaine question)."""
+        self.changed.update(tiles)
+        if self.build is not None:
+            self.build_changed.update(tiles)
+
+    def build_step(self, budget=ALT_BUILD_BUDGET):
+        """Fait avancer le calcul de la prochaine table pendant budget secondes."""
+        if len(self.tables) >= len(self.landmarks):
+            return
+        deadline = time.perf_counter() + budget
+        if self.build is None:
+            source = self._node(self.landmarks[len(self.tables)])
+            distances = [_INFINITY] * ((self.width + 2) * self.stride)
+            distances[source] = 0
+            self.build = (distances, [(0, source)])
+            self.build_changed = set()
+        distances, heap = self.build
+        if not _relax(distances, heap, self.game_map.get_padded_walkable(), self.stride, deadline):
+            return
+        table = np.array(distances, dtype=np.int32)
+        self.build = None
+        # Cases libérées pendant le calcul : relâcher depuis la praticabilité actuelle
+        self._relax_tables([memoryview(table)], self.build_changed)
+        self.build_changed = set()
+        self.tables.append(table)
+        self._views.append(memoryview(table))
+        self.stats['tables_built'] += 1
+
+    def _relax_tables(self, views, tiles):
+        """Rétablit |d(v) - d(w)| <= coût(v, w) autour des cases libérées parmi tiles."""
+        walkable_view = self.game_map._walkable_view
+        seeds = set()
+        for x, y in tiles:
+            if 0 <= x < self.width and 0 <= y < self.height and walkable_view[x, y]:
+                # Les pas nouveaux partent de la case libérée ou la longent (diagonales de ses voisines)
+                for dx in (-1, 0, 1):
+                    for dy in (-1, 0, 1):
+                        seeds.add(self._node((x + dx, y + dy)))
+        if not seeds:
+            return
+        walkable = self.game_map.get_padded_walkable()
+        for view in views:
+            heap = [(view[node], node) for node in seeds if walkable[node] and view[node] < _INFINITY]
+            heapq.heapify(heap)
+            _relax(view, heap, walkable, self.stride)
+        self.stats['relaxations'] += 1
+
+    def bounds(self, start, goal):
+        """
+        Repères à utiliser pour une recherche de start vers goal : liste de
+        (d(L, goal), table) pour ALT_ACTIVE_LANDMARKS repères au plus, ou None
+        si aucune table ne minore le trajet mieux que l'octile.
+        """
+        if not self._views:
+            return None
+        if not (0 <= start[0] < self.width and 0 <= start[1] < self.height
+                and 0 <= goal[0] < self.width and 0 <= goal[1] < self.height):
+            return None
+        dx, dy = abs(start[0] - goal[0]), abs(start[1] - goal[1])
+        if max(dx, dy) < ALT_MIN_DISTANCE:
+            return None
+        if self.changed:
+            self._relax_tables(self._views, self.changed)
+            self.changed.clear()
+        self.stats['queries'] += 1
+        start_node, goal_node = self._node(start), self._node(goal)
+        octile = ORTHOGONAL_COST * max(dx, dy) + (DIAGONAL_COST - ORTHOGONAL_COST) * min(dx, dy)
+        ranked = []
+        for view in self._views:
+            goal_distance = view[goal_node]
+            start_distance = view[start_node]
+            if goal_distance >= _INFINITY or start_distance >= _INFINITY:
+                continue
+            ranked.append((abs(goal_distance - start_distance), goal_distance, view))
+        ranked.sort(key=lambda entry: entry[0], reverse=True)
+        if not ranked or ranked[0][0] <= octile:
+            return None
+        self.stats['used'] += 1
+        return [(goal_distance, view) for _, goal_distance, view in ranked[:ALT_ACTIVE_LANDMARKS]]
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['landmarks'] = len(self.landmarks)
+        stats['ready'] = len(self.tables)
+        return stats
@@ -0,0 +1,233 @@
+"""
+File de demandes de chemin amortie sur plusieurs ticks.
+
+Unit.set_destination et les poursuites ne calculent plus leur chemin tout
+de suite : l'unité dépose une demande (unit.path_request) et attend. À la
+fin des mises à jour de GameMap.patch, process sert les demandes dans
+l'ordre de priorité (unités sélectionnées par le joueur d'abord, puis
+unités à l'arrêt avant les poursuites, qui continuent d'avancer sur leur
+ancien chemin, puis ordre d'arrivée) jusqu'à épuiser PATH_REQUEST_BUDGET ;
+le reste attend le tick suivant. Les demandes identiques (même case de départ, même but, même
+mode) ne donnent lieu qu'à une seule recherche.
+
+Si la carte a des processus de recherche (GameMap.enable_path_workers), les
+demandes qui exigent une vraie recherche A* leur sont confiées par lots et
+servies à un tick suivant, quand le résultat est revenu.
+"""
+import heapq
+import time
+from itertools import count
+
+from AiUtils.aStar import complete_a_star
+from AiUtils.path_workers import PATH_WORKER_BATCH, PATH_WORKER_MAX_IN_FLIGHT
+
+PRIORITY_PLAYER = 0
+PRIORITY_BOT = 1
+# Temps de calcul de chemins accordé par tick (en secondes) ; au moins une recherche est toujours servie
+PATH_REQUEST_BUDGET = 0.004
+
+# Modes de demande : 'route' remplace le chemin (set_destination),
+# 'chase' garde la case en cours et remplace la suite (poursuite d'une cible)
+ROUTE = 'route'
+CHASE = 'chase'
+
+# Une poursuite ne refait son chemin que si la cible s'est éloignée du but qui
+# a servi à le calculer de plus de max(CHASE_REPATH_DISTANCE, CHASE_REPATH_RATIO * distance à la cible)
+CHASE_REPATH_DISTANCE = 1.5
+CHASE_REPATH_RATIO = 0.2
+
+
+class PathRequestQueue:
+    """Demandes de chemin en attente sur une GameMap."""
+
+    def __init__(self, game_map, budget=PATH_REQUEST_BUDGET):
+        self.game_map = game_map
+        self.budget = budget
+        # (priorité, poursuite, ordre d'arrivée, clé) ; les entrées dont la clé est déjà servie sont ignorées
+        self.heap = []
+        # clé -> [priorité, destination, [(unité, ticket), ...]]
+        self.requests = {}
+        # entity_id -> clé de la demande en attente de l'unité
+        self.pending = {}
+        self.counter = count()
+        # Lots confiés à game_map.path_workers : (future, pool, version, [(query, destination, mode, [(unité, ticket)])])
+        self.in_flight = []
+        self.stats = {'submitted': 0, 'merged': 0, 'searches': 0, 'delivered': 0, 'carried_over': 0,
+                      'offloaded': 0, 'retried': 0}
+
+    def __getstate__(self):
+        # Les calculs en cours ne survivent pas à la sauvegarde : rebuild_indexes
+        # réinscrit les unités d'après leur path_request
+        state = self.__dict__.copy()
+        state['in_flight'] = []
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__.setdefault('in_flight', [])
+        for key in ('offloaded', 'retried'):
+            self.stats.setdefault(key, 0)
+
+    def __len__(self):
+        return len(self.requests)
+
+    def _priority(self, unit):
+        game_state = self.game_map.game_state
+        selected = game_state.get('selected_units') if game_state else None
+        if selected and unit in selected:
+            return PRIORITY_PLAYER
+        return PRIORITY_BOT
+
+    def submit(self, unit, destination, mode=ROUTE):
+        """Enregistre une demande de chemin de unit vers destination (remplace la précédente)."""
+        destination = (destination[0], destination[1])
+        ticket = (mode, destination)
+        unit.path_request = ticket
+        self._enqueue(unit, ticket)
+
+    def _enqueue(self, unit, ticket):
+        mode, destination = ticket
+        key = (round(unit.x), round(unit.y), destination, mode)
+        priority = self._priority(unit)
+        self.stats['submitted'] += 1
+        self._withdraw(unit)
+        self.pending[unit.entity_id] = key
+        request = self.requests.get(key)
+        if request is None:
+            self.requests[key] = [priority, destination, [(unit, ticket)]]
+            heapq.heappush(self.heap, (priority, mode == CHASE, next(self.counter), key))
+            return
+        self.stats['merged'] += 1
+        request[2].append((unit, ticket))
+        if priority < request[0]:
+            request[0] = priority
+            heapq.heappush(self.heap, (priority, mode == CHASE, next(self.counter), key))
+
+    def _withdraw(self, unit):
+        """Retire unit de sa demande précédente ; une demande sans unité est oubliée."""
+        key = self.pending.pop(unit.entity_id, None)
+        request = self.requests.get(key)
+        if request is None:
+            return
+        request[2] = [(other, ticket) for other, ticket in request[2] if other is not unit]
+        if not request[2]:
+            del self.requests[key]
+            # Les entrées du tas pointant vers des demandes oubliées sont ignorées ; compacter s'il en déborde
+            if len(self.heap) > 2 * len(self.requests) + 64:
+                self.heap = [entry for entry in self.heap if entry[-1] in self.requests]
+                heapq.heapify(self.heap)
+
+    def resume(self, unit):
+        """Réinscrit la demande en attente de unit (après un rechargement de la carte)."""
+        self._enqueue(unit, unit.path_request)
+
+    def process(self):
+        """
+        Sert les demandes jusqu'à épuiser le budget du tick.
+        Retourne les unités qui ont reçu un chemin.
+        """
+        delivered = []
+        heap = self.heap
+        started = time.perf_counter()
+        searches = 0
+        workers = self.game_map.path_workers
+        offloaded = []
+        if self.in_flight:
+            self._collect(delivered)
+        while heap:
+            if searches and time.perf_counter() - started >= self.budget:
+                break
+            if workers and self._in_flight_count() + len(offloaded) >= workers.processes * PATH_WORKER_MAX_IN_FLIGHT:
+                break
+            key = heapq.heappop(heap)[-1]
+            request = self.requests.pop(key, None)
+            if request is None:
+                continue
+            # Unités toujours en attente de cette demande (ni annulée, ni remplacée, ni morte)
+            waiting = []
+            for unit, ticket in request[2]:
+                if self.pending.get(unit.entity_id) == key:
+                    del self.pending[unit.entity_id]
+                if unit.path_request is ticket and unit.isAlive():
+                    waiting.append(unit)
+            if not waiting:
+                continue
+            mode = key[3]
+            searches += 1
+            if workers:
+                path, route, query = waiting[0].plan_request(request[1], self.game_map, mode)
+                if query is not None:
+                    if not self.game_map.get_components().separated(query[2], query[3]):
+                        offloaded.append((query, request[1], mode, [(unit, unit.path_request) for unit in waiting]))
+                        continue
+                    path = []
+            elif mode == CHASE:
+                path, route = waiting[0].find_path(request[1], self.game_map), None
+            else:
+                path, route = waiting[0].compute_destination(request[1], self.game_map)
+            for unit in waiting:
+                unit.receive_path(list(path), list(route) if route else None, request[1], mode)
+                delivered.append(unit)
+        if offloaded:
+            self._offload(workers, offloaded)
+        self.stats['searches'] += searches
+        self.stats['delivered'] += len(delivered)
+        self.stats['carried_over'] += len(self.requests)
+        return delivered
+
+    def _in_flight_count(self):
+        return sum(len(items) for _, _, _, items in self.in_flight)
+
+    def _offload(self, workers, items):
+        """Confie la recherche de ces demandes aux processus, par lots de PATH_WORKER_BATCH."""
+        for i in range(0, len(items), PATH_WORKER_BATCH):
+            batch = items[i:i + PATH_WORKER_BATCH]
+            future = workers.submit([(query[2], query[3]) for query, _, _, _ in batch])
+            self.in_flight.append((future, workers, workers.version, batch))
+        self.stats['offloaded'] += len(items)
+
+    def _collect(self, delivered):
+        """Distribue les résultats revenus des processus ; une demande dont le résultat est perdu ou périmé est réinscrite."""
+        game_map = self.game_map
+        walkable_position = game_map.walkable_position
+        still_running = []
+        for entry in self.in_flight:
+            future, workers, version, batch = entry
+            if not future.done():
+                if workers is game_map.path_workers:
+                    still_running.append(entry)
+                    continue
+                # Pool arrêté entre-temps : le résultat n'arrivera pas
+                results = None
+            elif future.cancelled() or future.exception() is not None:
+                results = None
+            else:
+                results = future.result()
+            stale = workers is not game_map.path_workers or version != workers.version
+            for index, (query, destination, mode, tickets) in enumerate(batch):
+                waiting = [(unit, ticket) for unit, ticket in tickets if unit.path_request is ticket and unit.isAlive()]
+                if not waiting:
+                    continue
+                path = None
+                if results is not None:
+                    path, status = results[index]
+                    if stale and status == 'found' and not all(walkable_position(tile) for tile in path):
+                        # Obstacle apparu sur le chemin pendant le calcul
+                        path = None
+                if path is None:
+                    self.stats['retried'] += 1
+                    for unit, ticket in waiting:
+                        self._enqueue(unit, ticket)
+                    continue
+                if status == 'found':
+                    path = complete_a_star(query, path, game_map)
+                for unit, _ in waiting:
+                    unit.receive_path(list(path), None, destination, mode)
+                    delivered.append(unit)
+        self.in_flight = still_running
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['pending'] = len(self.requests)
+        stats['in_flight'] = self._in_flight_count()
+        return stats
@@ -0,0 +1,109 @@
+"""
+Ligne de vue et lissage des chemins.
+
+search_path rend une case par pas : l'unité avance de centre de case en
+centre de case en changeant d'orientation à chaque coude. line_of_sight
+parcourt (DDA sur la grille) les cases traversées par un segment et vérifie
+qu'elles sont toutes praticables ; smooth_path ne garde d'un chemin que les
+points de passage qui ne se voient pas directement (string pulling). Un but
+visible depuis le départ n'a plus besoin de recherche du tout (a_star).
+
+Comme pour les diagonales de search_path, un segment qui passe par le coin
+de deux cases (à LOS_CORNER_MARGIN près) exige que les deux cases qu'il
+longe soient libres : pas de coupe de coin.
+"""
+import math
+
+# Distance (en cases) en deçà de laquelle un segment est considéré passer par un coin de case
+LOS_CORNER_MARGIN = 0.1
+
+
+def line_of_sight(a, b, game_map, margin=LOS_CORNER_MARGIN):
+    """Vrai si une unité peut aller en ligne droite de a à b (points flottants) sans quitter les cases praticables."""
+    walkable = game_map._walkable_view
+    width, height = game_map.num_tiles_x, game_map.num_tiles_y
+
+    def free(x, y):
+        return 0 <= x < width and 0 <= y < height and walkable[x, y]
+
+    x0, y0 = a
+    x1, y1 = b
+    cx, cy = round(x0), round(y0)
+    if not free(cx, cy):
+        return False
+    dx, dy = x1 - x0, y1 - y0
+    length = math.hypot(dx, dy)
+    if length == 0:
+        return True
+
+    # Paramètre t (0 en a, 1 en b) du prochain passage de frontière de case sur chaque axe
+    step_x = 1 if dx > 0 else -1
+    step_y = 1 if dy > 0 else -1
+    if dx:
+        t_max_x = (cx + 0.5 * step_x - x0) / dx
+        t_delta_x = 1 / abs(dx)
+    else:
+        t_max_x = t_delta_x = math.inf
+    if dy:
+        t_max_y = (cy + 0.5 * step_y - y0) / dy
+        t_delta_y = 1 / abs(dy)
+    else:
+        t_max_y = t_delta_y = math.inf
+    tolerance = margin / length
+
+    while t_max_x <= 1 or t_max_y <= 1:
+        if abs(t_max_x - t_max_y) <= tolerance:
+            # Passage par un coin : les deux cases longées doivent être libres
+            if not (free(cx + step_x, cy) and free(cx, cy + step_y)):
+                return False
+            cx += step_x
+            cy += step_y
+            t_max_x += t_delta_x
+            t_max_y += t_delta_y
+        elif t_max_x < t_max_y:
+            cx += step_x
+            t_max_x += t_delta_x
+        else:
+            cy += step_y
+            t_max_y += t_delta_y
+        if not free(cx, cy):
+            return False
+    return True
+
+
+def smooth_path(start, path, game_map):
+    """
+    Réduit path (suite de points depuis start, start exclu) aux points de
+    passage indispensables : depuis chaque point gardé, on saute au point le
+    plus lointain encore visible (recherche exponentielle puis dichotomique,
+    O(log n) tests de visibilité par point gardé). Le dernier point est
+    toujours conservé.
+    """
+    if len(path) < 2:
+        return list(path)
+    points = [start] + list(path)
+    last = len(points) - 1
+    smoothed = []
+    anchor = 0
+    while anchor < last:
+        # Deux points consécutifs du chemin se voient toujours
+        visible, hidden = anchor + 1, None
+        span = 2
+        while visible < last:
+            probe = min(anchor + span, last)
+            if line_of_sight(points[anchor], points[probe], game_map):
+                visible = probe
+                span *= 2
+            else:
+                hidden = probe
+                break
+        if hidden is not None:
+            while hidden - visible > 1:
+                middle = (visible + hidden) // 2
+                if line_of_sight(points[anchor], points[middle], game_map):
+                    visible = middle
+                else:
+                    hidden = middle
+        smoothed.append(points[visible])
+        anchor = visible
+    return smoothed
@@ -0,0 +1,109 @@
+"""
+Recherches A* dans des processus séparés (optionnel, GameMap.enable_path_workers).
+
+La praticabilité de la carte est publiée, bordée et aplatie comme
+GameMap.get_padded_walkable, dans un segment multiprocessing.shared_memory
+que les processus du pool passent tel quel à search_grid, sans copie :
+seules les tuiles de départ et d'arrivée des requêtes traversent les
+processus. Chaque changement d'obstacle (GameMap._walkability_changed) est
+recopié dans le segment et incrémente version ; un résultat calculé sur une
+version antérieure est revérifié par le thread du jeu avant d'être servi.
+
+Le thread du jeu garde tout ce qui demande la GameMap (cache, but
+praticable, ligne de vue, composantes, lissage) : PathRequestQueue ne confie
+au pool que la recherche elle-même (search_grid), par lots de
+PATH_WORKER_BATCH, et distribue les chemins aux ticks suivants.
+"""
+import atexit
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from AiUtils.aStar import search_grid
+
+# Requêtes envoyées ensemble à un processus
+PATH_WORKER_BATCH = 16
+# Requêtes en cours de calcul au plus, par processus
+PATH_WORKER_MAX_IN_FLIGHT = 4 * PATH_WORKER_BATCH
+
+# Praticabilité bordée partagée et taille de la carte, attachées une fois par processus du pool
+_worker_walkable = None
+_worker_shape = None
+_worker_segment = None
+
+
+def _attach(name, shape):
+    global _worker_walkable, _worker_shape, _worker_segment
+    _worker_segment = shared_memory.SharedMemory(name=name)
+    _worker_walkable = _worker_segment.buf
+    _worker_shape = shape
+
+
+def _search_batch(jobs):
+    """Exécuté dans un processus du pool : [(départ, but), ...] -> [(chemin, statut), ...]."""
+    width, height = _worker_shape
+    return [search_grid(_worker_walkable, width, height, start, goal) for start, goal in jobs]
+
+
+class PathWorkerPool:
+    """Pool de processus de recherche et praticabilité partagée d'une GameMap."""
+
+    def __init__(self, game_map, processes):
+        self.game_map = game_map
+        self.processes = processes
+        self.version = 0
+        self.segment = None
+        self.executor = None
+        self._open()
+
+    def _open(self):
+        game_map = self.game_map
+        self.shape = (max(game_map.num_tiles_x, 0), max(game_map.num_tiles_y, 0))
+        padded_shape = (self.shape[0] + 2, self.shape[1] + 2)
+        self.segment = shared_memory.SharedMemory(create=True, size=padded_shape[0] * padded_shape[1])
+        # Bordure bloquée (mise à zéro une fois) et intérieur recopié de walkable_grid
+        self.padded = np.ndarray(padded_shape, dtype=np.uint8, buffer=self.segment.buf)
+        self.padded[:] = 0
+        self.grid = self.padded[1:-1, 1:-1]
+        self.grid[:] = game_map.walkable_grid
+        self.executor = ProcessPoolExecutor(self.processes, initializer=_attach,
+                                            initargs=(self.segment.name, self.shape))
+        # Un seul enregistrement par pool ouvert, retiré par close
+        atexit.register(self.close)
+
+    def publish(self):
+        """Recopie toute la praticabilité (carte rechargée) ; change de segment si la taille a changé."""
+        game_map = self.game_map
+        if self.shape != (game_map.num_tiles_x, game_map.num_tiles_y):
+            self.close()
+            self._open()
+        else:
+            self.grid[:] = game_map.walkable_grid
+        self.version += 1
+
+    def invalidate_tiles(self, tiles):
+        """Recopie la praticabilité de ces tuiles dans le segment partagé."""
+        walkable_view = self.game_map._walkable_view
+        width, height = self.shape
+        grid = self.grid
+        for x, y in tiles:
+            if 0 <= x < width and 0 <= y < height:
+                grid[x, y] = walkable_view[x, y]
+        self.version += 1
+
+    def submit(self, jobs):
+        """Lance la recherche de jobs [(départ, but), ...] ; retourne un Future de la liste des résultats."""
+        return self.executor.submit(_search_batch, jobs)
+
+    def close(self):
+        """Arrête les processus et libère le segment partagé."""
+        atexit.unregister(self.close)
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+        if self.segment is not None:
+            self.grid = self.padded = None
+            self.segment.close()
+            self.segment.unlink()
+            self.segment = None
@@ -0,0 +1,64 @@
+"""
+Recherche d'emplacements de bâtiments sur une grille d'occupation.
+
+nearest_free_footprint calcule la table des sommes cumulées (summed-area
+table) des cases occupées de la seule fenêtre de recherche : le nombre de
+cases occupées de chaque emprise size x size s'y lit en quatre tranches, pour
+toutes les origines candidates à la fois, au lieu d'un test de l'emprise par
+candidate. La table est refaite à chaque recherche à partir de la grille
+courante : elle n'a jamais à être tenue à jour, et une fenêtre de quelques
+dizaines de cases de côté coûte moins qu'une table de toute la carte
+recalculée après chaque chantier.
+
+Le coût est fixe (quelques dizaines de microsecondes) : pour les premiers
+anneaux, où la plupart des recherches aboutissent, des tests directs case par
+case restent moins chers (voir WorldSnapshot.nearest_buildable).
+"""
+import numpy as np
+
+# Clé d'ordre de parcours de chaque décalage (dx, dy) de la fenêtre, par (rayon, premier anneau)
+_order_keys = {}
+
+
+def _order_key(radius, first_ring):
+    """
+    Tableau (2 * radius + 1)² : rang de chaque décalage dans le parcours des
+    anneaux (anneau, puis dx, puis dy) ; les anneaux avant first_ring, exclus,
+    ont le rang maximal.
+    """
+    key = _order_keys.get((radius, first_ring))
+    if key is None:
+        side = 2 * radius + 1
+        offsets = np.arange(-radius, radius + 1)
+        ring = np.maximum(np.abs(offsets)[:, None], np.abs(offsets)[None, :])
+        key = (ring * side + offsets[:, None] + radius) * side + offsets[None, :] + radius
+        key[ring < first_ring] = side ** 3
+        _order_keys[(radius, first_ring)] = key
+    return key
+
+
+def nearest_free_footprint(occupancy, x, y, size, radius, first_ring=1):
+    """
+    Origine de l'emprise size x size sans case occupée la plus proche de
+    (x, y), de first_ring à radius cases (distance de Tchebychev), ou None. À
+    distance égale, dans l'ordre de parcours des anneaux (dx puis dy
+    croissants). occupancy est indexée [x, y] ; l'emprise doit tenir dans la
+    grille.
+    """
+    width, height = occupancy.shape
+    # Origines candidates de la fenêtre, dans la grille
+    x0, x1 = max(x - radius, 0), min(x + radius, width - size)
+    y0, y1 = max(y - radius, 0), min(y + radius, height - size)
+    if x0 > x1 or y0 > y1:
+        return None
+    table = np.zeros((x1 - x0 + size + 1, y1 - y0 + size + 1), dtype=np.int32)
+    np.cumsum(np.cumsum(occupancy[x0:x1 + size, y0:y1 + size] != 0, axis=0, dtype=np.int32), axis=1,
+              out=table[1:, 1:])
+    occupied = table[size:, size:] - table[:-size, size:] - table[size:, :-size] + table[:-size, :-size]
+    sentinel = (2 * radius + 1) ** 3
+    order = _order_key(radius, first_ring)[x0 - x + radius:x1 - x + radius + 1, y0 - y + radius:y1 - y + radius + 1]
+    key = np.where(occupied == 0, order, sentinel)
+    best = np.unravel_index(int(np.argmin(key)), key.shape)
+    if key[best] == sentinel:
+        return None
+    return (x0 + int(best[0]), y0 + int(best[1]))
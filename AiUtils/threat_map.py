@@ -0,0 +1,146 @@
+"""
+Carte de menace des équipes, pour les décisions des bots.
+
+La carte est découpée en cellules de THREAT_CELL_SIZE cases ; chaque unité
+militaire vivante (les villageois ne menacent pas) est rangée dans sa
+cellule une fois par instantané. Pour savoir quelles unités ennemies
+menacent des positions (les bâtiments d'une équipe), on compte ces positions
+par cellule (np.bincount), on étale ce compte sur les cellules voisines
+jusqu'à THREAT_RADIUS cases (somme en boîte) et on lit le résultat à la
+cellule de chaque unité : quelques opérations sur des tableaux, au lieu de
+parcourir les unités proches de chaque bâtiment.
+
+Les cellules ne font qu'écarter les unités lointaines : une cellule voisine
+peut être à près de (radius_cells + 1) * THREAT_CELL_SIZE cases. Les unités
+retenues sont ensuite comparées une à une aux positions, à THREAT_RADIUS
+cases au plus (distance euclidienne) : la portée effective est bien
+THREAT_RADIUS.
+
+La même grille sert de carte de force militaire : strength_grid somme, par
+cellule, les points de vie des unités militaires d'une équipe (ou de ses
+ennemis), étalés sur les cellules voisines comme ci-dessus. where_to_defend
+y lit la position d'une équipe la plus menacée, weakest_point celle d'une
+équipe ennemie la moins bien gardée (son front le plus faible). Ces deux
+lectures restent à l'échelle des cellules.
+"""
+import math
+from itertools import chain
+
+import numpy as np
+
+THREAT_CELL_SIZE = 4
+# Distance (en cases, euclidienne) jusqu'à laquelle une unité menace un bâtiment
+THREAT_RADIUS = 5
+# Acronyme des villageois, qui ne comptent pas comme menace
+VILLAGER_ACRONYM = 'v'
+
+
+def _box_sum(grid, radius):
+    """Somme de grid (2D) sur les (2 * radius + 1)² cellules autour de chacune."""
+    for axis in (0, 1):
+        total = grid.copy()
+        for shift in range(1, radius + 1):
+            if axis == 0:
+                total[shift:, :] += grid[:-shift, :]
+                total[:-shift, :] += grid[shift:, :]
+            else:
+                total[:, shift:] += grid[:, :-shift]
+                total[:, :-shift] += grid[:, shift:]
+        grid = total
+    return grid
+
+
+class ThreatMap:
+    """Cellule, position, équipe et identifiant de chaque unité militaire vivante, sur une grille grossière."""
+
+    def __init__(self, width, height, units, cell_size=THREAT_CELL_SIZE, radius=THREAT_RADIUS):
+        """units : unités (ou vues) de toutes les équipes, avec x, y, team, hp, acronym et entity_id."""
+        self.cell_size = cell_size
+        self.radius = radius
+        self.radius_cells = math.ceil(radius / cell_size)
+        self.grid_width = max(1, math.ceil(width / cell_size))
+        self.grid_height = max(1, math.ceil(height / cell_size))
+        # Une ligne par unité militaire vivante : identifiant, équipe, x, y, points de vie
+        rows = [(unit.entity_id, unit.team, unit.x, unit.y, unit.hp) for unit in units
+                if unit.hp > 0 and unit.acronym != VILLAGER_ACRONYM]
+        rows = np.fromiter(chain.from_iterable(rows), dtype=np.float64, count=5 * len(rows)).reshape(-1, 5)
+        self.unit_ids = rows[:, 0].astype(np.int64)
+        self.unit_teams = rows[:, 1].astype(np.int64)
+        self.unit_xs = rows[:, 2]
+        self.unit_ys = rows[:, 3]
+        self.unit_strengths = rows[:, 4]
+        self.unit_cells = self._cells(self.unit_xs, self.unit_ys)
+        # Grilles de force déjà calculées, par (équipe, ennemis ou non)
+        self._strength = {}
+
+    def _cells(self, xs, ys):
+        """Indice à plat de la cellule de chaque position."""
+        cx = (np.asarray(xs, dtype=np.float64) // self.cell_size).astype(np.int64)
+        cy = (np.asarray(ys, dtype=np.float64) // self.cell_size).astype(np.int64)
+        return np.minimum(np.maximum(cx, 0), self.grid_width - 1) * self.grid_height + \
+            np.minimum(np.maximum(cy, 0), self.grid_height - 1)
+
+    def enemies_near(self, team_id, xs, ys, limit=None):
+        """
+        Identifiants des unités ennemies de team_id à THREAT_RADIUS cases au
+        plus d'au moins une des positions (xs, ys), limit au plus.
+        """
+        if not len(xs) or not len(self.unit_ids):
+            return []
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        # Cellules à portée des positions : candidates
+        covered = np.bincount(self._cells(xs, ys), minlength=self.grid_width * self.grid_height)
+        covered = _box_sum(covered.reshape(self.grid_width, self.grid_height), self.radius_cells).ravel()
+        near = np.flatnonzero((covered[self.unit_cells] > 0) & (self.unit_teams != team_id))
+        if not len(near):
+            return []
+        # Distance exacte de chaque candidate à la position la plus proche
+        dx = self.unit_xs[near][:, None] - xs[None, :]
+        dy = self.unit_ys[near][:, None] - ys[None, :]
+        near = near[((dx * dx + dy * dy) <= self.radius * self.radius).any(axis=1)]
+        if limit is not None:
+            near = near[:limit]
+        return self.unit_ids[near].tolist()
+
+    def strength_grid(self, team_id, enemies=False):
+        """
+        Force militaire (points de vie) par cellule, à plat : celle des unités
+        de team_id, ou avec enemies celle de toutes les autres équipes, étalée
+        sur radius_cells cellules autour de chaque unité.
+        """
+        key = (team_id, enemies)
+        grid = self._strength.get(key)
+        if grid is None:
+            mask = self.unit_teams != team_id if enemies else self.unit_teams == team_id
+            grid = np.bincount(self.unit_cells[mask], weights=self.unit_strengths[mask],
+                               minlength=self.grid_width * self.grid_height)
+            grid = _box_sum(grid.reshape(self.grid_width, self.grid_height), self.radius_cells).ravel()
+            self._strength[key] = grid
+        return grid
+
+    def where_to_defend(self, team_id, xs, ys):
+        """
+        Indice, parmi les positions (xs, ys) de team_id (ses bâtiments), de
+        celle où la force ennemie est la plus grande, et cette force ; None si
+        aucune n'est menacée.
+        """
+        if not len(xs):
+            return None
+        threat = self.strength_grid(team_id, enemies=True)[self._cells(xs, ys)]
+        index = int(np.argmax(threat))
+        if threat[index] <= 0:
+            return None
+        return index, float(threat[index])
+
+    def weakest_point(self, team_id, xs, ys):
+        """
+        Indice, parmi les positions (xs, ys) de l'équipe team_id (les
+        bâtiments d'un ennemi), de celle que ses propres unités gardent le
+        moins, et leur force à cet endroit ; None sans position.
+        """
+        if not len(xs):
+            return None
+        guard = self.strength_grid(team_id)[self._cells(xs, ys)]
+        index = int(np.argmin(guard))
+        return index, float(guard[index])
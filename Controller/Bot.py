@@ -10,16 +10,18 @@ from Settings.entity_mapping import *
 from Entity.Entity import *
 from Entity.Unit import *
 from Entity.Resource import *
-from Models.Map import GameMap
 from random import *
-from AiUtils.aStar import a_star
 from Controller.Decisonnode import * # Import DecisionNode and trees
+from Controller.bot_snapshot import SharedSnapshot, SET_TARGET, SET_TASK, MOVE, TRAIN, BUILD, PLAYER_TARGET
 from Controller.terminal_display_debug import debug_print
 
 # Debug flag pour le Bot - mettre à True pour activer les logs détaillés
 BOT_DEBUG = True
 _bot_debug_last = {}  # Dictionnaire pour throttle par message
 
+# Instantané des Bot.update appelés sans instantané : un par tick de la carte
+_shared_snapshot = SharedSnapshot(per_tick=True)
+
 def bot_debug(message, throttle_key=None, interval=5.0):
     """Affiche un message de debug avec throttling par clé
     
@@ -42,19 +44,103 @@ def bot_debug(message, throttle_key=None, interval=5.0):
 
 
 class Bot:
-    # Cache TTL for is_under_attack() in seconds
-    UNDER_ATTACK_CACHE_TTL = 0.5
-    
+    """
+    Bot d'un joueur. update se fait en deux phases : self.brain décide sur un
+    WorldSnapshot de la carte (think, sans rien modifier), puis apply exécute
+    les commandes obtenues sur la carte. BotScheduler peut faire penser les
+    bots dans des processus séparés (Controller.bot_workers).
+    """
+
     def __init__(self, team, game_map, players, mode, difficulty='medium'):
         self.team = team
         self.game_map = game_map
         self.difficulty = difficulty
         self.mode = mode
+        self.brain = BotBrain(team.teamID, mode, difficulty)
+
+    def update(self, game_map, dt, snapshot=None):
+        """
+        Décide sur snapshot et applique les décisions. Sans snapshot, les bots
+        mis à jour pendant un même tick partagent un instantané (SharedSnapshot).
+        """
+        self.game_map = game_map
+        if snapshot is None:
+            snapshot = _shared_snapshot.get(game_map, self)
+        self.apply(self.brain.think(snapshot), snapshot)
+
+    def apply(self, commands, snapshot):
+        """
+        Exécute sur la carte les commandes produites par think sur snapshot.
+        Une commande dont l'unité, le bâtiment ou la cible a disparu depuis
+        l'instantané est ignorée ; les autres vérifications (ressources,
+        emplacement libre) sont refaites par les méthodes des entités.
+        """
+        game_map = self.game_map
+        team = self.team
+        entities = snapshot.entities
+
+        def own(entity_id):
+            entity = entities.get(entity_id)
+            if entity is None or not entity.isAlive() or entity.team != team.teamID:
+                return None
+            return entity
+
+        def target(entity_id):
+            entity = entities.get(entity_id)
+            return entity if entity is not None and entity.isAlive() else None
+
+        for command in commands:
+            kind = command[0]
+            if kind == SET_TARGET or kind == SET_TASK:
+                unit = own(command[1])
+                target_id = command[-1]
+                target_entity = target(target_id) if target_id is not None else None
+                if unit is None or (target_id is not None and target_entity is None):
+                    continue
+                if kind == SET_TARGET:
+                    unit.set_target(target_entity)
+                else:
+                    unit.set_task(command[2], target_entity)
+            elif kind == MOVE:
+                unit = own(command[1])
+                if unit is not None:
+                    unit.set_destination(command[2], game_map)
+            elif kind == TRAIN:
+                building = own(command[1])
+                if building is not None:
+                    building.add_to_training_queue(team, game_map)
+            elif kind == BUILD:
+                _, _, building_type, x, y, num_builders = command
+                team.build(building_type, x, y, num_builders, game_map)
+            elif kind == PLAYER_TARGET:
+                players_target = game_map.game_state.get('players_target') if game_map.game_state else None
+                if players_target is not None and command[1] < len(players_target):
+                    target_team = command[2]
+                    players_target[command[1]] = game_map.players[target_team] if target_team is not None else None
+
+
+class BotBrain:
+    """
+    Décisions d'un bot. think ne lit qu'un WorldSnapshot et n'agit que par ses
+    vues (commandes) : le cerveau ne garde entre deux décisions que son propre
+    état (priorités, délais), et se transmet donc tel quel à un autre processus.
+    """
+    # Cache TTL for is_under_attack() in seconds
+    UNDER_ATTACK_CACHE_TTL = 0.5
+
+    def __init__(self, teamID, mode, difficulty='medium'):
+        self.teamID = teamID
+        self.difficulty = difficulty
+        self.mode = mode
 
-        self.enemies = [team for team in game_map.players if team.teamID != self.team.teamID]
-        self.players_target = game_map.game_state.get('players_target') if game_map.game_state else [None] * len(players)
+        # Vues de l'instantané en cours de décision (think)
+        self.game_map = None
+        self.team = None
+        self.enemies = None
+        self.players_target = None
 
-        self.attacking_enemies = None
+        # Identifiants des ennemis repérés par is_under_attack()
+        self.attacking_enemies = []
         
         # Cache for is_under_attack()
         self._under_attack_cache = None
@@ -68,8 +154,8 @@ class Bot:
             'h': 1   # Horsemen
         }
         
-        # Créer l'arbre de décision UNE SEULE FOIS à l'initialisation
-        self.decision_tree = self.create_mode_decision_tree()
+        # Arbre de décision, créé à la première décision (ni copié ni envoyé aux processus)
+        self.decision_tree = None
         
         # Debug counters
         self._last_debug_time = 0
@@ -79,28 +165,45 @@ class Bot:
         self._last_reallocation_time = 0
         self._reallocation_cooldown = 2.0  # Attendre 2 secondes entre les réallocations
 
-    def update(self, game_map, dt):
-        # Mettre à jour la référence à game_map au cas où elle change
-        self.game_map = game_map
-        
-        # Debug périodique de l'état du bot
-        current_time = time.time()
-        if current_time - self._last_debug_time > self._debug_interval:
-            self._debug_bot_state()
-            self._last_debug_time = current_time
-        
-        # PRIORITÉ 1: Assigner les villagers IDLE - c'est le plus important!
-        self._assign_idle_villagers()
-        
-        # PRIORITÉ 2: Évaluer l'arbre de décision pour les actions stratégiques
-        if self.decision_tree:
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['decision_tree'] = None
+        state['game_map'] = state['team'] = state['enemies'] = state['players_target'] = None
+        return state
+
+    def think(self, snapshot):
+        """Décide sur snapshot ; retourne la liste des commandes à appliquer (Bot.apply)."""
+        self.game_map = snapshot
+        self.team = snapshot.teams[self.teamID]
+        self.enemies = [team for team in snapshot.players if team.teamID != self.teamID]
+        self.players_target = snapshot.players_target
+        if self.decision_tree is None:
+            self.decision_tree = self.create_mode_decision_tree()
+        snapshot.commands = []
+        try:
+            # Debug périodique de l'état du bot
+            current_time = snapshot.time
+            if current_time - self._last_debug_time > self._debug_interval:
+                self._debug_bot_state()
+                self._last_debug_time = current_time
+
+            # PRIORITÉ 1: Assigner les villagers IDLE - c'est le plus important!
+            self._assign_idle_villagers()
+
+            # PRIORITÉ 2: Évaluer l'arbre de décision pour les actions stratégiques
             self.decision_tree.evaluate()
+            return snapshot.commands
+        finally:
+            snapshot.commands = []
+            self.game_map = self.team = self.enemies = self.players_target = None
     
     def _assign_idle_villagers(self):
         """Assigne une tâche aux villagers qui n'en ont pas - LOGIQUE SIMPLE"""
+        if not self.team.villager_tasks[None]:
+            return
         idle_villagers = [
             u for u in self.team.units 
-            if isinstance(u, Villager) and u.isAlive() 
+            if issubclass(u.kind, Villager) and u.isAlive() 
             and u.task is None  # Seulement ceux sans tâche
         ]
         
@@ -109,7 +212,7 @@ class Bot:
         
         for villager in idle_villagers:
             # 1. S'il porte des ressources, aller les déposer
-            if villager.carry and villager.carry.total() > 0:
+            if villager.carry_total > 0:
                 drop_point = self._find_nearest_drop_point(villager)
                 if drop_point:
                     villager.set_task('stock', drop_point)
@@ -131,7 +234,7 @@ class Bot:
                 continue
 
             # 4. Si toujours rien, aller vers le TownCentre (point de ralliement)
-            town_centre = next((b for b in self.team.buildings if isinstance(b, TownCentre)), None)
+            town_centre = next((b for b in self.team.buildings if issubclass(b.kind, TownCentre)), None)
             if town_centre and math.dist((villager.x, villager.y), (town_centre.x, town_centre.y)) > 10:
                 villager.set_destination((town_centre.x, town_centre.y), self.game_map)
                 continue
@@ -142,28 +245,17 @@ class Bot:
         """Trouve une ressource n'importe où sur la carte (fallback)"""
         # 1. D'abord chercher les Farms construites de notre équipe
         for building in self.team.buildings:
-            if isinstance(building, Farm) and building.isBuilt() and building.isAlive():
+            if issubclass(building.kind, Farm) and building.isBuilt() and building.isAlive():
                 return building
         
-        # 2. Sinon chercher la ressource la plus proche sur toute la map
-        vx, vy = villager.x, villager.y
-        best_resource = None
-        best_distance = float('inf')
-        
-        # Optimisation: ne pas scanner toute la map si possible, mais ici c'est un fallback
-        # On parcourt toutes les ressources connues de la map
-        for pos, entities in self.game_map.resources.items():
-            for entity in entities:
-                if entity.isAlive() and (isinstance(entity, Tree) or isinstance(entity, Gold)):
-                    dist = abs(vx - entity.x) + abs(vy - entity.y)
-                    if dist < best_distance:
-                        best_distance = dist
-                        best_resource = entity
-        
-        return best_resource
+        # 2. Sinon chercher la ressource la plus proche sur toute la map (index des ressources)
+        return self.game_map.find_nearest_resource((Tree, Gold), villager.x, villager.y,
+                                                   reachable_from=(villager.x, villager.y))
 
     def _find_nearest_construction_site(self, villager):
         """Trouve le chantier de construction le plus proche"""
+        if not self.team.construction_count:
+            return None
         sites = [b for b in self.team.buildings if not b.isBuilt() and b.isAlive()]
         if not sites:
             return None
@@ -171,10 +263,9 @@ class Bot:
 
     def _find_nearest_drop_point(self, villager):
         """Trouve le point de dépôt le plus proche"""
-        drop_points = [b for b in self.team.buildings if b.resourceDropPoint and b.isBuilt()]
-        if not drop_points:
+        if not self.team.drop_point_count:
             return None
-        return min(drop_points, key=lambda dp: abs(villager.x - dp.x) + abs(villager.y - dp.y))
+        return self.game_map.find_nearest_drop_point(self.team.teamID, villager.x, villager.y)
     
     def _find_nearest_resource(self, villager):
         """Trouve la ressource la plus proche (Tree, Gold, ou Farm construite)"""
@@ -184,7 +275,7 @@ class Bot:
         
         # 1. D'abord chercher les Farms construites de notre équipe (priorité)
         for building in self.team.buildings:
-            if isinstance(building, Farm) and building.isBuilt() and building.isAlive():
+            if issubclass(building.kind, Farm) and building.isBuilt() and building.isAlive():
                 dist = abs(vx - building.x) + abs(vy - building.y)
                 if dist < best_distance:
                     best_distance = dist
@@ -194,42 +285,26 @@ class Bot:
         if best_resource and best_distance < 20:
             return best_resource
         
-        # 2. Sinon chercher Tree ou Gold sur la map
-        for radius in range(1, 30):
-            for dx in range(-radius, radius + 1):
-                for dy in range(-radius, radius + 1):
-                    if abs(dx) != radius and abs(dy) != radius:
-                        continue  # Seulement le périmètre
-                    
-                    pos = (int(vx) + dx, int(vy) + dy)
-                    entities = self.game_map.resources.get(pos)
-                    if entities:
-                        for entity in entities:
-                            if entity.isAlive() and (isinstance(entity, Tree) or isinstance(entity, Gold)):
-                                dist = abs(dx) + abs(dy)
-                                if dist < best_distance:
-                                    best_distance = dist
-                                    best_resource = entity
-            
-            if best_resource:
-                break
-        
+        # 2. Sinon chercher Tree ou Gold sur la map, dans un rayon de 30 cases
+        resource = self.game_map.find_nearest_resource((Tree, Gold), vx, vy, max_radius=30, reachable_from=(vx, vy))
+        if resource and abs(vx - resource.x) + abs(vy - resource.y) < best_distance:
+            return resource
         return best_resource
     
     def _debug_bot_state(self):
         """Affiche l'état actuel du bot pour le debug"""
+        if not BOT_DEBUG:
+            return
         team_id = self.team.teamID
-        villagers = [u for u in self.team.units if isinstance(u, Villager)]
-        military = [u for u in self.team.units if not isinstance(u, Villager)]
+        villagers = [u for u in self.team.units if issubclass(u.kind, Villager)]
+        military = [u for u in self.team.units if not issubclass(u.kind, Villager)]
         
         # Compter les états des villagers
         villager_states = {}
-        villager_tasks = {}
+        villager_tasks = {task or 'none': count for task, count in self.team.villager_tasks.items() if count}
         for v in villagers:
             state = v.state or 'none'
-            task = v.task or 'none'
             villager_states[state] = villager_states.get(state, 0) + 1
-            villager_tasks[task] = villager_tasks.get(task, 0) + 1
         
         # Compter les états des unités militaires
         military_states = {}
@@ -296,12 +371,12 @@ class Bot:
     def reallocate_villagers(self, resource_type):
         """VERSION OPTIMISÉE - resource_type est Farm, Tree, ou Gold (classes)"""
         # Cooldown pour éviter la réallocation trop fréquente
-        current_time = time.time()
+        current_time = self.game_map.time
         if current_time - self._last_reallocation_time < self._reallocation_cooldown:
             return
         
         # Debug: montrer l'état de tous les villagers
-        all_villagers = [u for u in self.team.units if isinstance(u, Villager) and u.isAlive()]
+        all_villagers = [u for u in self.team.units if issubclass(u.kind, Villager) and u.isAlive()]
         villager_states = {}
         for v in all_villagers:
             key = f"{v.state}/{v.task}"
@@ -311,7 +386,7 @@ class Bot:
         # Prendre les villagers disponibles pour réallocation
         available_villagers = []
         for unit in self.team.units:
-            if not isinstance(unit, Villager):
+            if not issubclass(unit.kind, Villager):
                 continue
             if not unit.isAlive():
                 continue
@@ -322,8 +397,8 @@ class Bot:
                 continue
             
             # Villager qui collecte une ressource différente de celle demandée
-            if unit.task == 'collect' and unit.collect_target:
-                current_resource_type = type(unit.collect_target)
+            if unit.task == 'collect' and unit.collect_kind:
+                current_resource_type = unit.collect_kind
                 # Si le villager collecte une ressource différente, on peut le réallouer
                 if current_resource_type != resource_type and resource_type != Farm:
                     available_villagers.append(unit)
@@ -335,8 +410,8 @@ class Bot:
         # Traiter jusqu'à 3 villagers à la fois
         villagers_to_process = available_villagers[:3]
         
-        drop_points = [b for b in self.team.buildings if b.resourceDropPoint]
-        if not drop_points:
+        first = villagers_to_process[0]
+        if not self.game_map.find_nearest_drop_point(self.team.teamID, first.x, first.y, built_only=False):
             bot_debug(f"Team {self.team.teamID}: Aucun point de dépôt!")
             return
         
@@ -347,16 +422,14 @@ class Bot:
         self._last_reallocation_time = current_time
         
         for villager in villagers_to_process:
-            nearest_drop_point = min(
-                drop_points,
-                key=lambda dp: abs(villager.x - dp.x) + abs(villager.y - dp.y)
-            )
+            nearest_drop_point = self.game_map.find_nearest_drop_point(self.team.teamID, villager.x, villager.y,
+                                                                       built_only=False)
 
             # Si on a besoin de nourriture (Farm)
             if resource_type is Farm:
                 # Ne prendre que les fermes construites (pas en construction)
                 available_farms = [farm for farm in self.team.buildings 
-                                   if isinstance(farm, Farm) and farm.isBuilt() and farm.isAlive()]
+                                   if issubclass(farm.kind, Farm) and farm.isBuilt() and farm.isAlive()]
                 if available_farms:
                     villager.set_target(available_farms[0])
                     bot_debug(f"Team {self.team.teamID}: Villager assigné à ferme existante")
@@ -374,24 +447,9 @@ class Bot:
     def _assign_villager_to_resource(self, villager, resource_type, nearest_drop_point):
         """Assigne un villager à une ressource proche du drop point"""
         nx, ny = int(nearest_drop_point.x), int(nearest_drop_point.y)
-        best_resource = None
-        best_distance = float('inf')
-        
-        for radius in range(1, 20):
-            for dx in range(-radius, radius + 1):
-                for dy in range(-radius, radius + 1):
-                    if abs(dx) == radius or abs(dy) == radius:
-                        pos = (nx + dx, ny + dy)
-                        entities = self.game_map.resources.get(pos)
-                        if entities:
-                            for entity in entities:
-                                if isinstance(entity, resource_type) and entity.isAlive():
-                                    dist = abs(dx) + abs(dy)
-                                    if dist < best_distance:
-                                        best_distance = dist
-                                        best_resource = entity
-            if best_resource:
-                break
+        best_resource = self.game_map.find_nearest_resource(resource_type, nx, ny, max_radius=20,
+                                                            team=self.team.teamID,
+                                                            reachable_from=(villager.x, villager.y))
         
         if best_resource:
             villager.set_target(best_resource)
@@ -419,32 +477,38 @@ class Bot:
             
         closest_distance = float("inf")
         closest_entity = None
-        keeps = [keep for keep in enemy_team.buildings if isinstance(keep, Keep) and keep.isAlive()]
+        keeps = [keep for keep in enemy_team.buildings if issubclass(keep.kind, Keep) and keep.isAlive()]
+        components = self.game_map.get_components()
+        position = (unit.x, unit.y)
+
+        def reachable(target, dist):
+            # Cible hors de portée et injoignable à pied (enclavée) : l'ignorer
+            return dist <= unit.attack_range or components.reaches_entity(position, target)
         
         # Chercher d'abord parmi les unités militaires ennemies (exclure les villageois)
         military_targets = [enemy for enemy in enemy_team.units 
-                          if not isinstance(enemy, Villager) and enemy.isAlive()]
+                          if not issubclass(enemy.kind, Villager) and enemy.isAlive()]
 
         for enemy in military_targets:
             dist = math.dist((unit.x, unit.y), (enemy.x, enemy.y))
-            if dist < closest_distance:
+            if dist < closest_distance and reachable(enemy, dist):
                 closest_distance = dist
                 closest_entity = enemy
         
         # Si pas de cible militaire et en mode attaque, chercher villageois et bâtiments
         if attack_mode and closest_entity is None:
             villager_targets = [enemy for enemy in enemy_team.units 
-                               if isinstance(enemy, Villager) and enemy.isAlive()]
+                               if issubclass(enemy.kind, Villager) and enemy.isAlive()]
             for enemy in villager_targets:
                 dist = math.dist((unit.x, unit.y), (enemy.x, enemy.y))
-                if dist < closest_distance:
+                if dist < closest_distance and reachable(enemy, dist):
                     closest_distance = dist
                     closest_entity = enemy
             
             for enemy_building in enemy_team.buildings:
                 if enemy_building.isAlive():
                     dist = math.dist((unit.x, unit.y), (enemy_building.x, enemy_building.y))
-                    if dist < closest_distance:
+                    if dist < closest_distance and reachable(enemy_building, dist):
                         closest_distance = dist
                         closest_entity = enemy_building
 
@@ -452,7 +516,7 @@ class Bot:
         if attack_mode and keeps:
             for keep in keeps:
                 dist = math.dist((unit.x, unit.y), (keep.x, keep.y))
-                if dist < closest_distance:
+                if dist < closest_distance and reachable(keep, dist):
                     closest_distance = dist
                     closest_entity = keep
         
@@ -460,7 +524,7 @@ class Bot:
         if closest_entity is not None and keeps and attack_mode:
             for keep in keeps:
                 dist = math.dist((keep.x, keep.y), (closest_entity.x, closest_entity.y))
-                if dist < keep.attack_range:
+                if dist < keep.attack_range and reachable(keep, math.dist(position, (keep.x, keep.y))):
                     closest_entity = keep
                     break
 
@@ -469,6 +533,7 @@ class Bot:
 
     def modify_target(self, player, target, players_target):
         players_target[player.teamID] = target
+        self.game_map.record((PLAYER_TARGET, player.teamID, target.teamID if target is not None else None))
         for unit in player.units:
             unit.set_target(None)
 
@@ -477,8 +542,8 @@ class Bot:
         target = None
         for enemy_team in players:
             if enemy_team != selected_player:
-                count = sum(1 for unit in enemy_team.units if not isinstance(unit, Villager))
-                count += sum(1 for building in enemy_team.buildings if not isinstance(building, Keep))
+                count = enemy_team.military_count
+                count += sum(enemy_team.building_counts.values()) - enemy_team.building_counts[Keep]
                 if count < count_max:
                     target = enemy_team
                     count_max = count
@@ -510,8 +575,8 @@ class Bot:
         # Assigner des cibles aux unités si l'ennemi existe et a des unités/bâtiments
         if enemy is not None and (len(enemy.units) != 0 or len(enemy.buildings) != 0):
             for unit in selected_player.units:
-                if not isinstance(unit, Villager) or (len(selected_player.units) == 0 and not attack_mode):
-                    if unit.attack_target is None or not unit.attack_target.isAlive():
+                if not issubclass(unit.kind, Villager) or (len(selected_player.units) == 0 and not attack_mode):
+                    if unit.target() is None:
                         self.search_for_target(unit, enemy, attack_mode)
         else:
             self.modify_target(selected_player, None, players_target)
@@ -521,7 +586,7 @@ class Bot:
             self.modify_target(selected_player, None, players_target)
 
     def get_military_unit_count(self, player):
-        return len(self.get_military_units(player))
+        return player.military_count
 
     def create_mode_decision_tree(self): 
         if self.mode == 'offensif':
@@ -535,7 +600,9 @@ class Bot:
 
     def get_military_units(self, player=None): # Modified to accept player, default to self
         player_to_check = player if player else self.team
-        return [unit for unit in player_to_check.units if not isinstance(unit, Villager)]
+        if not player_to_check.military_count:
+            return []
+        return [unit for unit in player_to_check.units if not issubclass(unit.kind, Villager)]
 
     def can_train_unit(self, unit_type):
         """Vérifie si on peut former une unité (ressources et bâtiment disponible)"""
@@ -544,15 +611,15 @@ class Bot:
             return False, "resources"
             
         BUILDING_FOR_UNIT = {
-            Villager: 'T',    # TownCentre
-            Archer: 'A',      # ArcheryRange
-            Swordsman: 'B',   # Barracks
-            Horseman: 'S'     # Stable
+            Villager: TownCentre,
+            Archer: ArcheryRange,
+            Swordsman: Barracks,
+            Horseman: Stable
         }
         
         required_building = BUILDING_FOR_UNIT.get(unit_type)
         # Vérifier que le bâtiment existe ET est construit
-        has_building = any(b.acronym == required_building and b.isBuilt() for b in self.team.buildings)
+        has_building = self.team.built_counts[required_building] > 0
         
         return has_building, "building"
 
@@ -615,13 +682,12 @@ class Bot:
             for building in self.team.buildings:
                 if building.acronym == building_acronym:
                     if hasattr(building, 'add_to_training_queue'):
-                        return building.add_to_training_queue(self.team)
+                        return building.add_to_training_queue(self.team, self.game_map)
         return False
 
     def balance_units(self):
-        villager_count = sum(1 for unit in self.team.units if isinstance(unit, Villager))
-        military_units = self.get_military_units()
-        military_count = len(military_units)
+        villager_count = self.team.unit_counts[Villager]
+        military_count = self.team.military_count
 
         # Priorité à la formation de villageois si peu nombreux
         if villager_count < 20:
@@ -657,74 +723,22 @@ class Bot:
         Returns:
             bool: True si des ennemis sont détectés près des bâtiments, False sinon
         """
-        current_time = time.time()
+        current_time = self.game_map.time
         
         # Vérifier si le cache est encore valide
         if (self._under_attack_cache is not None and 
-            current_time - self._under_attack_cache_time < Bot.UNDER_ATTACK_CACHE_TTL):
+            current_time - self._under_attack_cache_time < BotBrain.UNDER_ATTACK_CACHE_TTL):
             return self._under_attack_cache
         
-        my_team_id = self.team.teamID
-        
-        # Utiliser le spatial hash si disponible
-        if hasattr(self.game_map, 'spatial_hash'):
-            for building in self.team.buildings:
-                # Chercher les entités proches de chaque bâtiment
-                nearby = self.game_map.get_entities_in_area(building.x, building.y, 5)
-                for entity in nearby:
-                    if isinstance(entity, Unit) and entity.team != my_team_id:
-                        self.attacking_enemies = self._get_attacking_enemies_optimized(my_team_id)
-                        self._under_attack_cache = True
-                        self._under_attack_cache_time = current_time
-                        return True
-        else:
-            # Fallback: méthode originale
-            check_positions = set()
-            for building in self.team.buildings:
-                bx, by = int(building.x), int(building.y)
-                for dx in range(-5, 6):
-                    for dy in range(-5, 6):
-                        check_positions.add((bx + dx, by + dy))
-            
-            for tile in check_positions:
-                entities = self.game_map.grid.get(tile)
-                if entities:
-                    for entity in entities:
-                        if isinstance(entity, Unit) and entity.team != my_team_id:
-                            self.attacking_enemies = self._get_attacking_enemies(check_positions, my_team_id)
-                            self._under_attack_cache = True
-                            self._under_attack_cache_time = current_time
-                            return True
-        
-        self.attacking_enemies = []
-        self._under_attack_cache = False
+        # Unités militaires ennemies à THREAT_RADIUS cases des bâtiments, lues sur
+        # la carte de menace de l'instantané
+        buildings = self.team.buildings
+        self.attacking_enemies = self.game_map.threat_map().enemies_near(
+            self.team.teamID, [building.x for building in buildings], [building.y for building in buildings],
+            limit=10)
+        self._under_attack_cache = bool(self.attacking_enemies)
         self._under_attack_cache_time = current_time
-        return False
-    
-    def _get_attacking_enemies_optimized(self, my_team_id):
-        """Récupère la liste des ennemis attaquant en utilisant spatial hash."""
-        attacking_enemies = []
-        for building in self.team.buildings:
-            nearby = self.game_map.get_entities_in_area(building.x, building.y, 5)
-            for entity in nearby:
-                if isinstance(entity, Unit) and entity.team != my_team_id:
-                    attacking_enemies.append(entity)
-                    if len(attacking_enemies) >= 10:
-                        return attacking_enemies
-        return attacking_enemies
-    
-    def _get_attacking_enemies(self, check_positions, my_team_id):
-        """Récupère la liste des ennemis attaquant (appelé après is_under_attack)"""
-        attacking_enemies = []
-        for tile in check_positions:
-            entities = self.game_map.grid.get(tile)
-            if entities:
-                for entity in entities:
-                    if isinstance(entity, Unit) and entity.team != my_team_id:
-                        attacking_enemies.append(entity)
-                        if len(attacking_enemies) >= 10:
-                            return attacking_enemies
-        return attacking_enemies
+        return self._under_attack_cache
         
     def get_critical_points(self):
         if not self.team.buildings:
@@ -743,12 +757,15 @@ class Bot:
     def gather_units_for_defense(self, units_per_target=2):
         """Rassemble les unités militaires pour défendre contre les ennemis détectés"""
         # Utiliser la liste des ennemis mise en cache par is_under_attack()
-        attacking_enemies = getattr(self, 'attacking_enemies', [])
-        if not attacking_enemies:
+        if not self.attacking_enemies:
             return
 
-        # Filtrer les ennemis morts
-        attacking_enemies = [e for e in attacking_enemies if e.isAlive()]
+        # Filtrer les ennemis morts (ou disparus depuis) ; la carte de menace de
+        # l'instantané connaît toutes ses unités, même celles sans vue encore
+        game_map = self.game_map
+        game_map.threat_map()
+        attacking_enemies = [enemy for enemy in map(game_map.view, self.attacking_enemies)
+                             if enemy is not None and enemy.isAlive()]
         if not attacking_enemies:
             return
 
@@ -757,8 +774,8 @@ class Bot:
         
         # Récupérer uniquement les unités militaires disponibles
         available_units = [unit for unit in self.team.units 
-                         if not isinstance(unit, Villager) 
-                         and (not unit.attack_target or not unit.attack_target.isAlive())]
+                         if not issubclass(unit.kind, Villager) 
+                         and unit.target() is None]
 
         # Assigner les unités aux cibles
         for unit in available_units:
@@ -799,9 +816,9 @@ class Bot:
         enemy_swordsmen = 0
 
         for enemy_team in enemy_teams:
-            enemy_horsemen += sum(1 for unit in enemy_team.units if isinstance(unit, Horseman))
-            enemy_archers += sum(1 for unit in enemy_team.units if isinstance(unit, Archer))
-            enemy_swordsmen += sum(1 for unit in enemy_team.units if isinstance(unit, Swordsman))
+            enemy_horsemen += enemy_team.unit_counts[Horseman]
+            enemy_archers += enemy_team.unit_counts[Archer]
+            enemy_swordsmen += enemy_team.unit_counts[Swordsman]
 
         HORSEMEN_THRESHOLD = 5
         ARCHERS_THRESHOLD = 7
@@ -826,7 +843,9 @@ class Bot:
         selected_units = []
 
         for unit_type, limit in units_by_type.items():
-            available_units = [unit for unit in self.team.units if isinstance(unit, unit_type)]
+            if not self.team.unit_counts[unit_type]:
+                continue
+            available_units = [unit for unit in self.team.units if issubclass(unit.kind, unit_type)]
 
             selected_units.extend(available_units[:limit])
 
@@ -836,7 +855,7 @@ class Bot:
         return selected_units
 
     def maintain_army(self):
-        military_count = len(self.get_military_units())
+        military_count = self.team.military_count
 
         if military_count < 20:
             self.balance_units()
@@ -844,9 +863,9 @@ class Bot:
             attack_composition = self.choose_attack_composition()
 
             for unit in attack_composition:
-                if not isinstance(unit, Villager):
+                if not issubclass(unit.kind, Villager):
                     # Vérifier si l'unité est idle (pas de cible d'attaque et pas de path)
-                    is_idle = (not unit.attack_target or not unit.attack_target.isAlive()) and not unit.path
+                    is_idle = unit.target() is None and not unit.path and not unit.path_request
                     if is_idle:
                         # Chercher une cible parmi les ennemis
                         for enemy_team in self.enemies:
@@ -855,12 +874,7 @@ class Bot:
 
     def check_building_needs(self):
         """VERSION OPTIMISÉE - Vérifie quels bâtiments sont nécessaires"""
-        # Compter les types de bâtiments une seule fois
-        building_counts = {}
-        for building in self.team.buildings:
-            btype = type(building)
-            building_counts[btype] = building_counts.get(btype, 0) + 1
-        
+        building_counts = self.team.building_counts
         needed_buildings = []
         
         # Vérifier les bâtiments de base manquants
@@ -872,12 +886,12 @@ class Bot:
         ]
         
         for building_class, building_name in essential_buildings:
-            if building_class not in building_counts:
+            if not building_counts[building_class]:
                 needed_buildings.append(building_name)
 
         # Logique dynamique pour les fermes (1 ferme pour 4 villageois)
-        num_villagers = sum(1 for u in self.team.units if isinstance(u, Villager))
-        num_farms = building_counts.get(Farm, 0)
+        num_villagers = self.team.unit_counts[Villager]
+        num_farms = building_counts[Farm]
         desired_farms = max(1, num_villagers // 3)
         
         if num_farms < desired_farms:
@@ -896,7 +910,7 @@ class Bot:
                 (Keep, "Keep"),
             ]
             for building_class, building_name in advanced_buildings:
-                if building_class not in building_counts:
+                if not building_counts[building_class]:
                     needed_buildings.append(building_name)
         
         return needed_buildings
@@ -906,35 +920,28 @@ class Bot:
     
     def find_building_location(self, building_type):
         # Utiliser le cache pour la taille du bâtiment
-        if building_type not in Bot._building_size_cache:
+        if building_type not in BotBrain._building_size_cache:
             building_class = building_class_map[building_type]
             temp_instance = building_class(team=0)
-            Bot._building_size_cache[building_type] = temp_instance.size
+            BotBrain._building_size_cache[building_type] = temp_instance.size
         
-        building_size = Bot._building_size_cache[building_type]
+        building_size = BotBrain._building_size_cache[building_type]
 
         # Chercher autour d'un bâtiment existant au lieu de toute la zone
         if self.team.buildings:
             ref_building = next(iter(self.team.buildings))  # Prendre le premier élément du set
             ref_x, ref_y = int(ref_building.x), int(ref_building.y)
             
-            # Chercher dans un rayon de 15
-            for radius in range(1, 16):
-                for dx in range(-radius, radius + 1):
-                    for dy in range(-radius, radius + 1):
-                        if abs(dx) == radius or abs(dy) == radius:  # Seulement le périmètre
-                            x, y = ref_x + dx, ref_y + dy
-                            if self.game_map.buildable_position(x, y, building_size):
-                                return (x, y)
+            # Chercher dans un rayon de 15, anneau par anneau
+            return self.game_map.nearest_buildable(ref_x, ref_y, building_size, 15)
         
         return None
 
     def can_build_building(self, building_class):
         """Check if resources are sufficient to build a building."""
-        building_cost = building_class.cost
-        return (self.team.resources["wood"] >= building_cost.wood and
-                self.team.resources["gold"] >= building_cost.gold and
-                self.team.resources["food"] >= building_cost.food)
+        # cost est un attribut d'instance : passer par une instance temporaire
+        building_cost = building_class(team=self.team.teamID).cost
+        return self.team.resources.has_enough(building_cost.get())
 
     # def buildBuilding(self, building, clock, nb, game_map):
     #     """Build a building if resources are sufficient."""
@@ -969,12 +976,7 @@ class Bot:
                     if location:
                         x, y = location
 
-                        # Vérifier que self.game_map est un objet de type GameMap
-                        if not isinstance(self.game_map, GameMap):
-                            return False
-
                         # Construire le bâtiment
-                        building = building_class(team=self.team.teamID, x=x, y=y)
                         if self.team.build(building_type, x, y, num_builders, self.game_map):  # Passez le nom du type de bâtiment ici
                             return True
         return False
@@ -995,7 +997,7 @@ class Bot:
             
         # Vérifier qu'on a des bâtiments de base
         has_essential_buildings = all(
-            any(isinstance(b, building_type) for b in self.team.buildings)
+            self.team.building_counts[building_type]
             for building_type in [TownCentre, Keep, Barracks]
         )
         if not has_essential_buildings:
@@ -1025,7 +1027,7 @@ class Bot:
                 # Chercher en priorité les bâtiments qui augmentent la population
                 target = None
                 for building in weakest_enemy.buildings:
-                    if isinstance(building, (TownCentre, House)):
+                    if issubclass(building.kind, (TownCentre, House)):
                         target = building
                         break
                         
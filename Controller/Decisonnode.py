@@ -106,7 +106,7 @@ def repair_buildings_action(bot):
     from Entity.Unit import Villager
     available_villagers = [
         unit for unit in bot.team.units 
-        if isinstance(unit, Villager) and unit.isAlive()
+        if issubclass(unit.kind, Villager) and unit.isAlive()
         and (unit.task is None or unit.state == 'idle')
     ]
     
@@ -117,7 +117,7 @@ def repair_buildings_action(bot):
     villagers_assigned = 0
     for building in critical_buildings[:3]:  # Max 3 bâtiments à la fois
         for villager in available_villagers[:2]:  # Max 2 villageois par bâtiment
-            if villager not in building.builders:
+            if villager.entity_id not in building.builders:
                 villager.set_task('repair', building)
                 villagers_assigned += 1
                 available_villagers.remove(villager)
@@ -137,7 +137,7 @@ def manage_offense_action(bot):
         military_units = bot.get_military_units()
         targets_assigned = 0
         for unit in military_units:
-            if not unit.attack_target or not unit.attack_target.isAlive():
+            if unit.target() is None:
                 if bot.search_for_target(unit, enemy_team, True):
                     targets_assigned += 1
         decision_debug(f"Team {bot.team.teamID}: Assigned {targets_assigned} targets to military units")
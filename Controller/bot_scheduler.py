@@ -0,0 +1,234 @@
+"""
+Ordonnanceur des bots : répartit leurs décisions sur plusieurs frames.
+
+Avant, toutes les 1/DPS secondes de jeu, tous les bots étaient mis à jour
+d'affilée dans la même frame : avec 25 joueurs (jusqu'à 55), cette frame-là
+durait beaucoup plus longtemps que les autres. BotScheduler garde la même
+cadence moyenne (chaque bot décide une fois par intervalle) mais étale les
+bots à tour de rôle sur les frames de l'intervalle, dans la limite du temps
+de calcul accordé à la frame (budget) : un bot n'est servi que si le temps
+restant couvre le coût moyen d'une décision (mesuré au fil des frames), et
+les bots restants attendent la frame suivante, en tête de file.
+
+Les bots décident sur un WorldSnapshot (voir Controller.bot_snapshot). Un
+même instantané sert aux bots suivants, frame après frame, jusqu'à ce qu'un
+bot y ait déjà décidé : il est alors repris, une fois par tour au plus, en
+début de frame. Son coût compte dans le budget : si sa prise l'épuise, les
+bots attendent la frame suivante, qui le réutilise.
+
+Le budget reste une cible : une frame sert au moins un bot (ou prend
+l'instantané) pour que la file avance, et une décision ou un instantané plus
+long que le budget le dépasse. get_stats compte ces frames (over_budget) et
+le pire instantané (max_snapshot_time), à côté du retard des décisions (en
+frames et en secondes de jeu) que mesure aussi latency.
+
+Avec processes > 0, les bots en file partent sur un même instantané, en
+autant de lots que de processus libres (Controller.bot_workers), et leurs
+commandes sont appliquées dès qu'un lot revient. Un lot en route depuis
+max_lag frames est attendu (0 : dès la frame suivante, comme dans
+headless) : les décisions ne prennent jamais plus de max_lag frames de
+retard sur la partie. Le budget ne compte alors que l'instantané,
+l'application des commandes et ces attentes.
+"""
+import time
+from collections import deque
+
+from Controller.bot_snapshot import SharedSnapshot, WorldSnapshot
+from Controller.bot_workers import BotThinkPool, pack
+from Settings.setup import DPS, BOT_FRAME_BUDGET, BOT_WORKERS, BOT_MAX_LAG
+
+# Poids d'une nouvelle mesure dans les coûts moyens (moyenne mobile exponentielle)
+COST_SMOOTHING = 0.2
+
+
+def _average(average, sample):
+    """Moyenne mobile des coûts : la première mesure sert telle quelle."""
+    return sample if not average else average + COST_SMOOTHING * (sample - average)
+
+
+class BotScheduler:
+    """Mises à jour des bots d'une partie, étalées et limitées en temps par frame."""
+
+    def __init__(self, bots, interval=1.0 / DPS, budget=BOT_FRAME_BUDGET, processes=BOT_WORKERS, max_lag=BOT_MAX_LAG):
+        self.bots = list(bots)
+        self.interval = interval
+        # Temps de calcul accordé par frame (en secondes) ; None ou 0 : pas de limite
+        self.budget = budget
+        # Temps de jeu écoulé et frames passées depuis la création
+        self.clock = 0.0
+        self.frame = 0
+        # Bots dus (fraction comprise) pas encore mis en file, et prochain bot à mettre en file
+        self.credit = 0.0
+        self.cursor = 0
+        # Bots en attente de décision (indices dans self.bots), et (heure, frame) où ils sont devenus dus
+        self.queue = deque()
+        self.due_since = {}
+        # Heure de la dernière décision de chaque bot
+        self.last_update = [0.0] * len(self.bots)
+        # Instantané courant, repris quand un bot y a déjà décidé
+        self.snapshots = SharedSnapshot()
+        # Coût moyen (en secondes) d'une décision et d'un instantané, pour tenir le budget
+        self.decision_cost = 0.0
+        self.snapshot_cost = 0.0
+        # Processus de décision (processes > 0) et lots en cours : [future, instantané, indices, frame d'envoi]
+        self.pool = BotThinkPool(processes) if processes else None
+        self.max_lag = max_lag
+        self.in_flight = []
+        self.stats = {'frames': 0, 'updates': 0, 'carried_over': 0, 'skipped': 0, 'snapshots': 0,
+                      'over_budget': 0, 'max_delay': 0.0, 'max_delay_frames': 0, 'max_frame_time': 0.0,
+                      'max_snapshot_time': 0.0}
+
+    def _enqueue_due(self, dt):
+        """
+        Met en file, à tour de rôle, les bots dont c'est le tour pendant les dt
+        secondes écoulées ; comme l'ancienne boucle, au plus un tour complet par frame.
+        """
+        count = len(self.bots)
+        if not count:
+            return
+        self.credit = min(self.credit + min(dt, self.interval) * count / self.interval, count)
+        while self.credit >= 1:
+            self.credit -= 1
+            index = self.cursor
+            self.cursor = (self.cursor + 1) % count
+            if index in self.due_since:
+                # Sa décision précédente attend encore : une seule suffit
+                self.stats['skipped'] += 1
+                continue
+            self.due_since[index] = (self.clock, self.frame)
+            self.queue.append(index)
+
+    def _take_snapshot(self, game_map):
+        """Instantané pris maintenant (courant en mode séquentiel, à part pour les processus)."""
+        start = time.perf_counter()
+        if self.pool is None:
+            snapshot = self.snapshots.take(game_map)
+        else:
+            snapshot = WorldSnapshot(game_map)
+        elapsed = time.perf_counter() - start
+        self.snapshot_cost = _average(self.snapshot_cost, elapsed)
+        self.stats['snapshots'] += 1
+        self.stats['max_snapshot_time'] = max(self.stats['max_snapshot_time'], elapsed)
+        return snapshot
+
+    def _served(self, index):
+        """Note la décision du bot index (retard depuis qu'il est dû)."""
+        stats = self.stats
+        due_clock, due_frame = self.due_since.pop(index)
+        stats['max_delay'] = max(stats['max_delay'], self.clock - due_clock)
+        stats['max_delay_frames'] = max(stats['max_delay_frames'], self.frame - due_frame)
+        stats['updates'] += 1
+        self.last_update[index] = self.clock
+
+    def update(self, game_map, dt):
+        """Avance de dt secondes de jeu et met à jour les bots dus, dans la limite du budget."""
+        self.clock += dt
+        self.frame += 1
+        if self.pool is not None:
+            self._update_pool(game_map, dt)
+            return
+        self._enqueue_due(dt)
+        if not self.queue:
+            return
+        start = time.perf_counter()
+        deadline = start + self.budget if self.budget else None
+        stats = self.stats
+        stats['frames'] += 1
+        snapshots = self.snapshots
+        # Instantané pris en début de frame, avant tout bot : il compte dans le budget
+        worked = snapshots.stale(game_map, self.queue[0])
+        if worked:
+            self._take_snapshot(game_map)
+        while self.queue:
+            index = self.queue[0]
+            needs_snapshot = snapshots.stale(game_map, index)
+            if deadline is not None and worked:
+                cost = self.decision_cost + (self.snapshot_cost if needs_snapshot else 0.0)
+                if time.perf_counter() + cost > deadline:
+                    stats['carried_over'] += len(self.queue)
+                    break
+            self.queue.popleft()
+            if needs_snapshot:
+                self._take_snapshot(game_map)
+            elapsed = self.clock - self.last_update[index]
+            self._served(index)
+            decision_start = time.perf_counter()
+            self.bots[index].update(game_map, elapsed, snapshots.get(game_map, index))
+            self.decision_cost = _average(self.decision_cost, time.perf_counter() - decision_start)
+            worked = True
+        self._frame_done(start)
+
+    def _frame_done(self, start):
+        """Note la durée de la frame qui a commencé à start, et si elle a dépassé le budget."""
+        stats = self.stats
+        frame_time = time.perf_counter() - start
+        stats['max_frame_time'] = max(stats['max_frame_time'], frame_time)
+        if self.budget and frame_time > self.budget:
+            stats['over_budget'] += 1
+
+    def _update_pool(self, game_map, dt):
+        """
+        Applique les lots revenus des processus (et attend ceux en route
+        depuis max_lag frames), met en file les bots dus, puis les répartit
+        sur les processus libres, sur un instantané pris maintenant. Un bot
+        reste dû jusqu'à l'application de ses commandes.
+        """
+        start = time.perf_counter()
+        worked = bool(self.in_flight)
+        for batch in list(self.in_flight):
+            future, snapshot, indices, sent = batch
+            if not future.done() and self.frame - sent <= self.max_lag:
+                continue
+            self.in_flight.remove(batch)
+            for index, (brain, commands) in zip(indices, future.result()):
+                bot = self.bots[index]
+                bot.game_map = game_map
+                bot.brain = brain
+                bot.apply(commands, snapshot)
+                self._served(index)
+            if not any(other[1] is snapshot for other in self.in_flight):
+                snapshot.release()
+        self._enqueue_due(dt)
+        if not worked and not self.queue:
+            return
+        stats = self.stats
+        stats['frames'] += 1
+        free = self.pool.processes - len(self.in_flight)
+        if free > 0 and self.queue:
+            indices = list(self.queue)
+            self.queue.clear()
+            snapshot = self._take_snapshot(game_map)
+            packed = pack(snapshot)
+            # Lots de tailles voisines, un par processus libre
+            batches = min(free, len(indices))
+            for batch in range(batches):
+                batch_indices = indices[batch::batches]
+                future = self.pool.submit(packed, [self.bots[index].brain for index in batch_indices])
+                self.in_flight.append([future, snapshot, batch_indices, self.frame])
+        elif self.queue:
+            stats['carried_over'] += len(self.queue)
+        self._frame_done(start)
+
+    def close(self):
+        """Arrête les processus de décision (les décisions en cours sont perdues)."""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        for _, snapshot, indices, _ in self.in_flight:
+            for index in indices:
+                self.due_since.pop(index, None)
+            snapshot.release()
+        self.in_flight = []
+        self.snapshots.release()
+
+    def latency(self):
+        """Âge (en secondes de jeu) de la dernière décision de chaque bot, par teamID."""
+        return {bot.team.teamID: self.clock - last for bot, last in zip(self.bots, self.last_update)}
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        ages = list(self.latency().values())
+        stats['pending'] = len(self.queue)
+        stats['max_staleness'] = max(ages, default=0.0)
+        stats['mean_staleness'] = sum(ages) / len(ages) if ages else 0.0
+        return stats
@@ -0,0 +1,583 @@
+"""
+Instantané en lecture seule du monde, pour la phase de décision des bots.
+
+Bot.update se fait en deux temps :
+  - penser (BotBrain, think) : les décisions ne lisent qu'un WorldSnapshot,
+    copie compacte de ce qui les intéresse (positions, PV, équipes,
+    ressources des joueurs, état des bâtiments, occupation et composantes
+    praticables de la carte). Elles ne touchent jamais la GameMap et peuvent
+    donc tourner dans un autre processus (Controller.bot_workers) ;
+  - appliquer (Bot.apply) : les commandes produites sont exécutées sur le
+    thread du jeu, après vérification que leurs entités existent encore.
+
+Les vues (UnitView, BuildingView, TeamView) reprennent les attributs et
+méthodes des entités que lisent les décisions. Leurs méthodes qui
+modifieraient le jeu (set_target, set_task, set_destination,
+add_to_training_queue, build) ajoutent une commande et reportent l'effet
+attendu sur la vue, pour que la suite de la même décision en tienne compte
+(un villageois occupé n'est pas réaffecté, les ressources dépensées ne le
+sont pas deux fois, l'emplacement d'un bâtiment est pris).
+"""
+import math
+import time
+
+import numpy as np
+
+from AiUtils.placement import nearest_free_footprint
+from AiUtils.threat_map import ThreatMap
+from Entity.Building import Building, Farm
+from Entity.Building.Building import UNIT_TRAINING_MAP, UNIT_CLASSES
+from Entity.Unit import Unit, Villager
+from Settings.entity_mapping import building_class_map
+from Settings.setup import villager_tasks
+
+# Commandes produites par la phase de décision
+SET_TARGET = 'set_target'      # (SET_TARGET, unité, cible ou None)
+SET_TASK = 'set_task'          # (SET_TASK, villageois, tâche, cible ou None)
+MOVE = 'move'                  # (MOVE, unité, destination ou None)
+TRAIN = 'train'                # (TRAIN, bâtiment)
+BUILD = 'build'                # (BUILD, équipe, type de bâtiment, x, y, nombre de bâtisseurs)
+PLAYER_TARGET = 'player_target'  # (PLAYER_TARGET, équipe, équipe ciblée ou None)
+
+# Anneaux testés case par case par nearest_buildable avant la recherche vectorisée
+DIRECT_RINGS = 4
+
+# Bâtisseurs d'un bâtiment sans chantier en cours (partagé, jamais modifié)
+_NO_BUILDERS = frozenset()
+
+# Coût et taille par type de bâtiment ou d'unité (une instance temporaire par type)
+_prototypes = {}
+
+
+def _prototype(entity_class):
+    prototype = _prototypes.get(entity_class)
+    if prototype is None:
+        prototype = entity_class(team=0)
+        _prototypes[entity_class] = prototype
+    return prototype
+
+
+class EntityView:
+    """Copie des attributs d'une entité lus par les décisions."""
+    __slots__ = ('snapshot', 'entity_id', 'kind', 'team', 'acronym', 'x', 'y', 'size', 'hp', 'max_hp',
+                 'state', 'has_resources')
+
+    def __init__(self, snapshot, entity):
+        self._copy(snapshot, entity)
+
+    def _copy(self, snapshot, entity):
+        self.snapshot = snapshot
+        self.entity_id = entity.entity_id
+        self.kind = type(entity)
+        self.team = entity.team
+        self.acronym = entity.acronym
+        self.x = entity.x
+        self.y = entity.y
+        self.size = entity.size
+        self.hp = entity.hp
+        self.max_hp = entity.max_hp
+        self.state = entity.state
+        self.has_resources = entity.hasResources
+
+    def isAlive(self):
+        return self.hp > 0
+
+
+class UnitView(EntityView):
+    __slots__ = ('task', 'attack_target', 'collect_kind', 'carry_total', 'path', 'path_request', 'attack_range')
+
+    def __init__(self, snapshot, unit):
+        self._copy(snapshot, unit)
+        target = unit.attack_target
+        if target is not None and target.hp > 0:
+            self.attack_target = target.entity_id
+            snapshot.pending[target.entity_id] = target
+        else:
+            self.attack_target = None
+        if self.acronym == 'v':
+            self.task = unit.task
+            collect_target = unit.collect_target
+            self.collect_kind = type(collect_target) if collect_target is not None else None
+            self.carry_total = unit.carry.total()
+        else:
+            self.task = self.collect_kind = None
+            self.carry_total = 0
+        self.path = bool(unit.path)
+        self.path_request = unit.path_request is not None
+        self.attack_range = unit.attack_range
+
+    def isAvailable(self):
+        return self.isAlive() and self.state == 'idle'
+
+    def target(self):
+        """Vue de la cible d'attaque, ou None (pas de cible, ou cible morte)."""
+        target = self.snapshot.view(self.attack_target) if self.attack_target is not None else None
+        return target if target is not None and target.isAlive() else None
+
+    def set_target(self, target):
+        """Comme Villager.set_target / Unit.set_target."""
+        if target is not None and target.entity_id is None:
+            # Chantier réservé par cette décision, pas encore posé
+            return
+        self.snapshot.record((SET_TARGET, self.entity_id, target.entity_id if target is not None else None))
+        self.attack_target = None
+        self.path = self.path_request = False
+        villager = issubclass(self.kind, Villager)
+        if villager:
+            self._set_task(None)
+            self.collect_kind = None
+        if target is None or not target.isAlive() or target.entity_id == self.entity_id:
+            return
+        if not villager:
+            if target.team is not None and target.team != self.team:
+                self.attack_target = target.entity_id
+        elif target.team == self.team and isinstance(target, BuildingView):
+            if not target.built:
+                self._set_task('build')
+            elif target.drop_point and target.state == 'idle':
+                self._set_task('stock')
+        elif target.has_resources:
+            if not (issubclass(target.kind, Farm) and not target.isBuilt()):
+                self._set_task('collect')
+                self.collect_kind = target.kind
+        elif target.team != self.team:
+            self.attack_target = target.entity_id
+
+    def set_task(self, task, target=None):
+        """Comme Villager.set_task."""
+        if task not in villager_tasks or (target is not None and target.entity_id is None):
+            return
+        self.snapshot.record((SET_TASK, self.entity_id, task, target.entity_id if target is not None else None))
+        self._set_task(task)
+
+    def _set_task(self, task):
+        """Change la tâche de la vue et les compteurs de son équipe (TeamView.villager_tasks)."""
+        if task != self.task:
+            team = self.snapshot.teams.get(self.team)
+            if team is not None:
+                team.villager_tasks[self.task] -= 1
+                team.villager_tasks[task] += 1
+            self.task = task
+
+    def set_destination(self, destination, game_map=None):
+        self.snapshot.record((MOVE, self.entity_id, destination))
+        self.path = self.path_request = destination is not None
+
+
+class BuildingView(EntityView):
+    __slots__ = ('built', 'trainable', 'queued', 'builders', 'population', 'drop_point', 'attack_range')
+
+    def __init__(self, snapshot, building):
+        self._copy(snapshot, building)
+        self.built = building.state != 'construction'
+        self.trainable = building.processTime >= building.dynamicBuildTime
+        self.queued = len(building.training_queue)
+        self.builders = {villager.entity_id for villager in building.builders} if building.builders else _NO_BUILDERS
+        self.population = building.population
+        self.drop_point = building.resourceDropPoint
+        self.attack_range = building.attack_range
+
+    def isBuilt(self):
+        return self.built
+
+    def add_to_training_queue(self, team, game_map=None):
+        """Comme Building.add_to_training_queue : 1 si l'unité est mise en formation, 0 si la population est pleine, sinon -1."""
+        if not self.trainable or self.acronym not in UNIT_TRAINING_MAP:
+            return -1
+        cost = _prototype(UNIT_CLASSES[UNIT_TRAINING_MAP[self.acronym]]).cost.get()
+        if team.resources.has_enough(cost) and team.population + self.queued < team.maximum_population:
+            team.resources.decrease_resources(cost)
+            self.queued += 1
+            self.snapshot.record((TRAIN, self.entity_id))
+            return 1
+        if team.population + self.queued >= team.maximum_population:
+            return 0
+        return -1
+
+
+class ResourceView(EntityView):
+    """Ressource neutre (arbre, or) ; les fermes sont des BuildingView."""
+    __slots__ = ()
+
+    def isBuilt(self):
+        return self.state != 'construction'
+
+
+class TeamView:
+    """
+    Copie d'une équipe : ressources, population, unités et bâtiments. Les
+    unités et les bâtiments ne sont copiés qu'à leur première lecture : une
+    décision ne regarde en général que ceux de quelques équipes.
+    """
+
+    def __init__(self, snapshot, team):
+        self.snapshot = snapshot
+        self.teamID = team.teamID
+        self.resources = team.resources.copy()
+        self.population = team.population
+        self.maximum_population = team.maximum_population
+        # Compteurs de composition (voir Team.reset_counts)
+        self.unit_counts = team.unit_counts.copy()
+        self.villager_tasks = team.villager_tasks.copy()
+        self.military_count = team.military_count
+        self.building_counts = team.building_counts.copy()
+        self.built_counts = team.built_counts.copy()
+        self.construction_count = team.construction_count
+        self.drop_point_count = team.drop_point_count
+        self._team = team
+        self._units = None
+        self._buildings = None
+
+    @property
+    def units(self):
+        if self._units is None:
+            snapshot = self.snapshot
+            views = snapshot.views
+            # Les cibles d'attaque déjà lues ont déjà leur vue (WorldSnapshot.view)
+            self._units = [views.get(unit.entity_id) or snapshot.add_view(UnitView(snapshot, unit), unit)
+                           for unit in self._team.units]
+            self._release_team()
+        return self._units
+
+    @property
+    def buildings(self):
+        if self._buildings is None:
+            snapshot = self.snapshot
+            views = snapshot.views
+            # Les fermes ont déjà leur vue (ressources de l'instantané)
+            self._buildings = [views.get(building.entity_id) or snapshot.add_view(BuildingView(snapshot, building), building)
+                               for building in self._team.buildings]
+            self._release_team()
+        return self._buildings
+
+    def _release_team(self):
+        if self._units is not None and self._buildings is not None:
+            self._team = None
+
+    def live_units(self):
+        """Unités de l'équipe : leurs vues si elles sont copiées, sinon les unités vivantes."""
+        return self._units if self._units is not None else self._team.units
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_units'] = self.units
+        state['_buildings'] = self.buildings
+        state['_team'] = None
+        return state
+
+    def build(self, building_type, x, y, num_builders, game_map=None, force=False):
+        """Comme Team.build, sur l'instantané : réserve l'emplacement et les bâtisseurs."""
+        snapshot = self.snapshot
+        if self.teamID >= len(snapshot.players):
+            return False
+        building_class = building_class_map[building_type]
+        prototype = _prototype(building_class)
+        cost = prototype.cost.get()
+        x, y = round(x), round(y)
+        if not self.resources.has_enough(cost):
+            return False
+        builders = []
+        for unit in self.units:
+            if unit.acronym == "v" and (force or unit.isAvailable()):
+                builders.append(unit)
+                if len(builders) == num_builders:
+                    break
+        if not builders or not snapshot.buildable_position(x, y, prototype.size):
+            return False
+
+        snapshot.record((BUILD, self.teamID, building_type, x, y, num_builders))
+        self.resources.decrease_resources(cost)
+        snapshot.occupancy[x:x + prototype.size, y:y + prototype.size] += 1
+        for villager in builders:
+            villager._set_task('build')
+            villager.state = 'task'
+        # Chantier provisoire, pour que les décisions suivantes le comptent
+        site = object.__new__(BuildingView)
+        site.snapshot = snapshot
+        site.entity_id = None
+        site.kind = building_class
+        site.team = self.teamID
+        site.acronym = prototype.acronym
+        site.size = prototype.size
+        site.x = x + (prototype.size - 1) / 2
+        site.y = y + (prototype.size - 1) / 2
+        site.hp = site.max_hp = prototype.max_hp
+        site.state = 'construction'
+        site.has_resources = prototype.hasResources
+        site.built = site.trainable = False
+        site.queued = 0
+        site.builders = _NO_BUILDERS
+        site.population = prototype.population
+        site.drop_point = prototype.resourceDropPoint
+        site.attack_range = prototype.attack_range
+        self.buildings.append(site)
+        self.building_counts[building_class] += 1
+        self.construction_count += 1
+        return True
+
+
+class WorldSnapshot:
+    """
+    Vue figée d'une GameMap à un instant donné. Offre aux décisions les
+    requêtes de la carte dont elles ont besoin (find_nearest_resource,
+    find_nearest_drop_point, buildable_position, nearest_buildable,
+    composantes, carte de menace), calculées sur ses propres copies.
+    """
+
+    def __init__(self, game_map):
+        self.time = time.time()
+        self.width = game_map.num_tiles_x
+        self.height = game_map.num_tiles_y
+        self.views = {}
+        self.commands = []
+        # Entités vivantes par identifiant, pour Bot.apply (jamais envoyé aux processus)
+        self.entities = {}
+        # Entités vivantes dont la vue peut être demandée par identifiant (view) avant
+        # la copie de leur équipe : cibles d'attaque, unités de la carte de menace
+        self.pending = {}
+        self.players = [TeamView(self, team) for team in game_map.players]
+        self.teams = {team.teamID: team for team in self.players}
+        game_state = game_map.game_state or {}
+        # Équipe ciblée par chaque joueur (game_state['players_target']), en vues
+        self.players_target = [self.teams.get(target.teamID) if target is not None else None
+                               for target in game_state.get('players_target') or [None] * len(self.players)]
+        self.occupancy = game_map.occupancy_grid.copy()
+        self._occupancy_view = memoryview(self.occupancy)
+        self.components = game_map.get_components().component_grid()
+
+        # Ressources collectables (mêmes clés que GameMap.resource_index) : entités, vues
+        # (créées à la première requête qui les retient) et positions
+        self.resources = {}
+        for key, index in game_map.resource_index.items():
+            entities = [entity for entity in index.iter_entities()
+                        if entity.hp > 0 and entity.state != 'construction']
+            if entities:
+                positions = np.array([(entity.x, entity.y) for entity in entities], dtype=np.float64)
+                self.resources[key] = (entities, [None] * len(entities), positions[:, 0], positions[:, 1])
+
+        # Carte de menace (threat_map), calculée à la première demande
+        self._threat_map = None
+
+    def release(self):
+        """
+        Oublie les vues et les entités. Les vues référençant l'instantané,
+        celui-ci ne serait sinon libéré que par le ramasse-miettes cyclique,
+        dont les passes complètes coûtent cher avec des dizaines de milliers
+        d'entités vivantes.
+        """
+        self.views = {}
+        self.entities = {}
+        self.pending = {}
+        self.players = []
+        self.teams = {}
+        self.players_target = []
+        self.resources = {}
+        self._threat_map = None
+
+    def __getstate__(self):
+        # Toutes les vues doivent exister avant la copie de views
+        for team in self.players:
+            team.units
+            team.buildings
+        resources = {}
+        for key, (entities, views, xs, ys) in self.resources.items():
+            views = [self._resource_view(entities, views, i) for i in range(len(views))]
+            resources[key] = (None, views, xs, ys)
+        state = self.__dict__.copy()
+        state['resources'] = resources
+        state['entities'] = {}
+        state['pending'] = {}
+        state['commands'] = []
+        del state['_occupancy_view']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._occupancy_view = memoryview(self.occupancy)
+
+    def add_view(self, view, entity):
+        self.views[view.entity_id] = view
+        self.entities[view.entity_id] = entity
+        return view
+
+    def record(self, command):
+        self.commands.append(command)
+
+    def view(self, entity_id):
+        """Vue de l'entité entity_id, copiée maintenant si son équipe ne l'est pas encore ; None si inconnue."""
+        view = self.views.get(entity_id)
+        if view is None:
+            entity = self.pending.get(entity_id)
+            if entity is not None:
+                if isinstance(entity, Unit):
+                    view_class = UnitView
+                elif isinstance(entity, Building):
+                    view_class = BuildingView
+                else:
+                    view_class = ResourceView
+                view = self.add_view(view_class(self, entity), entity)
+        return view
+
+    def _resource_view(self, entities, views, i):
+        view = views[i]
+        if view is None:
+            entity = entities[i]
+            view = self.views.get(entity.entity_id)
+            if view is None:
+                view_class = BuildingView if isinstance(entity, Farm) else ResourceView
+                view = self.add_view(view_class(self, entity), entity)
+            views[i] = view
+        return view
+
+    # ------------- Requêtes (mêmes règles que GameMap) -------------
+
+    def buildable_position(self, x, y, size=1):
+        x, y = round(x), round(y)
+        if x < 0 or y < 0 or x + size - 1 >= self.width or y + size - 1 >= self.height:
+            return False
+        if self._occupancy_view[x, y] or size == 1:
+            return not self._occupancy_view[x, y]
+        return not self.occupancy[x:x + size, y:y + size].any()
+
+    def nearest_buildable(self, x, y, size, radius):
+        """
+        Origine constructible (buildable_position) la plus proche de (x, y),
+        de 1 à radius cases, en parcourant les anneaux autour de (x, y) ; None
+        s'il n'y en a pas. Les DIRECT_RINGS premiers anneaux sont testés case
+        par case, les suivants d'un coup (AiUtils.placement), sur une table des
+        sommes refaite à chaque recherche plutôt que tenue à jour. Comme
+        l'ancienne boucle de find_building_location, la recherche ne se limite
+        pas à la zone de l'équipe : seule la proximité de (x, y) compte.
+        """
+        x, y = round(x), round(y)
+        for ring in range(1, min(radius, DIRECT_RINGS) + 1):
+            for dx in range(-ring, ring + 1):
+                # Tout le côté en dx = ±ring, seulement les deux coins sinon
+                step = 1 if abs(dx) == ring else 2 * ring
+                for dy in range(-ring, ring + 1, step):
+                    if self.buildable_position(x + dx, y + dy, size):
+                        return (x + dx, y + dy)
+        if radius <= DIRECT_RINGS:
+            return None
+        return nearest_free_footprint(self.occupancy, x, y, size, radius, first_ring=DIRECT_RINGS + 1)
+
+    def get_components(self):
+        return self
+
+    def reaches_entity(self, start, entity):
+        """Comme WalkableComponents.reaches_entity : emprise de entity ou cases à son contact."""
+        x, y = round(start[0]), round(start[1])
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return True
+        component = self.components[x, y]
+        if component < 0:
+            return True
+        origin_x = round(entity.x - (entity.size - 1) / 2)
+        origin_y = round(entity.y - (entity.size - 1) / 2)
+        x0, y0 = max(origin_x - 1, 0), max(origin_y - 1, 0)
+        x1, y1 = origin_x + entity.size + 1, origin_y + entity.size + 1
+        return bool((self.components[x0:x1, y0:y1] == component).any())
+
+    def find_nearest_resource(self, resource_type, x, y, max_radius=None, team=None, reachable_from=None):
+        """Comme GameMap.find_nearest_resource."""
+        best_resource = None
+        best_distance_sq = None
+        for key, (entities, views, xs, ys) in self.resources.items():
+            if isinstance(key, tuple):
+                resource_class, owner = key
+                if team is None or owner != team:
+                    continue
+            else:
+                resource_class = key
+            if not issubclass(resource_class, resource_type):
+                continue
+            distances_sq = (xs - x) ** 2 + (ys - y) ** 2
+            limit = max_radius * max_radius if max_radius is not None else math.inf
+            if best_distance_sq is not None:
+                limit = min(limit, best_distance_sq)
+            candidates = np.flatnonzero(distances_sq <= limit)
+            for i in candidates[np.argsort(distances_sq[candidates], kind='stable')].tolist():
+                view = self._resource_view(entities, views, i)
+                if not view.isAlive():
+                    continue
+                if reachable_from is None or self.reaches_entity(reachable_from, view):
+                    best_resource = view
+                    best_distance_sq = distances_sq[i]
+                    break
+        return best_resource
+
+    def find_nearest_drop_point(self, team, x, y, built_only=True):
+        """Comme GameMap.find_nearest_drop_point."""
+        team_view = self.teams.get(team)
+        if team_view is None:
+            return None
+        best, best_distance_sq = None, None
+        for building in team_view.buildings:
+            if not building.drop_point or building.entity_id is None or not building.isAlive():
+                continue
+            if built_only and not building.built:
+                continue
+            distance_sq = (building.x - x) ** 2 + (building.y - y) ** 2
+            if best_distance_sq is None or distance_sq < best_distance_sq:
+                best, best_distance_sq = building, distance_sq
+        return best
+
+    def threat_map(self):
+        """
+        ThreatMap des unités de l'instantané, partagée par tous les bots qui y
+        décident. Elle lit les unités vivantes des équipes pas encore copiées,
+        sans créer leurs vues (view les crée pour les ennemis retenus).
+        """
+        if self._threat_map is None:
+            pending = self.pending
+            units = []
+            for team in self.players:
+                team_units = team.live_units()
+                if team._units is None:
+                    for unit in team_units:
+                        pending[unit.entity_id] = unit
+                units.extend(team_units)
+            self._threat_map = ThreatMap(self.width, self.height, units)
+        return self._threat_map
+
+
+class SharedSnapshot:
+    """
+    Instantané commun à plusieurs bots : le même sert tant qu'aucun des bots
+    qui le demandent n'y a déjà décidé, sinon il est repris. Avec per_tick,
+    il est aussi repris dès que la carte a avancé d'un tick (GameMap.ticks).
+    """
+
+    def __init__(self, per_tick=False):
+        self.per_tick = per_tick
+        self.snapshot = None
+        self.game_map = None
+        self.tick = None
+        # Bots qui ont déjà décidé sur l'instantané courant
+        self.users = set()
+
+    def stale(self, game_map, user):
+        """Vrai si user ne peut pas décider sur l'instantané courant."""
+        return (self.snapshot is None or user in self.users or game_map is not self.game_map
+                or (self.per_tick and game_map.ticks != self.tick))
+
+    def take(self, game_map):
+        """Remplace l'instantané courant par un instantané de game_map pris maintenant."""
+        self.release()
+        self.snapshot = WorldSnapshot(game_map)
+        self.game_map = game_map
+        self.tick = game_map.ticks
+        return self.snapshot
+
+    def get(self, game_map, user):
+        """Instantané sur lequel user décide (repris s'il le faut)."""
+        if self.stale(game_map, user):
+            self.take(game_map)
+        self.users.add(user)
+        return self.snapshot
+
+    def release(self):
+        if self.snapshot is not None:
+            self.snapshot.release()
+        self.snapshot = self.game_map = None
+        self.users = set()
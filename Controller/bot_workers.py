@@ -0,0 +1,49 @@
+"""
+Décisions des bots dans des processus séparés (optionnel, BotScheduler).
+
+Un lot part vers un processus du pool avec le WorldSnapshot sur lequel il
+doit être décidé (vues seulement : WorldSnapshot.__getstate__ laisse les
+entités vivantes sur place) et les BotBrain concernés (sans arbre de
+décision, recréé de l'autre côté). Le processus renvoie chaque cerveau mis à
+jour avec ses commandes ; BotScheduler les applique sur le thread du jeu
+(Bot.apply) à une frame suivante, dès que le lot est prêt.
+
+L'instantané est sérialisé une fois, sur le thread du jeu (pack) : ses vues
+paresseuses lisent les entités vivantes, ce que le thread d'envoi du pool ne
+doit pas faire pendant que la partie avance, et tous les lots d'un même
+instantané partagent ces octets.
+"""
+import atexit
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+
+def pack(snapshot):
+    """Instantané sérialisé pour BotThinkPool.submit (à appeler sur le thread du jeu)."""
+    return pickle.dumps(snapshot, pickle.HIGHEST_PROTOCOL)
+
+
+def _think_batch(packed, brains):
+    """Exécuté dans un processus du pool : [cerveau, ...] -> [(cerveau, commandes), ...]."""
+    snapshot = pickle.loads(packed)
+    return [(brain, brain.think(snapshot)) for brain in brains]
+
+
+class BotThinkPool:
+    """Pool de processus où les bots décident sur des instantanés."""
+
+    def __init__(self, processes):
+        self.processes = processes
+        self.executor = ProcessPoolExecutor(processes)
+        atexit.register(self.close)
+
+    def submit(self, packed, brains):
+        """Lance la décision de brains sur l'instantané packed (pack) ; retourne un Future de [(cerveau, commandes), ...]."""
+        return self.executor.submit(_think_batch, packed, brains)
+
+    def close(self):
+        """Arrête les processus (les lots en attente sont abandonnés)."""
+        atexit.unregister(self.close)
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
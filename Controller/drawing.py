@@ -143,8 +143,14 @@ def draw_map(screen, screen_width, screen_height, game_map, camera, players, tea
     game_state['train_button_rects'] = {}
     current_time = time.time()
 
+    # Les entités endormies (GameMap.sleep_entity) ne passent plus par update :
+    # l'animation de celles qui sont visibles avance ici
+    sleeping_entities = game_map.sleeping_entities
+
     # Draw entities
     for entity in visible_list:
+        if entity in sleeping_entities:
+            entity.animator(delta_time)
         entity.display_hitbox(screen, screen_width, screen_height, camera)
         entity.display(screen, screen_width, screen_height, camera, delta_time)
         entity.display_range(screen, screen_width, screen_height, camera)
@@ -394,7 +394,7 @@ def handle_events(event, game_state):
                     building_clicked = find_entity_by_id(game_state, clicked_building_id)
                     if building_clicked and selected_player:
                         if building_clicked.team == selected_player.teamID:
-                            success = building_clicked.add_to_training_queue(selected_player)
+                            success = building_clicked.add_to_training_queue(selected_player, game_state.get('game_map'))
                             game_state['player_info_updated'] = True
                             if success in {-1, 0}:
                                 if 'insufficient_resources_feedback' not in game_state:
@@ -8,6 +8,7 @@ import os
 import Controller.ui_theme as theme
 
 from Controller.Bot import Bot
+from Controller.bot_scheduler import BotScheduler
 from Models.Map import GameMap
 from Entity.Building import *
 from Entity.Unit import *
@@ -44,7 +45,6 @@ from Settings.setup import (
     BG_RATIO,
     ONE_SECOND,
     FPS_DRAW_LIMITER,
-    DPS,
     SAVE_DIRECTORY
 )
 from Settings.sync import TEMP_SAVE_PATH
@@ -308,8 +308,7 @@ def game_loop(screen, game_map, screen_width, screen_height, players):
     running = True
     update_counter = 0
     draw_timer = 0
-    bot_update_timer = 0
-    bot_update_interval = 1.0 / DPS
+    bot_scheduler = BotScheduler(bots)
     last_time = time.time()
     
     # Pré-calcul du target FPS
@@ -331,15 +330,11 @@ def game_loop(screen, game_map, screen_width, screen_height, players):
 
             dt = 0 if game_state['paused'] else raw_dt * GAME_SPEED
 
-            # Mise à jour des bots (avec timer)
+            # Mise à jour des bots (étalée sur les frames, voir BotScheduler)
             if not game_state['paused']:
-                bot_update_timer += dt
-                if bot_update_timer >= bot_update_interval:
-                    # with ProfileSection('bot_update'):
-                    if True:
-                        for bot in bots:
-                            bot.update(game_map, bot_update_interval)
-                    bot_update_timer = 0
+                # with ProfileSection('bot_update'):
+                if True:
+                    bot_scheduler.update(game_map, dt)
 
             # Gestion caméra et événements (mode GUI uniquement)
             if not is_terminal_only:
@@ -536,5 +531,8 @@ def game_loop(screen, game_map, screen_width, screen_height, players):
             bot_modes = game_map.game_state.get('bot_modes', ['economique'] * len(players))
             bots, bot_modes = create_bots(players, game_map, bot_modes)
             game_map.game_state['bot_modes'] = bot_modes
+            bot_scheduler.close()
+            bot_scheduler = BotScheduler(bots)
 
+    bot_scheduler.close()
     return "done"
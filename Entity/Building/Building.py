@@ -73,6 +73,18 @@ class Building(Entity):
         self.current_training_time_left = 0
         self.training_progress = 0.0
 
+    @property
+    def state(self):
+        return self.__dict__['state']
+
+    @state.setter
+    def state(self, state):
+        # Stocké sous le même nom qu'avant (sauvegardes) ; tient à jour Team.built_counts
+        previous = self.__dict__.get('state')
+        self.__dict__['state'] = state
+        if (previous == 'construction') != (state == 'construction') and self._owner is not None:
+            self._owner.construction_changed(self, state != 'construction')
+
     # ---------------- Update Entity --------------
     def update(self, game_map, dt):
         if self.isAlive():
@@ -83,6 +95,12 @@ class Building(Entity):
             self.death(game_map)
         self.animator(dt)
 
+    def can_sleep(self):
+        # Rien à simuler : ni constructeurs, ni file d'entraînement ; l'animation
+        # d'un bâtiment endormi avance au dessin (draw_map)
+        return (self.isAlive() and not self.builders and not self.training_queue
+                and not self.current_training_unit and self.state in ('idle', 'construction'))
+
     def seekIdle(self):
         if self.processTime >= self.dynamicBuildTime and self.isAlive() and self.state not in ['training']:
             self.dynamicBuildTime = self.buildTime
@@ -140,10 +158,11 @@ class Building(Entity):
 
         draw_buildProcess(screen, sx, sy, self.dynamicBuildTime - self.processTime, camera.zoom)
 
-    def add_to_training_queue(self, team):
+    def add_to_training_queue(self, team, game_map=None):
         """
         Attempt to enqueue a new unit if enough resources and not in constuction. 
         Return 1 if successful, 0 if max population's reached, otherwise -1.
+        game_map is used to wake the building up if it was sleeping.
         """
         if self.processTime < self.dynamicBuildTime:
             return -1
@@ -159,6 +178,8 @@ class Building(Entity):
             team.population + len(self.training_queue) < team.maximum_population):
             team.resources.decrease_resources(unit.cost.get())
             self.training_queue.append(unit_name)
+            if game_map:
+                game_map.wake_entity(self)
             return 1
         
         if team.population + len(self.training_queue) >= team.maximum_population:
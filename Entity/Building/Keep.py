@@ -31,10 +31,19 @@ class Keep(Building):
             self.seekConstruction(dt)  
             self.seekAttack(game_map, dt)            
             self.seekIdle()
+            # Sans cible (cible morte, construction achevée) : chercher un ennemi
+            # déjà à portée avant que can_sleep ne laisse la tour s'endormir
+            if self.attack_target is None and self.isBuilt():
+                self.scanRange(game_map)
         else:
             self.death(game_map)
         self.animator(dt)
 
+    def can_sleep(self):
+        # update a déjà cherché un ennemi à portée ; ensuite, un ennemi qui entre
+        # dans la portée réveille la tour (GameMap._wake_sentries_near)
+        return self.attack_target is None and super().can_sleep()
+
     def scanRange(self, game_map):
         if self.attack_target:
             return
@@ -94,6 +103,7 @@ class Keep(Building):
                     self.attack_timer += dt
                     if self.attack_timer >= self.attack_speed:
                         self.attack_target.hp -= self.attack_power
+                        game_map.wake_entity(self.attack_target)
                         self.attack_timer = 0
                 else :
                     self.attack_timer = 0
@@ -45,6 +45,8 @@ class Entity:
     
     id: int = 0
     HEALTH_BAR_DISPLAY_DURATION: float = 3.0
+    # Team whose composition counters include this entity (set by Team.add_member)
+    _owner = None
     
     def __init__(
         self, 
@@ -130,6 +132,15 @@ class Entity:
         """Check if the entity is in idle state."""
         return self.state == 'idle'
 
+    def can_sleep(self) -> bool:
+        """
+        Check if the entity has nothing left to simulate.
+        
+        GameMap.patch stops updating a sleeping entity until an event
+        (damage, extraction, training order...) wakes it up.
+        """
+        return False
+
     def notify_damage(self) -> None:
         """Record the time when entity was last damaged."""
         self.last_damage_time = time.time()
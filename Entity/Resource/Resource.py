@@ -17,6 +17,10 @@ class Resource(Entity):
         if not self.isAlive():
             self.kill()
 
+    def can_sleep(self):
+        # Le variant ne change que quand une récolte modifie les hp (qui réveille la ressource)
+        return self.isAlive()
+
     def kill(self):
         self.current_frame = 0
         self.hp = 0
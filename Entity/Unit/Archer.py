@@ -2,7 +2,6 @@ from Models.Resources import Resources
 import math
 import pygame
 import random
-from AiUtils.aStar import a_star
 from Entity.Entity import Entity
 from Entity.Unit import Unit
 from Entity.Building import Building
@@ -53,6 +52,7 @@ class Archer(Unit):
                     self.threw = False
                     self.current_frame = 0
                     self.path = []
+                    self.path_request = None
                 
                 elif self.current_frame == self.frames - 1:
                     self.cooldown_frame = self.current_frame
@@ -72,11 +72,11 @@ class Archer(Unit):
                 self.attack_target.hitbox_color = (255, 255, 255)
                 if isinstance(self.attack_target, Unit):
                     if self.path:
-                        self.path = [self.path[0]] + a_star((self.x, self.y), (self.attack_target.x,self.attack_target.y), game_map)
-                    else:
+                        self.chase((self.attack_target.x,self.attack_target.y), game_map)
+                    elif not self.path_request:
                         self.set_destination((self.attack_target.x,self.attack_target.y), game_map)
                 else:
-                    if not self.path:
+                    if not self.path and not self.path_request:
                         self.set_destination((self.attack_target.x,self.attack_target.y), game_map)
 
                 self.attack_timer = 0
@@ -1,7 +1,10 @@
 import math
 import pygame
 import random
-from AiUtils.aStar import a_star
+from AiUtils.aStar import a_star, repair_path, rejoin_path, prepare_a_star, resolve_goal
+from AiUtils.hpa import plan_path, next_segment, needs_hierarchy
+from AiUtils.path_smoothing import line_of_sight
+from AiUtils.path_requests import CHASE, CHASE_REPATH_DISTANCE, CHASE_REPATH_RATIO
 from Entity.Entity import Entity
 from Entity.Building import Building
 from Settings.setup import FRAMES_PER_UNIT, HALF_TILE_SIZE,TILE_SIZE, ALLOWED_ANGLES, ATTACK_RANGE_EPSILON, UNIT_HITBOX
@@ -9,6 +12,18 @@ from Controller.utils import tile_to_screen, get_direction, get_snapped_angle, n
 from Controller.drawing import draw_sprite, draw_hitbox, draw_path
 
 class Unit(Entity):
+    # Valeurs par défaut pour les sauvegardes antérieures à ces attributs
+    pathfinding_attempts = 0
+    max_pathfinding_attempts = 5
+    # Points de passage restants d'un long trajet (voir AiUtils.hpa) et son but
+    route = None
+    route_goal = None
+    # Demande en attente dans game_map.path_requests, et dernier but qu'elle n'a pas pu atteindre
+    path_request = None
+    path_failed_goal = None
+    # Destination qui a servi à calculer le chemin courant (voir chase)
+    path_goal = None
+
     def __init__(
         self,
         x,
@@ -60,7 +75,7 @@ class Unit(Entity):
 
     # ---------------- Controller ----------------
     def seekIdle(self):
-        if not self.attack_target and not self.path:
+        if not self.attack_target and not self.path and not self.path_request:
             self.state = 'idle'
         self.cooldown_frame = None
 
@@ -72,23 +87,122 @@ class Unit(Entity):
             
 
     def set_destination(self, destination, game_map):
+        """
+        Demande un chemin vers destination à la file de la carte (AiUtils.path_requests) :
+        self.path reste vide jusqu'à ce qu'elle soit servie. None annule la demande en cours.
+        """
+        self.route = None
+        self.path = []
+        self.path_request = None
+        self.path_goal = None
         if destination and game_map:
-            self.path = a_star((self.x, self.y), destination, game_map)
-        else:
-            self.path = []
+            if self.path_failed_goal == (round(destination[0]), round(destination[1])):
+                # La dernière recherche vers ce but a échoué : l'appelant compte la tentative
+                self.path_failed_goal = None
+                return
+            game_map.path_requests.submit(self, destination)
+
+    def chase(self, destination, game_map):
+        """
+        Poursuite : garde le chemin tant que la cible reste près du but qui a
+        servi à le calculer. Sinon le chemin est raccordé au nouveau but
+        (repair_path) et n'est redemandé à la file qu'en cas d'échec, en
+        gardant la case en cours.
+        """
+        if self.path_goal is not None:
+            threshold = max(CHASE_REPATH_DISTANCE, CHASE_REPATH_RATIO * math.dist((self.x, self.y), destination))
+            if math.dist(self.path_goal, destination) <= threshold:
+                return
+        self.route = None
+        path = repair_path(self.path, destination, game_map)
+        if path is not None:
+            self.path = path
+            self.path_goal = destination
+            self.path_request = None
+            return
+        request = self.path_request
+        if request and request[0] == CHASE and (round(request[1][0]), round(request[1][1])) == (round(destination[0]), round(destination[1])):
+            return
+        game_map.path_requests.submit(self, destination, CHASE)
+
+    def compute_destination(self, destination, game_map):
+        """Chemin et route hiérarchique éventuelle vers destination : champ de flux, A* ou HPA*."""
+        path = game_map.get_flow_fields().request_path((self.x, self.y), destination)
+        if path is not None:
+            return path, None
+        return plan_path((self.x, self.y), destination, game_map)
+
+    def find_path(self, destination, game_map):
+        """Chemin vers destination : champ de flux si le but est partagé, sinon A*."""
+        path = game_map.get_flow_fields().request_path((self.x, self.y), destination)
+        if path is None:
+            path = a_star((self.x, self.y), destination, game_map)
+        return path
+
+    def plan_request(self, destination, game_map, mode):
+        """
+        compute_destination (route) ou find_path (poursuite) sans lancer de
+        recherche A* : retourne (path, route, query), query étant la recherche
+        restante (prepare_a_star) à confier à game_map.path_workers, ou None
+        si path est déjà le résultat.
+        """
+        path = game_map.get_flow_fields().request_path((self.x, self.y), destination)
+        if path is not None:
+            return path, None, None
+        if mode != CHASE:
+            goal_tile, _ = resolve_goal((self.x, self.y), destination, game_map)
+            if goal_tile and needs_hierarchy((round(self.x), round(self.y)), goal_tile, game_map):
+                path, route = plan_path((self.x, self.y), destination, game_map)
+                return path, route, None
+        path, query = prepare_a_star((self.x, self.y), destination, game_map)
+        return path, None, query
+
+    def receive_path(self, path, route, destination, mode):
+        """Résultat d'une demande servie par game_map.path_requests."""
+        self.path_request = None
+        self.path_goal = destination
+        if mode == CHASE:
+            # Le changement de case est suivi en cours de segment (cross_tile) : le nouveau chemin remplace l'ancien
+            self.path = path
+            return
+        self.path = path
+        if route:
+            self.route = route
+            self.route_goal = destination
+        if not path:
+            self.path_failed_goal = (round(destination[0]), round(destination[1]))
+
+    def follow_route(self, game_map):
+        """Affine le segment suivant de la route hiérarchique, ou la replanifie s'il est bloqué."""
+        self.path = next_segment((self.x, self.y), self.route, self.route_goal, game_map)
+        if not self.path:
+            self.set_destination(self.route_goal, game_map)
+        elif not self.route:
+            self.route = None
 
     def kill(self):
         self.state = 'death'
         self.cooldown_frame = None
         self.attack_target = None
         self.path = []
+        self.path_request = None
         self.current_frame = 0
         self.hp = 0
     # ---------------- Move Logic ----------------
     def seekMove(self, game_map, dt, ALLOWED_ANGLES=ALLOWED_ANGLES):
         if self.path:
             self.state = 'walk'
-            target_tile = self.path[0]        
+            batch = getattr(game_map, 'movement_batch', None)
+            if batch is not None:
+                # Le pas est calculé avec celui des autres unités à la fin de GameMap.patch
+                batch.append(self)
+            else:
+                self.step_along_path(game_map, dt)
+            return self.path
+
+    def step_along_path(self, game_map, dt):
+        if self.path:
+            target_tile = self.path[0]
             snapped_angle = get_snapped_angle(((self.x, self.y)), (target_tile[0], target_tile[1]))
             self.direction = get_direction(snapped_angle)
             diff = [target_tile[0] - self.x, target_tile[1] - self.y]
@@ -97,6 +211,7 @@ class Unit(Entity):
                 step = [component * dt *  self.speed for component in diff]
             else :
                 step = (0, 0)
+            old_tile = (round(self.x), round(self.y))
             self.x += step[0]
             self.y += step[1]
 
@@ -104,12 +219,41 @@ class Unit(Entity):
             dy = target_tile[1] - self.y
                 
             if abs(dx) <= abs(step[0]) and abs(dy) <= abs(step[1]):
-                self.path.pop(0)
-                old_position = game_map.remove_entity(self)
-                if not game_map.add_entity(self, self.x, self.y):
-                    game_map.add_entity(self, old_position[0], old_position[1])
+                self.end_path_step(game_map, step)
+            elif (round(self.x), round(self.y)) != old_tile:
+                self.cross_tile(game_map, step)
 
-            return self.path
+    def end_path_step(self, game_map, step):
+        """Case du chemin atteinte : passer à la suivante et changer de tuile sur la carte."""
+        self.path.pop(0)
+        if not game_map.move_entity(self, self.x, self.y):
+            # Destination bloquée : revenir à la position précédente
+            self.x -= step[0]
+            self.y -= step[1]
+        if not self.path and self.route:
+            self.follow_route(game_map)
+
+    def cross_tile(self, game_map, step):
+        """
+        Changement de case au milieu d'un segment (les chemins lissés sautent
+        des cases) : l'unité change de tuile sur la carte. Si la case est
+        bloquée, revenir en arrière et repasser par le centre de la case
+        courante quand le point visé en est visible, sinon rejoindre le
+        chemin par un court détour (rejoin_path) ou, à défaut, replanifier.
+        """
+        if game_map.move_entity(self, self.x, self.y):
+            return
+        self.x -= step[0]
+        self.y -= step[1]
+        tile = (round(self.x), round(self.y))
+        if self.path[0] != tile and line_of_sight(tile, self.path[0], game_map):
+            self.path.insert(0, tile)
+            return
+        path = rejoin_path(tile, self.path, game_map)
+        if path:
+            self.path = [tile] + path
+        else:
+            self.set_destination(self.route_goal if self.route else self.path_goal or self.path[-1], game_map)
 
     def seekCollision(self, game_map, dt):
         if self.path:
@@ -141,10 +285,8 @@ class Unit(Entity):
                             force = [f / 7 for f in force]
                             new_pos = (self.x + force[0], self.y + force[1])
                             if game_map.walkable_position(new_pos):
-                                old_position = game_map.remove_entity(self)
                                 self.hitbox_color = (255, 0, 0)
-                                if not game_map.add_entity(self, new_pos[0], new_pos[1]):
-                                    game_map.add_entity(self, old_position[0], old_position[1])
+                                game_map.move_entity(self, new_pos[0], new_pos[1])
             return True
 
     # ---------------- Attack Logic ----------------
@@ -173,6 +315,7 @@ class Unit(Entity):
                 if self.attack_timer == 0:
                     self.current_frame = 0
                     self.path = []
+                    self.path_request = None
                 
                 elif self.current_frame == self.frames - 1:
                     self.cooldown_frame = self.current_frame
@@ -180,6 +323,7 @@ class Unit(Entity):
                 self.attack_timer += dt
                 if self.attack_timer >= self.attack_speed:
                     self.attack_target.hp -= self.attack_power
+                    game_map.wake_entity(self.attack_target)
                     self.attack_timer = 0
                     self.cooldown_frame = None
             else :
@@ -187,11 +331,11 @@ class Unit(Entity):
                 self.attack_target.hitbox_color = (255, 255, 255)
                 if isinstance(self.attack_target, Unit):
                     if self.path:
-                        self.path = [self.path[0]] + a_star((self.x, self.y), (self.attack_target.x,self.attack_target.y), game_map)
+                        self.chase((self.attack_target.x,self.attack_target.y), game_map)
                         self.pathfinding_attempts = 0  # Réinitialiser si on a un chemin
-                    else:
+                    elif not self.path_request:
                         self.set_destination((self.attack_target.x,self.attack_target.y), game_map)
-                        if not self.path:
+                        if not self.path and not self.path_request:
                             self.pathfinding_attempts += 1
                             # Abandonner la cible si trop de tentatives échouées
                             if self.pathfinding_attempts >= self.max_pathfinding_attempts:
@@ -200,9 +344,9 @@ class Unit(Entity):
                         else:
                             self.pathfinding_attempts = 0
                 else:
-                    if not self.path:
+                    if not self.path and not self.path_request:
                         self.set_destination((self.attack_target.x,self.attack_target.y), game_map)
-                        if not self.path:
+                        if not self.path and not self.path_request:
                             self.pathfinding_attempts += 1
                             if self.pathfinding_attempts >= self.max_pathfinding_attempts:
                                 self.attack_target = None
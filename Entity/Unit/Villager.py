@@ -2,7 +2,6 @@ import math
 import pygame
 from Settings.setup import MAXIMUM_CARRY, RESOURCE_RATE_PER_SEC, Resources, FRAMES_PER_UNIT, HALF_TILE_SIZE,TILE_SIZE, ALLOWED_ANGLES, ATTACK_RANGE_EPSILON, UNIT_HITBOX, villager_tasks, UNIT_ATTACKRANGE
 from Entity.Unit.Unit import Unit
-from AiUtils.aStar import a_star
 from Controller.utils import tile_to_screen, get_direction, get_snapped_angle, normalize
 from Controller.terminal_display_debug import debug_print
 import random
@@ -11,6 +10,9 @@ from Controller.drawing import draw_sprite, draw_hitbox, draw_path
 
 
 class Villager(Unit):
+    # Valeur par défaut pour les sauvegardes antérieures à cet attribut
+    last_resource_type = None
+
     def __init__(self, team=None, x=0, y=0):
         super().__init__(
             x=x,
@@ -35,6 +37,18 @@ class Villager(Unit):
         self.task_timer = 0
         self.last_resource_type = None
 
+    @property
+    def task(self):
+        return self.__dict__['task']
+
+    @task.setter
+    def task(self, task):
+        # Stockée sous le même nom qu'avant (sauvegardes) ; tient à jour Team.villager_tasks
+        previous = self.__dict__.get('task')
+        self.__dict__['task'] = task
+        if previous != task and self._owner is not None:
+            self._owner.task_changed(previous, task)
+
     # ---------------- Update Unit ---------------
     def update(self, game_map, dt):
         self.animator(dt)
@@ -52,7 +66,7 @@ class Villager(Unit):
 
     # ---------------- Controller ----------------
     def seekIdle(self):
-        if not self.attack_target and not self.collect_target and not self.stock_target and not self.build_target  and not self.path :
+        if not self.attack_target and not self.collect_target and not self.stock_target and not self.build_target  and not self.path and not self.path_request:
             self.state = 'idle'
             self.set_task(None)
         self.cooldown_frame = None
@@ -96,29 +110,9 @@ class Villager(Unit):
         if not resource_type:
             return None
         
-        vx, vy = int(self.x), int(self.y)
-        best_resource = None
-        best_distance = float('inf')
-        
         # Chercher dans un rayon de 10 cases
-        for radius in range(1, 11):
-            for dx in range(-radius, radius + 1):
-                for dy in range(-radius, radius + 1):
-                    if abs(dx) != radius and abs(dy) != radius:
-                        continue
-                    
-                    pos = (vx + dx, vy + dy)
-                    entities = game_map.resources.get(pos)
-                    if entities:
-                        for entity in entities:
-                            if isinstance(entity, resource_type) and entity.isAlive():
-                                dist = abs(dx) + abs(dy)
-                                if dist < best_distance:
-                                    best_distance = dist
-                                    best_resource = entity
-            if best_resource:
-                return best_resource
-        return None
+        return game_map.find_nearest_resource(resource_type, self.x, self.y, max_radius=10, team=self.team,
+                                              reachable_from=(self.x, self.y))
 
     def seekCollect(self, game_map, dt):
         if self.task != 'collect':
@@ -139,15 +133,7 @@ class Villager(Unit):
             if self.carry.total() > 0:
                 # S'assurer qu'on a un stock_target avant de passer en stock
                 if not self.stock_target or not self.stock_target.isAlive():
-                    closest_building = None
-                    min_distance = float('inf')
-                    for building in game_map.players[self.team].buildings:
-                        if building.resourceDropPoint:
-                            distance = math.dist((self.x, self.y), (building.x, building.y))
-                            if distance < min_distance:
-                                min_distance = distance
-                                closest_building = building
-                    self.stock_target = closest_building
+                    self.stock_target = game_map.find_nearest_drop_point(self.team, self.x, self.y, built_only=False)
                 
                 if self.stock_target:
                     self.task = 'stock'
@@ -173,9 +159,9 @@ class Villager(Unit):
 
         # Stop if carrying too much or far away
         if distance > 0 or self.carry.total() >= MAXIMUM_CARRY:
-            if not self.path:
+            if not self.path and not self.path_request:
                 self.set_destination((self.collect_target.x, self.collect_target.y), game_map)
-                if not self.path:
+                if not self.path and not self.path_request:
                     self.pathfinding_attempts += 1
                     # Abandonner si trop de tentatives échouées
                     if self.pathfinding_attempts >= self.max_pathfinding_attempts:
@@ -221,6 +207,7 @@ class Villager(Unit):
                                                                                  collected_whole,
                                                                                  collected_whole))
             self.collect_target.hp -= max(resource_collected)
+            game_map.wake_entity(self.collect_target)
             self.carry.increase_resources(resource_collected)
             self.temp_collect_amount = 0
 
@@ -269,18 +256,11 @@ class Villager(Unit):
 
                     self.task = None
                     self.collect_target = None
-            elif not self.path:
+            elif not self.path and not self.path_request:
                 self.set_destination((self.stock_target.x, self.stock_target.y), game_map)
        
         else:
-            closest_building = None
-            min_distance = float('inf')
-            for building in game_map.players[self.team].buildings:
-                if building.resourceDropPoint:
-                    distance = math.dist((self.x, self.y),(building.x, building.y))
-                    if distance < min_distance:
-                        min_distance = distance
-                        closest_building = building
+            closest_building = game_map.find_nearest_drop_point(self.team, self.x, self.y, built_only=False)
             if closest_building:
                 self.stock_target = closest_building
             else:
@@ -298,6 +278,7 @@ class Villager(Unit):
 
         if self not in self.build_target.builders:
             self.build_target.builders.add(self)
+            game_map.wake_entity(self.build_target)
         corner_distance = self.build_target.size / 2.0
         left = self.build_target.x - corner_distance
         right = self.build_target.x + corner_distance
@@ -311,11 +292,11 @@ class Villager(Unit):
 
         if distance > 0 :
             if self.path:
-                self.path = [self.path[0]] + a_star((self.x, self.y), (self.build_target.x,self.build_target.y), game_map)
+                self.chase((self.build_target.x,self.build_target.y), game_map)
                 self.pathfinding_attempts = 0
-            else:
+            elif not self.path_request:
                 self.set_destination((self.build_target.x,self.build_target.y), game_map)
-                if not self.path:
+                if not self.path and not self.path_request:
                     self.pathfinding_attempts += 1
                     # Abandonner la tâche si trop de tentatives échouées
                     if self.pathfinding_attempts >= self.max_pathfinding_attempts:
@@ -358,11 +339,13 @@ class Villager(Unit):
         distance = math.dist(closest_point, (self.x, self.y))
 
         if distance > self.attack_range:
-            self.set_destination((self.build_target.x, self.build_target.y), game_map)
+            if not self.path and not self.path_request:
+                self.set_destination((self.build_target.x, self.build_target.y), game_map)
         else:
             self.state = 'task'
             # Simple repair logic
             repair_amount = 2 * dt
             self.build_target.hp = min(self.build_target.hp + repair_amount, self.build_target.max_hp)
+            game_map.wake_entity(self.build_target)
             if self.build_target.hp >= self.build_target.max_hp:
                 self.task = None
\ No newline at end of file
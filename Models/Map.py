@@ -1,3 +1,4 @@
+import heapq
 import math
 import random
 import os
@@ -5,84 +6,300 @@ import pickle
 import time
 import shutil
 from collections import Counter, defaultdict
+from itertools import chain
 from datetime import datetime
+import numpy as np
 from Entity.Building import *
 from Entity.Unit import *
 from Entity.Resource.Resource import *
+from Entity.Entity import Entity
 from Entity.Resource.Gold import Gold
 from Entity.Resource.Tree import Tree
 from Settings.setup import BUILDING_ZONE_OFFSET, TILE_SIZE, MAP_WIDTH, MAP_HEIGHT, NUM_GOLD_TILES, NUM_WOOD_TILES, NUM_FOOD_TILES, GOLD_SPAWN_MIDDLE, SAVE_DIRECTORY
 from Controller.terminal_display_debug import debug_print
+from Models.Movement import move_units
+from AiUtils.aStar import PathCache, padded_walkable
+from AiUtils.hpa import PathHierarchy
+from AiUtils.flowfield import FlowFieldService
+from AiUtils.components import WalkableComponents
+from AiUtils.path_requests import PathRequestQueue
+from AiUtils.path_workers import PathWorkerPool
+from AiUtils.landmarks import LandmarkTables
 
 
 class SpatialHash:
     """
     Spatial hashing for fast entity lookups.
     Divides the map into cells and tracks which entities are in each cell.
+
+    Entities whose footprint fits in one cell (units, resources, most
+    buildings) are stored in `cells`; the few spanning several cells are
+    stored in every covered cell of `large_cells`. The iter_* queries yield
+    each entity once without building intermediate sets: the hash must not
+    be modified while one of them is being consumed.
     """
+    MIN_CELL_SIZE = 4
+    MAX_CELL_SIZE = 16
+
     def __init__(self, cell_size=10):
         self.cell_size = cell_size
         self.cells = defaultdict(set)
-        self.entity_cells = {}  # Maps entity_id to set of cells it occupies
+        self.large_cells = defaultdict(set)
+        self.entity_cells = {}  # entity_id -> cellules couvertes (min_cx, min_cy, max_cx, max_cy)
+        # Plus grandes coordonnées de cellule utilisées, bornent les anneaux de k_nearest
+        self.max_cell_x = -1
+        self.max_cell_y = -1
+
+    @classmethod
+    def adaptive_cell_size(cls, width, height):
+        """
+        Taille de cellule adaptée à une carte de width x height cases : environ
+        12 cellules sur le côté d'une carte carrée, bornée à [MIN_CELL_SIZE, MAX_CELL_SIZE].
+        """
+        side = math.sqrt(max(width, 0) * max(height, 0))
+        return max(cls.MIN_CELL_SIZE, min(cls.MAX_CELL_SIZE, round(side / 12)))
     
     def _get_cell(self, x, y):
         """Get the cell coordinates for a position."""
         return (int(x) // self.cell_size, int(y) // self.cell_size)
     
-    def _get_cells_for_entity(self, entity):
-        """Get all cells that an entity occupies."""
-        cells = set()
-        x, y = int(entity.x - entity.size/2), int(entity.y - entity.size/2)
-        for dx in range(entity.size + 1):
-            for dy in range(entity.size + 1):
-                cells.add(self._get_cell(x + dx, y + dy))
-        return cells
+    def _get_cell_range(self, entity):
+        """Cellules couvertes par l'emprise d'une entité."""
+        cell_size = self.cell_size
+        size = entity.size
+        if size == 1:
+            cell_x = int(entity.x) // cell_size
+            cell_y = int(entity.y) // cell_size
+            return (cell_x, cell_y, cell_x, cell_y)
+        # entity.x/y est le centre de l'emprise : revenir à sa case d'origine
+        half = (size - 1) / 2
+        x, y = int(entity.x - half), int(entity.y - half)
+        return (x // cell_size, y // cell_size, (x + size - 1) // cell_size, (y + size - 1) // cell_size)
+
+    def _link(self, entity, cell_range):
+        min_cx, min_cy, max_cx, max_cy = cell_range
+        if min_cx == max_cx and min_cy == max_cy:
+            self.cells[(min_cx, min_cy)].add(entity)
+        else:
+            large_cells = self.large_cells
+            for cx in range(min_cx, max_cx + 1):
+                for cy in range(min_cy, max_cy + 1):
+                    large_cells[(cx, cy)].add(entity)
+        if max_cx > self.max_cell_x:
+            self.max_cell_x = max_cx
+        if max_cy > self.max_cell_y:
+            self.max_cell_y = max_cy
+
+    def _unlink(self, entity, cell_range):
+        min_cx, min_cy, max_cx, max_cy = cell_range
+        cells = self.cells if min_cx == max_cx and min_cy == max_cy else self.large_cells
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is not None:
+                    bucket.discard(entity)
+                    if not bucket:
+                        del cells[(cx, cy)]
     
     def add(self, entity):
         """Add an entity to the spatial hash."""
-        cells = self._get_cells_for_entity(entity)
-        self.entity_cells[entity.entity_id] = cells
-        for cell in cells:
-            self.cells[cell].add(entity)
+        cell_range = self._get_cell_range(entity)
+        self.entity_cells[entity.entity_id] = cell_range
+        self._link(entity, cell_range)
     
     def remove(self, entity):
         """Remove an entity from the spatial hash."""
-        if entity.entity_id in self.entity_cells:
-            for cell in self.entity_cells[entity.entity_id]:
-                self.cells[cell].discard(entity)
-                if not self.cells[cell]:
-                    del self.cells[cell]
-            del self.entity_cells[entity.entity_id]
+        cell_range = self.entity_cells.pop(entity.entity_id, None)
+        if cell_range is not None:
+            self._unlink(entity, cell_range)
     
+    def iter_entities(self):
+        """Parcourt chaque entité de la table, une fois chacune."""
+        for bucket in self.cells.values():
+            yield from bucket
+        seen = set()
+        for bucket in self.large_cells.values():
+            for entity in bucket:
+                if entity.entity_id not in seen:
+                    seen.add(entity.entity_id)
+                    yield entity
+
     def update(self, entity):
-        """Update entity position in spatial hash."""
-        self.remove(entity)
-        self.add(entity)
+        """Met à jour la position d'une entité (rien à faire tant qu'elle reste dans les mêmes cellules)."""
+        old_range = self.entity_cells.get(entity.entity_id)
+        if old_range is None:
+            self.add(entity)
+            return
+        if entity.size == 1:
+            # Cas rapide : une entité d'une case reste en général dans sa cellule d'un tick à l'autre
+            cell_size = self.cell_size
+            if int(entity.x) // cell_size == old_range[0] and int(entity.y) // cell_size == old_range[1]:
+                return
+        new_range = self._get_cell_range(entity)
+        if new_range == old_range:
+            return
+        self._unlink(entity, old_range)
+        self.entity_cells[entity.entity_id] = new_range
+        self._link(entity, new_range)
+
+    @staticmethod
+    def _buckets(cells, min_cx, min_cy, max_cx, max_cy):
+        """Cellules non vides de `cells` dans un rectangle de cellules."""
+        buckets = []
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    buckets.append(bucket)
+        return buckets
+
+    def _iter_large(self, min_cx, min_cy, max_cx, max_cy):
+        """Entités sur plusieurs cellules d'un rectangle de cellules, une fois chacune."""
+        large_cells = self.large_cells
+        entity_cells = self.entity_cells
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = large_cells.get((cx, cy))
+                if not bucket:
+                    continue
+                for entity in bucket:
+                    # L'entité n'est donnée que depuis la première cellule qu'elle partage avec la requête
+                    entity_min_cx, entity_min_cy, _, _ = entity_cells[entity.entity_id]
+                    if cx == max(entity_min_cx, min_cx) and cy == max(entity_min_cy, min_cy):
+                        yield entity
+
+    def _iter_cell_range(self, min_cx, min_cy, max_cx, max_cy):
+        """Parcourt une fois chaque entité rangée dans un rectangle de cellules."""
+        points = chain.from_iterable(self._buckets(self.cells, min_cx, min_cy, max_cx, max_cy))
+        if not self.large_cells:
+            return points
+        return chain(points, self._iter_large(min_cx, min_cy, max_cx, max_cy))
+
+    def _collect_cell_range(self, min_cx, min_cy, max_cx, max_cy):
+        """Ensemble des entités rangées dans un rectangle de cellules."""
+        entities = set()
+        cells = self.cells
+        large_cells = self.large_cells
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    entities.update(bucket)
+                if large_cells:
+                    bucket = large_cells.get((cx, cy))
+                    if bucket:
+                        entities.update(bucket)
+        return entities
+
+    def iter_nearby(self, x, y, radius=1):
+        """Parcourt les entités à radius cellules au plus d'une position."""
+        center_x, center_y = self._get_cell(x, y)
+        return self._iter_cell_range(center_x - radius, center_y - radius, center_x + radius, center_y + radius)
+
+    def iter_in_rect(self, min_x, min_y, max_x, max_y):
+        """Parcourt les entités des cellules qui couvrent un rectangle (en cases)."""
+        min_cell = self._get_cell(min_x, min_y)
+        max_cell = self._get_cell(max_x, max_y)
+        return self._iter_cell_range(min_cell[0], min_cell[1], max_cell[0], max_cell[1])
+
+    def iter_in_radius(self, x, y, radius):
+        """Parcourt les entités dont la position est à `radius` cases au plus de (x, y)."""
+        radius_sq = radius * radius
+        for entity in self.iter_in_rect(x - radius, y - radius, x + radius, y + radius):
+            dx = entity.x - x
+            dy = entity.y - y
+            if dx * dx + dy * dy <= radius_sq:
+                yield entity
+
+    def visit_in_radius(self, x, y, radius, callback):
+        """
+        Appelle callback(entity) pour chaque entité à `radius` cases au plus de
+        (x, y). S'arrête à la première entité pour laquelle callback retourne
+        une valeur vraie et la retourne ; sinon retourne None.
+        """
+        for entity in self.iter_in_radius(x, y, radius):
+            if callback(entity):
+                return entity
+        return None
+
+    def visit_in_rect(self, min_x, min_y, max_x, max_y, callback):
+        """Comme visit_in_radius, pour les cellules qui couvrent un rectangle."""
+        for entity in self.iter_in_rect(min_x, min_y, max_x, max_y):
+            if callback(entity):
+                return entity
+        return None
+
+    def k_nearest(self, x, y, k, max_radius=None, predicate=None):
+        """
+        Jusqu'à k entités triées par distance à (x, y), à max_radius cases au
+        plus si donné et parmi celles qu'accepte predicate. Les cellules sont
+        visitées par anneaux autour de la position, et la recherche s'arrête
+        dès qu'aucun anneau plus lointain ne peut contenir d'entité plus proche.
+        """
+        if k <= 0:
+            return []
+        cell_size = self.cell_size
+        center_x, center_y = self._get_cell(x, y)
+        max_ring = max(center_x, center_y, self.max_cell_x - center_x, self.max_cell_y - center_y)
+        max_radius_sq = None
+        if max_radius is not None:
+            max_ring = min(max_ring, int(max_radius) // cell_size + 1)
+            max_radius_sq = max_radius * max_radius
+
+        cells = self.cells
+        large_cells = self.large_cells
+        heap = []  # (-distance², entity_id, entity) : l'entité gardée la plus lointaine au sommet
+        seen = set()  # entités sur plusieurs cellules déjà vues
+        for ring in range(max_ring + 1):
+            for cx in range(center_x - ring, center_x + ring + 1):
+                # Colonne entière sur les bords gauche et droit de l'anneau, sinon cellules du haut et du bas
+                if cx == center_x - ring or cx == center_x + ring:
+                    column = range(center_y - ring, center_y + ring + 1)
+                else:
+                    column = (center_y - ring, center_y + ring)
+                for cy in column:
+                    for bucket, large in ((cells.get((cx, cy)), False), (large_cells.get((cx, cy)), True)):
+                        if not bucket:
+                            continue
+                        for entity in bucket:
+                            if large:
+                                if entity.entity_id in seen:
+                                    continue
+                                seen.add(entity.entity_id)
+                            if predicate is not None and not predicate(entity):
+                                continue
+                            dx = entity.x - x
+                            dy = entity.y - y
+                            distance_sq = dx * dx + dy * dy
+                            if max_radius_sq is not None and distance_sq > max_radius_sq:
+                                continue
+                            if len(heap) < k:
+                                heapq.heappush(heap, (-distance_sq, entity.entity_id, entity))
+                            elif distance_sq < -heap[0][0]:
+                                heapq.heapreplace(heap, (-distance_sq, entity.entity_id, entity))
+            # Au-delà de cet anneau, tout est à ring * cell_size cases au moins
+            if len(heap) == k and -heap[0][0] <= (ring * cell_size) ** 2:
+                break
+        return [entity for _, _, entity in sorted(heap, reverse=True)]
     
     def get_nearby(self, x, y, radius=1):
         """Get all entities within a radius (in cells) of a position."""
-        center_cell = self._get_cell(x, y)
-        nearby = set()
-        for dx in range(-radius, radius + 1):
-            for dy in range(-radius, radius + 1):
-                cell = (center_cell[0] + dx, center_cell[1] + dy)
-                nearby.update(self.cells.get(cell, set()))
-        return nearby
+        center_x, center_y = self._get_cell(x, y)
+        return self._collect_cell_range(center_x - radius, center_y - radius, center_x + radius, center_y + radius)
     
     def get_in_rect(self, min_x, min_y, max_x, max_y):
         """Get all entities within a rectangle."""
         min_cell = self._get_cell(min_x, min_y)
         max_cell = self._get_cell(max_x, max_y)
-        entities = set()
-        for cx in range(min_cell[0], max_cell[0] + 1):
-            for cy in range(min_cell[1], max_cell[1] + 1):
-                entities.update(self.cells.get((cx, cy), set()))
-        return entities
+        return self._collect_cell_range(min_cell[0], min_cell[1], max_cell[0], max_cell[1])
     
     def clear(self):
         """Clear all entities from the spatial hash."""
         self.cells.clear()
+        self.large_cells.clear()
         self.entity_cells.clear()
+        self.max_cell_x = -1
+        self.max_cell_y = -1
 
 
 class GameMap:
@@ -98,20 +315,169 @@ class GameMap:
         self.inactive_matrix = {}
         self.projectiles = {}
         self.game_state = None
+        # Nombre d'appels à patch (instantanés des bots partagés pendant un tick)
+        self.ticks = 0
+        # Unités en marche pendant patch (None hors de patch : seekMove déplace directement)
+        self.movement_batch = None
+        # Graphe de clusters pour les longs trajets, construit à la demande (get_path_hierarchy)
+        self.path_hierarchy = None
+        # Champs de flux des buts partagés par plusieurs unités (get_flow_fields)
+        self.flow_fields = None
+        # Composantes connexes des cases praticables, étiquetées à la demande (get_components)
+        self.components = None
+        # Chemins a_star récents, invalidés par région quand les obstacles changent
+        self.path_cache = PathCache(self.num_tiles_x, self.num_tiles_y)
+        # Demandes de chemin servies à chaque patch dans la limite d'un budget de temps
+        self.path_requests = PathRequestQueue(self)
+        # Tables de distances aux repères pour l'heuristique ALT, calculées à la demande (get_landmarks)
+        self.landmarks = None
+        # Processus de recherche de chemin optionnels (enable_path_workers)
+        self.path_workers = None
         self.width = grid_width
         self.height = grid_height
         self.terminal_view_x = 0
         self.terminal_view_y = 0
         
         # Spatial hash for optimized entity lookups
-        self.spatial_hash = SpatialHash(cell_size=10)
+        self.spatial_hash = SpatialHash(cell_size=SpatialHash.adaptive_cell_size(grid_width, grid_height))
+
+        # entity_id -> cases occupées par l'entité (origine de l'emprise en premier)
+        self.entity_tiles = {}
+
+        # Une table spatiale par sorte de ressource (Tree, Gold, (Farm, équipe)...) pour find_nearest_resource
+        self.resource_index = {}
+
+        # Une table spatiale par équipe avec ses points de dépôt (TownCentre, Camp)
+        self.drop_point_index = {}
         
         # Cache for active entities (invalidated when entities are added/removed)
         self._active_entities_cache = None
         self._cache_valid = False
 
+        # Entités endormies : patch les saute jusqu'à ce qu'un événement les réveille
+        self.awake_entities = set()
+        self.sleeping_entities = set()
+        # Entités endormies avec une portée d'attaque, réveillées quand un ennemi approche
+        self.sleeping_sentries = SpatialHash(cell_size=self.spatial_hash.cell_size)
+        # Plus grande portée des sentinelles endormies (rectangle de recherche de _wake_sentries_near)
+        self.sentry_reach = 0
+
+        # Tableaux denses par case, reflets de self.grid, indexés [x, y]
+        self._init_tile_arrays()
+
         if generate:
             self.generate_map()
+
+    def _init_tile_arrays(self):
+        """
+        Alloue les tableaux denses de praticabilité et d'occupation.
+        walkable_grid[x, y] vaut 1 quand aucune entité bloquante ne couvre la
+        case, occupancy_grid[x, y] compte les entités inscrites sur la case.
+        """
+        shape = (max(self.num_tiles_x, 0), max(self.num_tiles_y, 0))
+        self.walkable_grid = np.ones(shape, dtype=np.uint8)
+        self.occupancy_grid = np.zeros(shape, dtype=np.uint16)
+        # Les memoryviews donnent un accès scalaire peu coûteux depuis les boucles Python
+        self._walkable_view = memoryview(self.walkable_grid)
+        self._occupancy_view = memoryview(self.occupancy_grid)
+        # Copie bordée et aplatie de walkable_grid pour A*, créée à la demande (get_padded_walkable)
+        self.padded_walkable = None
+
+    def __getstate__(self):
+        # Les memoryviews ne se sérialisent pas (la carte est atteignable depuis game_state)
+        state = self.__dict__.copy()
+        state.pop('_walkable_view', None)
+        state.pop('_occupancy_view', None)
+        state['path_hierarchy'] = None
+        state['flow_fields'] = None
+        state['components'] = None
+        state['path_workers'] = None
+        state['landmarks'] = None
+        state['padded_walkable'] = None
+        state.pop('path_cache', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.path_hierarchy = None
+        self.flow_fields = None
+        self.components = None
+        self.path_workers = None
+        self.landmarks = None
+        self.padded_walkable = None
+        self.ticks = state.get('ticks', 0)
+        self.path_cache = PathCache(self.num_tiles_x, self.num_tiles_y)
+        if 'path_requests' not in state:
+            self.path_requests = PathRequestQueue(self)
+        if 'walkable_grid' in state:
+            self._walkable_view = memoryview(self.walkable_grid)
+            self._occupancy_view = memoryview(self.occupancy_grid)
+
+    def _refresh_tile_walkability(self, pos):
+        """Recalcule la praticabilité d'une case à partir de ses entités."""
+        entities = self.grid.get(pos)
+        walkable = 1
+        if entities:
+            for entity in entities:
+                if not entity.walkable:
+                    walkable = 0
+                    break
+        self._walkable_view[pos] = walkable
+
+    def rebuild_indexes(self):
+        """
+        Reconstruit toutes les structures dérivées de self.grid (tableaux par
+        case, dictionnaire et index des ressources, table spatiale, demandes de
+        chemin en attente). Sert après un remplacement complet de la grille,
+        par exemple dans load_map.
+        """
+        self._init_tile_arrays()
+        self.resources = {}
+        self.resource_index = {}
+        self.drop_point_index = {}
+        self.path_hierarchy = None
+        self.flow_fields = None
+        self.components = None
+        self.landmarks = None
+        self.path_cache = PathCache(self.num_tiles_x, self.num_tiles_y)
+        self.path_requests = PathRequestQueue(self)
+        self.entity_tiles = {}
+        self.spatial_hash = SpatialHash(cell_size=SpatialHash.adaptive_cell_size(self.num_tiles_x, self.num_tiles_y))
+        self.awake_entities = set()
+        self.sleeping_entities = set()
+        self.sleeping_sentries = SpatialHash(cell_size=self.spatial_hash.cell_size)
+        self.sentry_reach = 0
+        for pos in sorted(self.grid):
+            x, y = pos
+            if not (0 <= x < self.num_tiles_x and 0 <= y < self.num_tiles_y):
+                continue
+            entities = self.grid[pos]
+            self._occupancy_view[pos] = len(entities)
+            for entity in entities:
+                if not entity.walkable:
+                    self._walkable_view[pos] = 0
+                if entity.hasResources:
+                    self.resources.setdefault(pos, set()).add(entity)
+                tiles = self.entity_tiles.get(entity.entity_id)
+                if tiles is None:
+                    self.entity_tiles[entity.entity_id] = [pos]
+                    self.spatial_hash.add(entity)
+                    self.awake_entities.add(entity)
+                    if entity.hasResources:
+                        self._resource_index_for(entity).add(entity)
+                    if getattr(entity, 'resourceDropPoint', False):
+                        self._drop_point_index_for(entity.team).add(entity)
+                    if getattr(entity, 'path_request', None):
+                        self.path_requests.resume(entity)
+                else:
+                    tiles.append(pos)
+        if self.path_workers:
+            self.path_workers.publish()
+
+        # Les entités sauvegardées gardent leur identifiant : les nouvelles ne doivent jamais le reprendre
+        if self.entity_tiles:
+            Entity.id = max(Entity.id, max(self.entity_tiles) + 1)
+        self._invalidate_cache()
     
     def _invalidate_cache(self):
         """Invalidate the active entities cache."""
@@ -144,25 +510,30 @@ class GameMap:
             or rounded_y + entity.size - 1 >= self.num_tiles_y):
             return False
 
+        walkable_view = self._walkable_view
         for i in range(entity.size):
             for j in range(entity.size):
-                pos = (rounded_x + i, rounded_y + j)
-                if pos in self.grid:
-                    for existing_entity in self.grid[pos]:
-                        if not self.walkable_position(pos):
-                            return False
+                if not walkable_view[rounded_x + i, rounded_y + j]:
+                    return False
 
+        tiles = []
         for i in range(entity.size):
             for j in range(entity.size):
                 pos = (rounded_x + i, rounded_y + j)
+                tiles.append(pos)
                 if pos not in self.grid:
                     self.grid[pos] = set()
                 self.grid[pos].add(entity)
+                self._occupancy_view[pos] += 1
+                if not entity.walkable:
+                    walkable_view[pos] = 0
                 if entity.hasResources:
                     if pos not in self.resources:
                         self.resources[pos] = set()
                     self.resources[pos].add(entity)
-
+        self.entity_tiles[entity.entity_id] = tiles
+        if not entity.walkable:
+            self._walkability_changed(tiles)
 
         entity.x = x + (entity.size - 1) / 2
         entity.y = y + (entity.size - 1) / 2
@@ -170,8 +541,14 @@ class GameMap:
         # Add to spatial hash
         self.spatial_hash.add(entity)
         self._invalidate_cache()
+        self.awake_entities.add(entity)
+        if entity.hasResources:
+            self._resource_index_for(entity).add(entity)
+        if getattr(entity, 'resourceDropPoint', False):
+            self._drop_point_index_for(entity.team).add(entity)
         
         if entity.team != None:
+            self._wake_sentries_near(entity, tiles)
             self.players[entity.team].add_member(entity)
             if isinstance(entity, Building):
                 zone = self.players[entity.team].zone.add_zone((x - BUILDING_ZONE_OFFSET , y - BUILDING_ZONE_OFFSET), (x + entity.size - 1 + BUILDING_ZONE_OFFSET, y + entity.size - 1 + BUILDING_ZONE_OFFSET ))
@@ -180,58 +557,329 @@ class GameMap:
     def remove_entity(self, entity):
         if not entity:
             return False
-            
-        remove_counter = 0
-        positions_to_clean = []  # Pour nettoyer resources dict aussi
-        
-        for pos, matrix_entities in list(self.grid.items()):
-            for matrix_entity in list(matrix_entities):
-                if matrix_entity.entity_id == entity.entity_id:
-                    matrix_entities.remove(matrix_entity)
-                    positions_to_clean.append(pos)
-                    remove_counter += 1
-                    if not matrix_entities:
-                        del self.grid[pos]
-                    if remove_counter >= entity.size * entity.size:
-                        # Nettoyer le dictionnaire resources aussi
-                        if entity.hasResources:
-                            for clean_pos in positions_to_clean:
-                                if clean_pos in self.resources:
-                                    if entity in self.resources[clean_pos]:
-                                        self.resources[clean_pos].remove(entity)
-                                    if not self.resources[clean_pos]:
-                                        del self.resources[clean_pos]
-                        
-                        # Remove from spatial hash
-                        self.spatial_hash.remove(entity)
-                        self._invalidate_cache()
-                        
-                        if entity.team != None:
-                            self.players[entity.team].remove_member(entity)
-                            # Mise à jour de old_resources quand une entité est supprimée
-                            if self.game_state and 'old_resources' in self.game_state:
-                                if entity.team in self.game_state['old_resources']:
-                                    self.game_state['old_resources'][entity.team] = self.players[entity.team].resources.copy()
-                            
-                            if isinstance(entity, Building):
-                                x, y = entity.x , entity.y
-                                starting_point = (x - entity.size/2 + 0.5  - BUILDING_ZONE_OFFSET, y - entity.size/2 + 0.5 - BUILDING_ZONE_OFFSET)
-                                end_point = (x + entity.size/2 - 0.5  + BUILDING_ZONE_OFFSET , y + entity.size/2 - 0.5 + BUILDING_ZONE_OFFSET)
-                                zone = self.players[entity.team].zone.remove_zone(starting_point, end_point)
-                        return pos
-        return False
+
+        tiles = self.entity_tiles.pop(entity.entity_id, None)
+        if not tiles:
+            return False
+
+        for pos in tiles:
+            matrix_entities = self.grid.get(pos)
+            if matrix_entities is None or entity not in matrix_entities:
+                continue
+            matrix_entities.remove(entity)
+            if not matrix_entities:
+                del self.grid[pos]
+            self._occupancy_view[pos] -= 1
+            if not entity.walkable:
+                self._refresh_tile_walkability(pos)
+            # Nettoyer le dictionnaire resources aussi
+            if entity.hasResources and pos in self.resources:
+                self.resources[pos].discard(entity)
+                if not self.resources[pos]:
+                    del self.resources[pos]
+        if not entity.walkable:
+            self._walkability_changed(tiles)
+
+        # Remove from spatial hash
+        self.spatial_hash.remove(entity)
+        self._invalidate_cache()
+        if entity.hasResources:
+            self._resource_index_for(entity).remove(entity)
+        if getattr(entity, 'resourceDropPoint', False):
+            self._drop_point_index_for(entity.team).remove(entity)
+        self.awake_entities.discard(entity)
+        self.sleeping_entities.discard(entity)
+        self.sleeping_sentries.remove(entity)
+
+        if entity.team != None:
+            self.players[entity.team].remove_member(entity)
+            # Mise à jour de old_resources quand une entité est supprimée
+            if self.game_state and 'old_resources' in self.game_state:
+                if entity.team in self.game_state['old_resources']:
+                    self.game_state['old_resources'][entity.team] = self.players[entity.team].resources.copy()
+
+            if isinstance(entity, Building):
+                x, y = entity.x , entity.y
+                starting_point = (x - entity.size/2 + 0.5  - BUILDING_ZONE_OFFSET, y - entity.size/2 + 0.5 - BUILDING_ZONE_OFFSET)
+                end_point = (x + entity.size/2 - 0.5  + BUILDING_ZONE_OFFSET , y + entity.size/2 - 0.5 + BUILDING_ZONE_OFFSET)
+                zone = self.players[entity.team].zone.remove_zone(starting_point, end_point)
+        # Origine de l'emprise, c'est-à-dire la position que add_entity attend pour remettre l'entité
+        return tiles[0]
+
+    def move_entity(self, entity, new_x, new_y):
+        """
+        Déplace en (new_x, new_y) une entité déjà sur la carte. Seuls la
+        grille, l'index des emprises, les tableaux par case et la table spatiale
+        sont mis à jour : équipe, zones et cache des entités actives restent
+        tels quels. Retourne False sans rien changer si l'entité n'est pas sur
+        la carte ou si la destination est bloquée.
+        """
+        old_tiles = self.entity_tiles.get(entity.entity_id)
+        if old_tiles is None:
+            return False
+
+        rounded_x, rounded_y = round(new_x), round(new_y)
+        size = entity.size
+        if (rounded_x < 0 or rounded_y < 0
+            or rounded_x + size - 1 >= self.num_tiles_x
+            or rounded_y + size - 1 >= self.num_tiles_y):
+            return False
+
+        if (rounded_x, rounded_y) != old_tiles[0]:
+            walkable_view = self._walkable_view
+            new_tiles = []
+            for i in range(size):
+                for j in range(size):
+                    pos = (rounded_x + i, rounded_y + j)
+                    # Une entité non praticable ne doit pas être bloquée par sa propre emprise
+                    if not walkable_view[pos] and (entity.walkable or pos not in old_tiles):
+                        return False
+                    new_tiles.append(pos)
+
+            occupancy_view = self._occupancy_view
+            for pos in old_tiles:
+                matrix_entities = self.grid.get(pos)
+                if matrix_entities is None or entity not in matrix_entities:
+                    continue
+                matrix_entities.remove(entity)
+                if not matrix_entities:
+                    del self.grid[pos]
+                occupancy_view[pos] -= 1
+                if entity.hasResources and pos in self.resources:
+                    self.resources[pos].discard(entity)
+                    if not self.resources[pos]:
+                        del self.resources[pos]
+            if not entity.walkable:
+                for pos in old_tiles:
+                    self._refresh_tile_walkability(pos)
+
+            for pos in new_tiles:
+                if pos not in self.grid:
+                    self.grid[pos] = set()
+                self.grid[pos].add(entity)
+                occupancy_view[pos] += 1
+                if not entity.walkable:
+                    walkable_view[pos] = 0
+                if entity.hasResources:
+                    if pos not in self.resources:
+                        self.resources[pos] = set()
+                    self.resources[pos].add(entity)
+            self.entity_tiles[entity.entity_id] = new_tiles
+            if not entity.walkable:
+                self._walkability_changed(old_tiles + new_tiles)
+            if self.sleeping_sentries.entity_cells and entity.team is not None:
+                self._wake_sentries_near(entity, new_tiles)
+
+        entity.x = new_x + (size - 1) / 2
+        entity.y = new_y + (size - 1) / 2
+        self.spatial_hash.update(entity)
+        if entity.hasResources:
+            self._resource_index_for(entity).update(entity)
+        return True
+
+    @staticmethod
+    def _resource_index_key(entity):
+        """Les ressources neutres sont indexées par classe, celles d'une équipe (Farm) par (classe, équipe)."""
+        if entity.team is None:
+            return entity.__class__
+        return (entity.__class__, entity.team)
+
+    def _resource_index_for(self, entity):
+        key = self._resource_index_key(entity)
+        index = self.resource_index.get(key)
+        if index is None:
+            index = SpatialHash(cell_size=self.spatial_hash.cell_size)
+            self.resource_index[key] = index
+        return index
+
+    @staticmethod
+    def _is_collectable(entity):
+        # Une ressource épuisée reste indexée jusqu'à son passage en inactif, une Farm doit être construite
+        return entity.isAlive() and entity.state != 'construction'
+
+    def find_nearest_resource(self, resource_type, x, y, max_radius=None, team=None, reachable_from=None):
+        """
+        Ressource vivante de type resource_type (une classe ou un tuple de
+        classes, par exemple (Tree, Gold)) la plus proche de (x, y), à
+        max_radius cases au plus si donné. Les ressources d'une équipe (Farm
+        construites) ne comptent que pour `team`, et pas du tout avec
+        team=None. Avec reachable_from=(x, y), les ressources qu'une unité
+        placée là ne peut pas atteindre sont écartées. Retourne None si
+        aucune ne convient.
+        """
+        best_resource = None
+        best_distance_sq = None
+        predicate = self._is_collectable
+        if reachable_from is not None:
+            components = self.get_components()
+            predicate = lambda entity: self._is_collectable(entity) and components.reaches_entity(reachable_from, entity)
+        for key, index in self.resource_index.items():
+            if isinstance(key, tuple):
+                resource_class, owner = key
+                if team is None or owner != team:
+                    continue
+            else:
+                resource_class = key
+            if not issubclass(resource_class, resource_type) or not index.entity_cells:
+                continue
+            radius = max_radius
+            if best_distance_sq is not None:
+                # Inutile de chercher plus loin que le meilleur candidat déjà trouvé
+                radius = math.sqrt(best_distance_sq) if radius is None else min(radius, math.sqrt(best_distance_sq))
+            nearest = index.k_nearest(x, y, 1, radius, predicate)
+            if nearest:
+                resource = nearest[0]
+                distance_sq = (resource.x - x) ** 2 + (resource.y - y) ** 2
+                if best_distance_sq is None or distance_sq < best_distance_sq:
+                    best_resource = resource
+                    best_distance_sq = distance_sq
+        return best_resource
+
+    def _drop_point_index_for(self, team):
+        index = self.drop_point_index.get(team)
+        if index is None:
+            index = SpatialHash(cell_size=self.spatial_hash.cell_size)
+            self.drop_point_index[team] = index
+        return index
+
+    def _walkability_changed(self, tiles):
+        """Prévient les structures de pathfinding construites sur walkable_grid."""
+        self.path_cache.invalidate_tiles(tiles)
+        if self.padded_walkable is not None:
+            padded_walkable = self.padded_walkable
+            walkable_view = self._walkable_view
+            stride = self.num_tiles_y + 2
+            for tile in tiles:
+                x, y = tile
+                if 0 <= x < self.num_tiles_x and 0 <= y < self.num_tiles_y:
+                    padded_walkable[(x + 1) * stride + y + 1] = walkable_view[tile]
+        if self.path_hierarchy:
+            self.path_hierarchy.invalidate_tiles(tiles)
+        if self.flow_fields:
+            self.flow_fields.invalidate_tiles(tiles)
+        if self.components:
+            self.components.invalidate_tiles(tiles)
+        if self.landmarks:
+            self.landmarks.invalidate_tiles(tiles)
+        if self.path_workers:
+            self.path_workers.invalidate_tiles(tiles)
+
+    def get_padded_walkable(self):
+        """
+        walkable_grid bordée de cases bloquées et aplatie (aStar.padded_walkable),
+        copiée à la première recherche puis tenue à jour par _walkability_changed.
+        """
+        if self.padded_walkable is None:
+            self.padded_walkable = padded_walkable(self.walkable_grid)
+        return self.padded_walkable
+
+    def get_path_hierarchy(self):
+        """Graphe HPA* de la carte (AiUtils.hpa), créé au premier long trajet."""
+        if self.path_hierarchy is None:
+            self.path_hierarchy = PathHierarchy(self)
+        return self.path_hierarchy
+
+    def get_components(self):
+        """Composantes connexes praticables (AiUtils.components), étiquetées à la première question."""
+        if self.components is None:
+            self.components = WalkableComponents(self)
+        return self.components
+
+    def get_landmarks(self):
+        """Repères de l'heuristique ALT (AiUtils.landmarks) ; leurs tables se calculent au fil des ticks."""
+        if self.landmarks is None:
+            self.landmarks = LandmarkTables(self)
+        return self.landmarks
+
+    def enable_path_workers(self, processes):
+        """
+        Confie les recherches A* de path_requests à processes processus
+        (AiUtils.path_workers) ; 0 les ramène sur le thread du jeu.
+        """
+        if self.path_workers:
+            self.path_workers.close()
+            self.path_workers = None
+        if processes:
+            self.path_workers = PathWorkerPool(self, processes)
+
+    def get_flow_fields(self):
+        """Service de champs de flux (AiUtils.flowfield), créé à la première demande de chemin."""
+        if self.flow_fields is None:
+            self.flow_fields = FlowFieldService(self)
+        return self.flow_fields
+
+    def find_nearest_drop_point(self, team, x, y, built_only=True):
+        """
+        Point de dépôt vivant de `team` le plus proche de (x, y), ou None. Les
+        bâtiments en construction (ou en réparation) sont écartés, sauf si
+        built_only est False.
+        """
+        index = self.drop_point_index.get(team)
+        if index is None or not index.entity_cells:
+            return None
+        if built_only:
+            predicate = lambda building: building.isAlive() and building.isBuilt()
+        else:
+            predicate = lambda building: building.isAlive()
+        nearest = index.k_nearest(x, y, 1, predicate=predicate)
+        return nearest[0] if nearest else None
+
+    def sleep_entity(self, entity):
+        """
+        Cesse de mettre à jour une entité à chaque tick. Elle reste sur la
+        carte (grille, dessin, requêtes) et redevient mise à jour dès que
+        wake_entity est appelé pour elle.
+        """
+        if entity not in self.awake_entities:
+            return
+        self.awake_entities.discard(entity)
+        self.sleeping_entities.add(entity)
+        if getattr(entity, 'attack_range', 0) > 0:
+            self.sleeping_sentries.add(entity)
+            self.sentry_reach = max(self.sentry_reach, entity.attack_range)
+
+    def wake_entity(self, entity):
+        """
+        Reprend la mise à jour à chaque tick d'une entité endormie. Appelé sur
+        les événements qui peuvent la changer : dégâts, récolte, ordre
+        d'entraînement, arrivée d'un constructeur.
+        """
+        if entity not in self.sleeping_entities:
+            return
+        self.sleeping_entities.discard(entity)
+        self.sleeping_sentries.remove(entity)
+        self.awake_entities.add(entity)
+
+    def _wake_sentries_near(self, entity, tiles):
+        """
+        Réveille les sentinelles endormies (Keep) qui ont désormais l'entité
+        ennemie à portée de leur scan. Seules les cellules de sleeping_sentries
+        à moins de sentry_reach cases des tuiles sont examinées.
+        """
+        if not tiles:
+            return
+        reach = self.sentry_reach
+        xs = [tile[0] for tile in tiles]
+        ys = [tile[1] for tile in tiles]
+        awakened = []
+        for sentry in self.sleeping_sentries.iter_in_rect(min(xs) - reach, min(ys) - reach,
+                                                          max(xs) + reach, max(ys) + reach):
+            if sentry.team == entity.team:
+                continue
+            for tile_x, tile_y in tiles:
+                if abs(tile_x - sentry.x) + abs(tile_y - sentry.y) <= sentry.attack_range:
+                    awakened.append(sentry)
+                    break
+        # Pas de réveil pendant le parcours : il modifie sleeping_sentries
+        for sentry in awakened:
+            self.wake_entity(sentry)
 
     def walkable_position(self, position):
         x, y = round(position[0]), round(position[1])
         if x < 0 or y < 0 or x >= self.num_tiles_x or y >= self.num_tiles_y:
             return False
+        return self._walkable_view[x, y] == 1
 
-        entities = self.grid.get((x, y), None)
-        if entities:
-            for entity in entities:
-                if not entity.walkable:
-                    return False
-        return True
     def buildable_position(self, x, y , size=1):
         rounded_x, rounded_y = round(x), round(y)
         if (rounded_x < 0 or rounded_y < 0
@@ -239,12 +887,9 @@ class GameMap:
             or rounded_y + size - 1 >= self.num_tiles_y):
             return False
 
-        for i in range(size):
-            for j in range(size):
-                pos = (rounded_x + i, rounded_y + j)
-                if pos in self.grid:
-                    return False
-        return True
+        if size == 1:
+            return self._occupancy_view[rounded_x, rounded_y] == 0
+        return not self.occupancy_grid[rounded_x:rounded_x + size, rounded_y:rounded_y + size].any()
 
     def generate_zones(self):
         cols = int(math.ceil(math.sqrt(len(self.players))))
@@ -367,8 +1012,7 @@ class GameMap:
                         x = center_x + dx
                         y = center_y + dy
                         if 0 <= x < self.num_tiles_x and 0 <= y < self.num_tiles_y and (x, y) not in self.grid:
-                            self.grid[(x, y)] = set()
-                            self.grid[(x, y)].add(resource_classes['gold'](x, y))
+                            self.add_entity(resource_classes['gold'](x, y), x, y)
                             gold_count += 1
                             if gold_count >= NUM_GOLD_TILES:
                                 break
@@ -547,6 +1191,8 @@ class GameMap:
                     unit.team = i
                 for building in player.buildings:
                     building.team = i
+                # Compteurs de composition (absents des anciennes sauvegardes)
+                player.rebuild_counts()
 
             # Update grid entities with new team IDs
             for entities in self.grid.values():
@@ -558,6 +1204,9 @@ class GameMap:
                                 entity.team = i
                                 break
 
+            # Reconstruire les index dérivés (tableaux par case, ressources, table spatiale)
+            self.rebuild_indexes()
+
             debug_print(f"Game map loaded successfully from {filename}.")
         except Exception as e:
             debug_print(f"Error loading game map: {e}")
@@ -584,15 +1233,37 @@ class GameMap:
         del self.projectiles[projectile.id]
 
     def patch(self, dt):
-        # OPTIMISATION: Utiliser le cache des entités actives
-        active_entities = self.get_active_entities()
+        # OPTIMISATION: seules les entités éveillées sont mises à jour, les autres
+        # (ressources intactes, bâtiments inoccupés) attendent un wake_entity
+        self.ticks += 1
+        awake_entities = tuple(self.awake_entities)
+        if self.flow_fields:
+            self.flow_fields.new_tick()
+        if self.landmarks:
+            self.landmarks.build_step()
 
-        # Mise à jour des entités actives
+        # Mise à jour des entités actives ; les unités en marche s'inscrivent dans
+        # movement_batch et sont déplacées ensemble par move_units
         entities_to_deactivate = []
-        for entity in active_entities:
-            entity.update(self, dt)
-            if not entity.isAlive():
-                entities_to_deactivate.append(entity)
+        self.movement_batch = []
+        try:
+            for entity in awake_entities:
+                entity.update(self, dt)
+                if not entity.isAlive():
+                    entities_to_deactivate.append(entity)
+                elif entity.can_sleep():
+                    self.sleep_entity(entity)
+
+            # Chemins demandés pendant ce tick ou encore en attente, dans la limite du budget
+            delivered = self.path_requests.process()
+            if delivered:
+                batched = set(map(id, self.movement_batch))
+                for unit in delivered:
+                    if id(unit) not in batched:
+                        unit.seekMove(self, dt)
+        finally:
+            moving_units, self.movement_batch = self.movement_batch, None
+        move_units(moving_units, self, dt)
         
         # Déplacer vers inactive après l'itération (évite modification pendant itération)
         for entity in entities_to_deactivate:
@@ -627,6 +1298,20 @@ class GameMap:
         # Convert radius to cell units
         cell_radius = max(1, int(radius / self.spatial_hash.cell_size) + 1)
         return self.spatial_hash.get_nearby(x, y, cell_radius)
+
+    def iter_entities_in_area(self, x, y, radius):
+        """Mêmes cellules que get_entities_in_area, en générateur (sans ensemble intermédiaire)."""
+        # Rayon converti en cellules
+        cell_radius = max(1, int(radius / self.spatial_hash.cell_size) + 1)
+        return self.spatial_hash.iter_nearby(x, y, cell_radius)
+
+    def iter_entities_in_radius(self, x, y, radius):
+        """Entités dont la position est à `radius` cases au plus de (x, y)."""
+        return self.spatial_hash.iter_in_radius(x, y, radius)
+
+    def get_nearest_entities(self, x, y, k=1, max_radius=None, predicate=None):
+        """Les k entités les plus proches de (x, y), la plus proche d'abord (voir SpatialHash.k_nearest)."""
+        return self.spatial_hash.k_nearest(x, y, k, max_radius, predicate)
     
     def get_entities_in_rect(self, min_x, min_y, max_x, max_y):
         """
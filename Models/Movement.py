@@ -0,0 +1,81 @@
+"""
+Déplacement groupé des unités.
+
+Pendant GameMap.patch, Unit.seekMove ne déplace plus l'unité elle-même :
+elle s'inscrit dans le lot du tick et move_units calcule en une seule passe
+NumPy la direction, l'orientation arrondie et le pas de toutes les unités
+en marche (mêmes calculs que seekMove, au dernier bit près). Seules les unités qui
+atteignent leur prochain point de passage ou changent de case passent
+ensuite par GameMap.move_entity.
+"""
+import numpy as np
+
+from Settings.setup import ALLOWED_ANGLES
+
+# En dessous de ce nombre d'unités, le coût fixe de NumPy dépasse le gain
+BATCH_MIN_UNITS = 8
+
+_ANGLES = np.array(ALLOWED_ANGLES, dtype=np.float64)
+# get_direction(angle) pour chaque angle autorisé
+_DIRECTIONS = np.array([(angle // 45 + 1) % 8 for angle in ALLOWED_ANGLES], dtype=np.int64)
+
+
+def compute_steps(positions, targets, speeds, dt):
+    """
+    Pas de déplacement de n unités vers leur prochaine case.
+
+    positions, targets : tableaux (n, 2) ; speeds : tableau (n,).
+    Retourne (steps (n, 2), directions (n,), reached (n,) booléen) où
+    reached indique que la case cible est atteinte après le pas.
+    """
+    diff = targets - positions
+
+    angles = (np.degrees(np.arctan2(diff[:, 1], diff[:, 0])) + 360) % 360
+    # argmin garde le premier angle en cas d'égalité, comme min() dans get_snapped_angle
+    snapped = np.argmin(np.abs(_ANGLES[None, :] - angles[:, None]), axis=1)
+    directions = _DIRECTIONS[snapped]
+
+    magnitude = np.sqrt(diff[:, 0] ** 2 + diff[:, 1] ** 2)
+    moving = magnitude > 0
+    unit = diff / np.where(moving, magnitude, 1.0)[:, None]
+    steps = np.where(moving[:, None], unit * dt * speeds[:, None], 0.0)
+
+    remaining = np.abs(targets - (positions + steps))
+    reached = np.all(remaining <= np.abs(steps), axis=1)
+    return steps, directions, reached
+
+
+def move_units(units, game_map, dt):
+    """Applique un pas de déplacement à toutes les unités du lot (chemin non vide)."""
+    units = [unit for unit in units if unit.path]
+    if len(units) < BATCH_MIN_UNITS:
+        for unit in units:
+            unit.step_along_path(game_map, dt)
+    else:
+        _move_batch(units, game_map, dt)
+
+    # seekIdle a déjà tourné dans update avant le pas : le refaire pour les chemins terminés
+    for unit in units:
+        if not unit.path and unit.isAlive():
+            unit.seekIdle()
+
+
+def _move_batch(units, game_map, dt):
+    buffer = np.array([(unit.x, unit.y, unit.path[0][0], unit.path[0][1], unit.speed) for unit in units],
+                      dtype=np.float64)
+    steps, directions, reached = compute_steps(buffer[:, 0:2], buffer[:, 2:4], buffer[:, 4], dt)
+    new_positions = (buffer[:, 0:2] + steps).tolist()
+    directions = directions.tolist()
+
+    for unit, (x, y), direction in zip(units, new_positions, directions):
+        unit.x = x
+        unit.y = y
+        unit.direction = direction
+
+    # Seules les unités arrivées à leur point de passage ou entrées dans une autre case changent de tuile sur la carte
+    step_list = steps.tolist()
+    for index in np.flatnonzero(reached).tolist():
+        units[index].end_path_step(game_map, step_list[index])
+    crossed = np.any(np.round(buffer[:, 0:2]) != np.round(buffer[:, 0:2] + steps), axis=1) & ~reached
+    for index in np.flatnonzero(crossed).tolist():
+        units[index].cross_tile(game_map, step_list[index])
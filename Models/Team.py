@@ -23,6 +23,9 @@ class Team:
         self.maximum_population = 0
         self.en_cours = {}
 
+        # Composition de l'équipe, tenue à jour par add_member / remove_member
+        # et par les entités elles-mêmes (Villager.task, Building.state)
+        self.reset_counts()
 
 
         for building, amount in difficulty_config[difficulty]['Buildings'].items():
@@ -38,6 +41,56 @@ class Team:
                     unit_instance = unit_class_map[unit](team=teamID)
                     self.add_member(unit_instance)
 
+    def reset_counts(self):
+        """Remet les compteurs de composition à zéro (aucun membre compté)."""
+        self.unit_counts = Counter()        # classe d'unité -> nombre
+        self.villager_tasks = Counter()     # tâche (None comprise) -> nombre de villageois
+        self.military_count = 0
+        self.building_counts = Counter()    # classe de bâtiment -> nombre
+        self.built_counts = Counter()       # classe de bâtiment -> nombre de bâtiments terminés
+        self.construction_count = 0
+        self.drop_point_count = 0           # points de dépôt terminés
+
+    def rebuild_counts(self):
+        """Recompte la composition depuis units et buildings (partie chargée)."""
+        self.reset_counts()
+        for entity in self.units:
+            entity._owner = self
+            self._count(entity, 1)
+        for entity in self.buildings:
+            entity._owner = self
+            self._count(entity, 1)
+
+    def _count(self, entity, sign):
+        if isinstance(entity, Building):
+            building_class = type(entity)
+            self.building_counts[building_class] += sign
+            if entity.isBuilt():
+                self.built_counts[building_class] += sign
+                if entity.resourceDropPoint:
+                    self.drop_point_count += sign
+            else:
+                self.construction_count += sign
+        else:
+            self.unit_counts[type(entity)] += sign
+            if isinstance(entity, Villager):
+                self.villager_tasks[entity.task] += sign
+            else:
+                self.military_count += sign
+
+    def task_changed(self, previous, task):
+        """Appelé par Villager quand la tâche d'un membre change."""
+        self.villager_tasks[previous] -= 1
+        self.villager_tasks[task] += 1
+
+    def construction_changed(self, building, built):
+        """Appelé par Building quand un membre entre en construction (built=False) ou en sort."""
+        sign = 1 if built else -1
+        self.built_counts[type(building)] += sign
+        self.construction_count -= sign
+        if building.resourceDropPoint:
+            self.drop_point_count += sign
+
     def add_member(self, entity):
         if entity.team == self.teamID :
             if entity in self.buildings or entity in self.units:
@@ -50,6 +103,8 @@ class Team:
 
                 self.buildings.add(entity)
                 self.maximum_population += entity.population
+                entity._owner = self
+                self._count(entity, 1)
                 return True
 
             elif isinstance(entity, Unit):
@@ -59,6 +114,8 @@ class Team:
 
                 self.units.add(entity)
                 self.population += 1
+                entity._owner = self
+                self._count(entity, 1)
                 return True
         return False
 
@@ -68,11 +125,15 @@ class Team:
                 if entity in self.buildings:
                     self.buildings.remove(entity)
                     self.maximum_population -= entity.population
+                    self._count(entity, -1)
+                    entity._owner = None
                     return True
             elif isinstance(entity, Unit):
                 if entity in self.units:
                     self.units.remove(entity)
                     self.population -= 1
+                    self._count(entity, -1)
+                    entity._owner = None
                     return True
         return False
 
@@ -47,7 +47,7 @@ class Arrow:
     def update(self, game_map, dt):
         self.seekMotion(dt)
         self.animator(dt)
-        self.seekImpact(dt)
+        self.seekImpact(game_map, dt)
 
     def animator(self, dt):
         if self.state:
@@ -89,10 +89,11 @@ class Arrow:
             if current_progress >= 1:
                 self.impact = True
 
-    def seekImpact(self, dt):
+    def seekImpact(self, game_map, dt):
         if self.impact and self.target:
             if self.impact_timer == 0:
                 self.target.hp -= self.attack_power
+                game_map.wake_entity(self.target)
             self.impact_timer += dt
 
             if self.impact_timer >= 2:
@@ -31,6 +31,10 @@ class GameConstants:
     resource_rate_per_sec: float = 25 / 60
     maximum_carry: int = 20
     dps: int = 2  # Decisions per second for bots
+    path_workers: int = 0  # Processus de recherche de chemin (0 : tout sur le thread du jeu)
+    bot_frame_budget: float = 0.008  # Temps de calcul des bots accordé par frame, en secondes (0 : pas de limite)
+    bot_workers: int = 0  # Processus de décision des bots (0 : tout sur le thread du jeu)
+    bot_max_lag: int = 30  # Frames au plus entre l'envoi d'un lot de décisions aux processus et son application
 
 
 @dataclass(frozen=True)
@@ -124,6 +128,10 @@ BUILDING_ZONE_OFFSET = GAME_CONSTANTS.building_zone_offset
 RESOURCE_RATE_PER_SEC = GAME_CONSTANTS.resource_rate_per_sec
 MAXIMUM_CARRY = GAME_CONSTANTS.maximum_carry
 DPS = GAME_CONSTANTS.dps
+PATH_WORKERS = GAME_CONSTANTS.path_workers
+BOT_FRAME_BUDGET = GAME_CONSTANTS.bot_frame_budget
+BOT_WORKERS = GAME_CONSTANTS.bot_workers
+BOT_MAX_LAG = GAME_CONSTANTS.bot_max_lag
 
 ALLOWED_ANGLES = list(UNIT_CONSTANTS.allowed_angles)
 UPDATE_EVERY_N_MILLISECOND = UNIT_CONSTANTS.update_every_n_millisecond
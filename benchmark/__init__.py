@@ -0,0 +1,25 @@
+"""
+Suite de benchmarks reproductibles.
+
+Mesure isolément et de bout en bout les chemins critiques du jeu
+(GameMap.patch, a_star, Bot.update, SpatialHash, save_map/load_map,
+draw_map) sur les sauvegardes livrées et sur des cartes générées, et
+écrit les résultats (médianes et percentiles) en JSON pour pouvoir
+comparer deux commits.
+
+Usage :
+    python -m benchmark --output avant.json
+    python -m benchmark --scenarios gen:200x200:8:marines --cases patch a_star --quick
+    python -m benchmark --compare avant.json apres.json
+"""
+import os
+
+# Pilotes SDL factices : draw_map est mesuré sans fenêtre réelle.
+# Le message d'accueil de pygame irait sur stdout et casserait la sortie JSON.
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+from benchmark.cases import CASES
+from benchmark.scenarios import DEFAULT_SCENARIOS, SHIPPED_SAVES, load_scenario
+from benchmark.runner import DEFAULT_CONFIG, QUICK_CONFIG, run_benchmarks, compare_results
@@ -0,0 +1,73 @@
+import argparse
+import contextlib
+import json
+import sys
+
+import Models.Map  # noqa: F401  (ordre d'import des entités)
+import Controller.Bot as bot_module
+from benchmark.cases import CASES
+from benchmark.scenarios import DEFAULT_SCENARIOS
+from benchmark.runner import DEFAULT_CONFIG, QUICK_CONFIG, run_benchmarks, compare_results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmark',
+                                     description="Benchmarks des chemins critiques du jeu (résultats JSON).")
+    parser.add_argument('--scenarios', nargs='+', default=DEFAULT_SCENARIOS,
+                        help="Sauvegardes livrées, fichiers .pkl ou cartes gen:LxH:joueurs:niveau[:gold]")
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--output', '-o', help="Fichier JSON de sortie (défaut: sortie standard)")
+    parser.add_argument('--seed', type=int, default=DEFAULT_CONFIG['seed'])
+    parser.add_argument('--quick', action='store_true', help="Moins d'itérations (vérification rapide)")
+    parser.add_argument('--set', nargs='+', default=[], metavar='CLE=VALEUR',
+                        help="Surcharge un paramètre, ex: --set ticks=500 paths=1000")
+    parser.add_argument('--compare', nargs=2, metavar=('REFERENCE', 'ACTUEL'),
+                        help="Compare les médianes de deux fichiers de résultats et quitte")
+    return parser.parse_args(argv)
+
+
+def print_comparison(rows):
+    print(f"{'Mesure':<60}{'Ref(ms)':>12}{'Actuel(ms)':>12}{'Ratio':>8}")
+    for name, reference, current, ratio in rows:
+        ref_text = f"{reference:.4f}" if reference is not None else '-'
+        cur_text = f"{current:.4f}" if current is not None else '-'
+        ratio_text = f"{ratio:.2f}" if ratio is not None else '-'
+        print(f"{name:<60}{ref_text:>12}{cur_text:>12}{ratio_text:>8}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        print_comparison(compare_results(baseline, current))
+        return 0
+
+    config = dict(QUICK_CONFIG) if args.quick else {}
+    config['seed'] = args.seed
+    for item in args.set:
+        key, _, value = item.partition('=')
+        if key not in DEFAULT_CONFIG:
+            raise SystemExit(f"Paramètre inconnu : {key} (parmi {', '.join(DEFAULT_CONFIG)})")
+        config[key] = json.loads(value)
+
+    bot_module.BOT_DEBUG = False
+    # Les print du jeu (chargement des sprites...) ne doivent pas se mêler au JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        document = run_benchmarks(args.scenarios, args.cases, config,
+                                  log=lambda message: print(message, file=sys.stderr))
+
+    text = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
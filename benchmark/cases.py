@@ -0,0 +1,260 @@
+"""
+Cas de benchmark : chaque fonction reçoit le nom d'un scénario et la
+configuration, construit sa propre partie (pour rester indépendante des
+autres cas) et retourne un dictionnaire de mesures sérialisable en JSON.
+"""
+import os
+import random
+import tempfile
+
+from Models.Map import GameMap
+from AiUtils.aStar import a_star, reset_search_stats, get_search_stats
+from Settings.setup import GAME_SPEED, DPS, FPS_DRAW_LIMITER, HALF_TILE_SIZE
+
+from benchmark.scenarios import load_scenario
+from benchmark.stats import summarize_samples, time_call, time_batches
+
+# Pas de temps d'une frame de jeu, comme dans game_loop à FPS_DRAW_LIMITER
+FRAME_DT = GAME_SPEED / FPS_DRAW_LIMITER
+
+
+def random_walkable_tiles(game_map, count, rng):
+    """Tire `count` cases praticables de la carte (tirage reproductible)."""
+    tiles = []
+    attempts = 0
+    while len(tiles) < count and attempts < count * 100:
+        attempts += 1
+        pos = (rng.randrange(game_map.num_tiles_x), rng.randrange(game_map.num_tiles_y))
+        if game_map.walkable_position(pos):
+            tiles.append(pos)
+    return tiles
+
+
+def warm_up(game_map, bots, ticks):
+    """Fait tourner la partie quelques ticks (bots compris) avant de mesurer."""
+    bot_timer = 0
+    for _ in range(ticks):
+        bot_timer += FRAME_DT
+        if bot_timer >= 1.0 / DPS:
+            for bot in bots:
+                bot.update(game_map, 1.0 / DPS)
+            bot_timer = 0
+        game_map.patch(FRAME_DT)
+
+
+def bench_patch(scenario, config):
+    """GameMap.patch seul : mise à jour de toutes les entités pour un tick."""
+    game_map, players, bots = load_scenario(scenario, config['seed'])
+    warm_up(game_map, bots, config['warmup'])
+    samples = []
+    for _ in range(config['ticks']):
+        elapsed, _ = time_call(game_map.patch, FRAME_DT)
+        samples.append(elapsed)
+    return summarize_samples(samples, active_entities=len(game_map.get_active_entities()))
+
+
+def bench_a_star(scenario, config):
+    """a_star entre paires de cases praticables tirées au hasard, cache vidé à chaque appel."""
+    game_map, players, bots = load_scenario(scenario, config['seed'])
+    rng = random.Random(config['seed'])
+    tiles = random_walkable_tiles(game_map, config['paths'] * 2, rng)
+    pairs = list(zip(tiles[::2], tiles[1::2]))
+
+    samples = []
+    found = 0
+    path_length = 0
+    reset_search_stats()
+    for start, goal in pairs:
+        game_map.path_cache.clear()
+        elapsed, path = time_call(a_star, start, goal, game_map)
+        samples.append(elapsed)
+        if path:
+            found += 1
+            path_length += len(path)
+    game_map.path_cache.clear()
+    stats = get_search_stats()
+    return summarize_samples(
+        samples,
+        paths_found=found,
+        mean_path_length=round(path_length / found, 2) if found else 0,
+        mean_expansions=round(stats['expansions'] / stats['searches'], 1) if stats['searches'] else 0,
+    )
+
+
+def bench_bot_update(scenario, config):
+    """Bot.update par bot, la partie avançant normalement entre deux décisions."""
+    game_map, players, bots = load_scenario(scenario, config['seed'])
+    warm_up(game_map, bots, config['warmup'])
+    ticks_per_decision = max(1, round((1.0 / DPS) / FRAME_DT))
+    samples = []
+    for _ in range(config['rounds']):
+        for bot in bots:
+            elapsed, _ = time_call(bot.update, game_map, 1.0 / DPS)
+            samples.append(elapsed)
+        for _ in range(ticks_per_decision):
+            game_map.patch(FRAME_DT)
+    return summarize_samples(samples, bots=len(bots))
+
+
+def bench_spatial_hash(scenario, config):
+    """Requêtes du SpatialHash : voisinage autour des unités et rectangle du viewport."""
+    game_map, players, bots = load_scenario(scenario, config['seed'])
+    rng = random.Random(config['seed'])
+    units = [unit for player in players for unit in player.units] or \
+        [entity for entity in game_map.get_active_entities()]
+    centers = [(unit.x, unit.y) for unit in units]
+    if not centers:
+        return {'skipped': 'aucune entité'}
+
+    queries = {'i': 0}
+
+    def nearby(radius):
+        def query():
+            x, y = centers[queries['i'] % len(centers)]
+            queries['i'] += 1
+            return game_map.get_entities_in_area(x, y, radius)
+        return query
+
+    # Rectangle de la taille d'un écran zoomé (environ 40x40 cases)
+    rects = []
+    for _ in range(64):
+        x = rng.randrange(max(1, game_map.num_tiles_x - 40))
+        y = rng.randrange(max(1, game_map.num_tiles_y - 40))
+        rects.append((x, y, x + 40, y + 40))
+
+    def in_rect():
+        rect = rects[queries['i'] % len(rects)]
+        queries['i'] += 1
+        return game_map.get_entities_in_rect(*rect)
+
+    def in_radius():
+        x, y = centers[queries['i'] % len(centers)]
+        queries['i'] += 1
+        return sum(1 for _ in game_map.iter_entities_in_radius(x, y, 10))
+
+    def nearest():
+        x, y = centers[queries['i'] % len(centers)]
+        queries['i'] += 1
+        return game_map.get_nearest_entities(x, y, 8)
+
+    def update():
+        unit = units[queries['i'] % len(units)]
+        queries['i'] += 1
+        game_map.spatial_hash.update(unit)
+
+    batches, batch_size = config['batches'], config['batch_size']
+    return {
+        'get_entities_in_area_r5': summarize_samples(time_batches(nearby(5), batches, batch_size)),
+        'get_entities_in_area_r20': summarize_samples(time_batches(nearby(20), batches, batch_size)),
+        'get_entities_in_rect_40': summarize_samples(time_batches(in_rect, batches, batch_size)),
+        'iter_entities_in_radius_10': summarize_samples(time_batches(in_radius, batches, batch_size)),
+        'get_nearest_entities_8': summarize_samples(time_batches(nearest, batches, batch_size)),
+        'update': summarize_samples(time_batches(update, batches, batch_size)),
+        'entities': len(game_map.spatial_hash.entity_cells),
+    }
+
+
+def bench_save_load(scenario, config):
+    """save_map puis load_map dans un dossier temporaire."""
+    game_map, players, bots = load_scenario(scenario, config['seed'])
+    save_samples = []
+    load_samples = []
+    size = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'bench.pkl')
+        for _ in range(config['repeat']):
+            elapsed, _ = time_call(game_map.save_map, path)
+            save_samples.append(elapsed)
+            size = os.path.getsize(path)
+            loaded = GameMap(0, 0, False, [], generate=False)
+            elapsed, _ = time_call(loaded.load_map, path)
+            load_samples.append(elapsed)
+    return {
+        'save_map': summarize_samples(save_samples),
+        'load_map': summarize_samples(load_samples),
+        'file_bytes': size,
+    }
+
+
+def bench_draw_map(scenario, config):
+    """draw_map sur le pilote vidéo factice de SDL, vue globale et vue zoomée."""
+    import pygame
+    from Controller.camera import Camera
+    from Controller.drawing import draw_map, generate_team_colors
+    from Controller.game_loop import create_game_state
+    from Controller.init_assets import load_sprites
+    from Controller.utils import compute_map_bounds
+
+    width, height = config['screen']
+    if not pygame.display.get_init():
+        pygame.init()
+    screen = pygame.display.set_mode((width, height))
+    load_sprites(screen, width, height)
+
+    game_map, players, bots = load_scenario(scenario, config['seed'])
+    camera = Camera(width, height)
+    min_iso_x, max_iso_x, min_iso_y, max_iso_y = compute_map_bounds(game_map)
+    camera.set_bounds(min_iso_x, max_iso_x, min_iso_y, max_iso_y)
+    camera.min_zoom = min(width / float(max_iso_x - min_iso_x), height / float(max_iso_y - min_iso_y))
+    team_colors = generate_team_colors(len(players))
+    game_state = create_game_state(screen, width, height, game_map, players, camera, team_colors, {})
+    game_map.set_game_state(game_state)
+
+    def frames():
+        samples = []
+        for _ in range(config['frames']):
+            screen.fill((0, 0, 0))
+            elapsed, _ = time_call(draw_map, screen, width, height, game_map, camera,
+                                   players, team_colors, game_state, 1.0 / FPS_DRAW_LIMITER)
+            samples.append(elapsed)
+        return samples
+
+    camera.zoom_out_to_global()
+    global_view = summarize_samples(frames())
+
+    # Vue zoomée centrée sur le premier bâtiment du premier joueur (ou le centre de la carte)
+    focus = next((b for p in players for b in p.buildings), None)
+    cx, cy = (focus.x, focus.y) if focus else (game_map.num_tiles_x / 2, game_map.num_tiles_y / 2)
+    camera.zoom = 1.0
+    camera.offset_x = -(cx - cy) * HALF_TILE_SIZE / 2
+    camera.offset_y = -(cx + cy) * HALF_TILE_SIZE / 4
+    camera.limit_camera()
+    zoomed_view = summarize_samples(frames())
+
+    return {'global': global_view, 'zoom_1': zoomed_view}
+
+
+def bench_end_to_end(scenario, config):
+    """Tick complet sans rendu : bots (toutes les 1/DPS secondes de jeu) puis patch."""
+    game_map, players, bots = load_scenario(scenario, config['seed'])
+    samples = []
+    bot_timer = 0
+    for _ in range(config['ticks']):
+        elapsed, _ = time_call(_full_tick, game_map, bots, bot_timer)
+        bot_timer = _next_bot_timer(bot_timer)
+        samples.append(elapsed)
+    total_s = sum(samples) / 1000
+    return summarize_samples(samples, ticks_per_s=round(len(samples) / total_s, 2) if total_s else None)
+
+
+def _next_bot_timer(bot_timer):
+    bot_timer += FRAME_DT
+    return 0 if bot_timer >= 1.0 / DPS else bot_timer
+
+
+def _full_tick(game_map, bots, bot_timer):
+    if bot_timer + FRAME_DT >= 1.0 / DPS:
+        for bot in bots:
+            bot.update(game_map, 1.0 / DPS)
+    game_map.patch(FRAME_DT)
+
+
+CASES = {
+    'patch': bench_patch,
+    'a_star': bench_a_star,
+    'bot_update': bench_bot_update,
+    'spatial_hash': bench_spatial_hash,
+    'save_load': bench_save_load,
+    'draw_map': bench_draw_map,
+    'end_to_end': bench_end_to_end,
+}
@@ -0,0 +1,111 @@
+"""
+Exécution des cas de benchmark sur une liste de scénarios et comparaison
+de deux fichiers de résultats JSON.
+"""
+import datetime
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from benchmark.cases import CASES
+
+DEFAULT_CONFIG = {
+    'seed': 0,
+    'warmup': 20,          # ticks simulés avant de mesurer patch / Bot.update
+    'ticks': 200,          # ticks mesurés pour patch et end_to_end
+    'rounds': 20,          # décisions de chaque bot mesurées
+    'paths': 200,          # appels a_star
+    'batches': 30,         # lots de requêtes SpatialHash
+    'batch_size': 200,     # requêtes par lot
+    'repeat': 5,           # aller-retours save_map / load_map
+    'frames': 30,          # frames draw_map par vue
+    'screen': (1280, 720),
+}
+
+QUICK_CONFIG = {
+    'warmup': 5,
+    'ticks': 30,
+    'rounds': 5,
+    'paths': 40,
+    'batches': 10,
+    'batch_size': 50,
+    'repeat': 2,
+    'frames': 5,
+}
+
+
+def git_revision():
+    """Commit courant (court) et état modifié du dépôt, si git est disponible."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root,
+                                  capture_output=True, text=True, timeout=10).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                               capture_output=True, text=True, timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None, None
+    return revision or None, bool(dirty)
+
+
+def run_benchmarks(scenarios, cases, config=None, log=None):
+    """
+    Lance chaque cas sur chaque scénario et retourne le document de résultats :
+        {'meta': {...}, 'results': {scénario: {cas: mesures}}}
+    Un cas qui lève une exception est enregistré avec son message d'erreur
+    plutôt que d'interrompre toute la série.
+    """
+    config = dict(DEFAULT_CONFIG, **(config or {}))
+    revision, dirty = git_revision()
+    document = {
+        'meta': {
+            'revision': revision,
+            'dirty': dirty,
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'config': config,
+        },
+        'results': {},
+    }
+
+    for scenario in scenarios:
+        scenario_results = document['results'].setdefault(scenario, {})
+        for case in cases:
+            if log:
+                log(f"{scenario} / {case}...")
+            start = time.perf_counter()
+            try:
+                scenario_results[case] = CASES[case](scenario, config)
+            except Exception as e:
+                scenario_results[case] = {'error': f"{type(e).__name__}: {e}"}
+            if log:
+                log(f"{scenario} / {case} : {time.perf_counter() - start:.1f}s")
+    return document
+
+
+def iter_medians(results, prefix=()):
+    """Parcourt récursivement les résultats et produit (chemin, médiane en ms)."""
+    for key, value in results.items():
+        if not isinstance(value, dict):
+            continue
+        if 'median_ms' in value:
+            yield prefix + (key,), value['median_ms']
+        else:
+            yield from iter_medians(value, prefix + (key,))
+
+
+def compare_results(baseline, current):
+    """
+    Compare les médianes de deux documents de résultats.
+    Retourne une liste de (chemin, médiane de référence, médiane actuelle, ratio).
+    Un ratio < 1 signifie que la version actuelle est plus rapide.
+    """
+    baseline_medians = dict(iter_medians(baseline.get('results', {})))
+    rows = []
+    for path, median in iter_medians(current.get('results', {})):
+        reference = baseline_medians.get(path)
+        ratio = median / reference if reference and median is not None else None
+        rows.append(('/'.join(path), reference, median, ratio))
+    return rows
@@ -0,0 +1,52 @@
+"""
+Scénarios de benchmark : sauvegardes livrées dans saves/ et cartes générées.
+
+Un scénario est désigné par un nom :
+    25joueurs_carre                      -> saves/25joueurs_carre.pkl
+    or_centre_rectangle_2joueurs         -> saves/or_centre_rectangle_2joueurs.pkl
+    chemin/vers/partie.pkl               -> sauvegarde quelconque
+    gen:120x120:4:marines[:gold]         -> carte générée (largeur x hauteur, joueurs, niveau)
+"""
+import os
+import random
+
+from headless import prepare_game
+
+SAVES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'saves')
+
+SHIPPED_SAVES = {
+    '25joueurs_carre': os.path.join(SAVES_DIR, '25joueurs_carre.pkl'),
+    'or_centre_rectangle_2joueurs': os.path.join(SAVES_DIR, 'or_centre_rectangle_2joueurs.pkl'),
+}
+
+DEFAULT_SCENARIOS = list(SHIPPED_SAVES) + ['gen:120x120:4:marines']
+
+
+def parse_generated(name):
+    """Décode 'gen:LxH:joueurs:niveau[:gold]' en paramètres de prepare_game."""
+    parts = name.split(':')
+    if len(parts) < 4 or parts[0] != 'gen':
+        raise ValueError(f"Scénario invalide : {name} (attendu une sauvegarde ou gen:LxH:joueurs:niveau[:gold])")
+    width, height = (int(v) for v in parts[1].lower().split('x'))
+    return {
+        'width': width,
+        'height': height,
+        'bots': int(parts[2]),
+        'level': parts[3],
+        'gold_center': len(parts) > 4 and parts[4] == 'gold',
+    }
+
+
+def load_scenario(name, seed=0):
+    """
+    Construit une partie neuve pour le scénario : (game_map, players, bots).
+    Le générateur aléatoire est réinitialisé avec `seed` avant et après la
+    construction pour que deux appels produisent exactement la même partie.
+    """
+    random.seed(seed)
+    if name in SHIPPED_SAVES or name.endswith('.pkl'):
+        game = prepare_game(load=SHIPPED_SAVES.get(name, name))
+    else:
+        game = prepare_game(**parse_generated(name))
+    random.seed(seed)
+    return game
@@ -0,0 +1,69 @@
+"""
+Mesure et agrégation des temps pour les benchmarks.
+
+Tous les temps sont exprimés en millisecondes.
+"""
+import math
+import statistics
+import time
+
+
+def percentile(sorted_samples, pct):
+    """Percentile par interpolation linéaire sur un échantillon déjà trié."""
+    if not sorted_samples:
+        return None
+    if len(sorted_samples) == 1:
+        return sorted_samples[0]
+    rank = (len(sorted_samples) - 1) * pct / 100.0
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    if low == high:
+        return sorted_samples[low]
+    return sorted_samples[low] + (sorted_samples[high] - sorted_samples[low]) * (rank - low)
+
+
+def summarize_samples(samples, **extra):
+    """
+    Résume une liste de temps (ms) : médiane, percentiles, min/max, moyenne.
+    Les paramètres nommés supplémentaires sont ajoutés tels quels au résultat.
+    """
+    ordered = sorted(samples)
+    summary = {
+        'count': len(ordered),
+        'median_ms': percentile(ordered, 50),
+        'p90_ms': percentile(ordered, 90),
+        'p95_ms': percentile(ordered, 95),
+        'p99_ms': percentile(ordered, 99),
+        'min_ms': ordered[0] if ordered else None,
+        'max_ms': ordered[-1] if ordered else None,
+        'mean_ms': statistics.fmean(ordered) if ordered else None,
+        'stdev_ms': statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        'total_ms': sum(ordered),
+    }
+    for key, value in summary.items():
+        if isinstance(value, float):
+            summary[key] = round(value, 6)
+    summary.update(extra)
+    return summary
+
+
+def time_call(func, *args, **kwargs):
+    """Exécute func une fois et retourne (durée en ms, résultat)."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def time_batches(func, batches, batch_size):
+    """
+    Chronomètre `batches` lots de `batch_size` appels à func() et retourne
+    le temps moyen par appel de chaque lot. Utile pour les opérations de
+    l'ordre de la microseconde où perf_counter seul serait trop bruité.
+    """
+    samples = []
+    for _ in range(batches):
+        start = time.perf_counter()
+        for _ in range(batch_size):
+            func()
+        samples.append((time.perf_counter() - start) * 1000 / batch_size)
+    return samples
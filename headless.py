@@ -0,0 +1,215 @@
+"""
+Simulation sans affichage (ni fenêtre pygame, ni curses).
+
+Fait tourner une partie bot contre bot à pas de temps fixe, sans limite
+de FPS, puis affiche le nombre de ticks par seconde et l'état final.
+
+Exemples :
+    python -m headless --width 120 --height 120 --bots 4 --level marines --ticks 2000
+    python -m headless --load saves/25joueurs_carre.pkl --ticks 500 --json
+    python -m headless --load saves/25joueurs_carre.pkl --ticks 500 --path-workers 4
+"""
+import os
+
+# Pilotes SDL factices : aucun affichage ni son n'est ouvert
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from Models.Map import GameMap
+from Controller.init_player import init_players
+from Controller.game_loop import create_bots, is_player_dead
+from Controller.bot_scheduler import BotScheduler
+import Controller.Bot as bot_module
+from Settings.setup import GAME_SPEED, FPS_DRAW_LIMITER, PATH_WORKERS, BOT_FRAME_BUDGET, BOT_WORKERS, VALID_LEVELS, VALID_BOT_MODES
+
+
+def create_headless_game_state(game_map, players):
+    """Crée un game_state minimal (sans éléments GUI) pour la simulation."""
+    return {
+        'game_map': game_map,
+        'players': players,
+        'selected_player': players[0] if players else None,
+        'paused': False,
+        'player_info_updated': False,
+        'players_target': [None for _ in range(len(players))],
+        'old_resources': {p.teamID: p.resources.copy() for p in players},
+    }
+
+
+def prepare_game(load=None, width=120, height=120, bots=2, level='lean', gold_center=False, bot_modes=None):
+    """
+    Construit la carte, les joueurs et les bots depuis une sauvegarde (load)
+    ou à partir des paramètres de génération. Retourne (game_map, players, bots).
+    """
+    if load:
+        game_map = GameMap(0, 0, False, [], generate=False)
+        game_map.load_map(load)
+        players = game_map.players
+        if not game_map.game_state:
+            game_map.set_game_state(create_headless_game_state(game_map, players))
+        else:
+            game_map.game_state['game_map'] = game_map
+            game_map.game_state['players'] = players
+            game_map.game_state['paused'] = False
+            game_map.game_state.setdefault('player_info_updated', False)
+        bot_modes = bot_modes or game_map.game_state.get('bot_modes')
+    else:
+        players = init_players(bots, level)
+        game_map = GameMap(width, height, gold_center, players)
+        game_map.set_game_state(create_headless_game_state(game_map, players))
+
+    bots, bot_modes = create_bots(players, game_map, list(bot_modes) if bot_modes else None)
+    game_map.game_state['bot_modes'] = bot_modes
+    return game_map, players, bots
+
+
+def build_game(args):
+    """Construit la partie à partir des arguments de la ligne de commande."""
+    return prepare_game(args.load, args.width, args.height, args.bots, args.level,
+                        args.gold_center, args.bot_modes)
+
+
+def run_simulation(game_map, players, bots, ticks, frame_time, bot_budget=BOT_FRAME_BUDGET, bot_workers=BOT_WORKERS):
+    """
+    Boucle à pas fixe : mêmes règles que game_loop (dt multiplié par GAME_SPEED,
+    bots étalés par BotScheduler) mais sans clock.tick ni rendu. Les lots de
+    décisions confiés aux processus sont attendus dès la frame qui suit leur
+    envoi : la simulation n'avance pas plus vite que les bots ne décident.
+    Retourne (ticks effectués, durée réelle, id du gagnant ou None, ordonnanceur des bots).
+    """
+    dt = frame_time * GAME_SPEED
+    bot_scheduler = BotScheduler(bots, budget=bot_budget, processes=bot_workers, max_lag=0)
+    alive_players = list(players)
+    winner = None
+
+    start = time.perf_counter()
+    tick = 0
+    try:
+        while tick < ticks:
+            bot_scheduler.update(game_map, dt)
+            game_map.patch(dt)
+            tick += 1
+
+            for p in alive_players[:]:
+                if is_player_dead(p):
+                    alive_players.remove(p)
+            if len(alive_players) <= 1 and len(players) > 1:
+                winner = alive_players[0].teamID if alive_players else None
+                break
+    finally:
+        bot_scheduler.close()
+
+    elapsed = time.perf_counter() - start
+    return tick, elapsed, winner, bot_scheduler
+
+
+def summarize(game_map, players, ticks, elapsed, winner, bot_scheduler=None):
+    """Résumé de fin de partie sous forme de dictionnaire sérialisable."""
+    summary = {
+        'map': [game_map.num_tiles_x, game_map.num_tiles_y],
+        'ticks': ticks,
+        'elapsed_s': round(elapsed, 4),
+        'ticks_per_s': round(ticks / elapsed, 2) if elapsed > 0 else None,
+        'winner': winner,
+        'teams': [
+            {
+                'team': p.teamID,
+                'units': len(p.units),
+                'buildings': len(p.buildings),
+                'population': p.population,
+                'maximum_population': p.maximum_population,
+                'food': p.resources.food,
+                'wood': p.resources.wood,
+                'gold': p.resources.gold,
+            }
+            for p in players
+        ],
+    }
+    if bot_scheduler is not None:
+        bots = bot_scheduler.get_stats()
+        summary['bots'] = {
+            'updates': bots['updates'],
+            'carried_over': bots['carried_over'],
+            'max_delay_s': round(bots['max_delay'], 4),
+            'max_delay_frames': bots['max_delay_frames'],
+            'max_staleness_s': round(bots['max_staleness'], 4),
+            'max_frame_ms': round(bots['max_frame_time'] * 1000, 3),
+            'over_budget_frames': bots['over_budget'],
+            'max_snapshot_ms': round(bots['max_snapshot_time'] * 1000, 3),
+        }
+    return summary
+
+
+def print_summary(summary):
+    print(f"Carte {summary['map'][0]}x{summary['map'][1]} - {summary['ticks']} ticks en {summary['elapsed_s']:.2f}s "
+          f"({summary['ticks_per_s']} ticks/s)")
+    if summary['winner'] is not None:
+        print(f"Joueur {summary['winner']} est gagnant!")
+    if 'bots' in summary:
+        bots = summary['bots']
+        print(f"Bots : {bots['updates']} décisions, retard max {bots['max_delay_frames']} frames "
+              f"({bots['max_delay_s']}s de jeu), "
+              f"frame bots max {bots['max_frame_ms']} ms, {bots['over_budget_frames']} frames hors budget "
+              f"(instantané max {bots['max_snapshot_ms']} ms)")
+    print(f"{'Equipe':<8}{'Unites':>8}{'Batiments':>11}{'Pop':>10}{'Food':>8}{'Wood':>8}{'Gold':>8}")
+    for team in summary['teams']:
+        pop = f"{team['population']}/{team['maximum_population']}"
+        print(f"{team['team']:<8}{team['units']:>8}{team['buildings']:>11}{pop:>10}"
+              f"{team['food']:>8}{team['wood']:>8}{team['gold']:>8}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulation bot contre bot sans affichage.")
+    parser.add_argument('--load', help="Sauvegarde .pkl à charger (ignore les paramètres de carte)")
+    parser.add_argument('--width', type=int, default=120)
+    parser.add_argument('--height', type=int, default=120)
+    parser.add_argument('--bots', type=int, default=2)
+    parser.add_argument('--level', choices=VALID_LEVELS, default='lean')
+    parser.add_argument('--gold-center', action='store_true')
+    parser.add_argument('--bot-modes', nargs='+', choices=VALID_BOT_MODES,
+                        help="Mode IA de chaque bot (défaut: economique)")
+    parser.add_argument('--ticks', type=int, default=1000, help="Nombre maximum de ticks simulés")
+    parser.add_argument('--frame-time', type=float, default=1.0 / FPS_DRAW_LIMITER,
+                        help="Durée réelle simulée par tick en secondes (défaut: 1/FPS_DRAW_LIMITER)")
+    parser.add_argument('--path-workers', type=int, default=PATH_WORKERS,
+                        help="Processus de recherche de chemin (défaut: PATH_WORKERS, 0 = aucun)")
+    parser.add_argument('--bot-budget', type=float, default=BOT_FRAME_BUDGET,
+                        help="Temps de calcul des bots par tick en secondes (défaut: BOT_FRAME_BUDGET, 0 = sans limite)")
+    parser.add_argument('--bot-workers', type=int, default=BOT_WORKERS,
+                        help="Processus de décision des bots (défaut: BOT_WORKERS, 0 = aucun)")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help="Affiche le résumé en JSON")
+    parser.add_argument('--verbose', action='store_true', help="Garde les logs de debug des bots")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+    bot_module.BOT_DEBUG = args.verbose
+
+    game_map, players, bots = build_game(args)
+    game_map.enable_path_workers(args.path_workers)
+    try:
+        ticks, elapsed, winner, bot_scheduler = run_simulation(game_map, players, bots, args.ticks,
+                                                               args.frame_time, args.bot_budget, args.bot_workers)
+    finally:
+        game_map.enable_path_workers(0)
+    summary = summarize(game_map, players, ticks, elapsed, winner, bot_scheduler)
+
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        print_summary(summary)
+    return summary
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
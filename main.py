@@ -15,7 +15,7 @@ from Controller.init_map import init_pygame, game_loop
 from Models.Map import GameMap
 from Controller.init_player import init_players
 from Controller.init_assets import load_sprites, ASSETS_LOADED, get_assets_progress, is_assets_loaded
-from Settings.setup import SAVE_DIRECTORY
+from Settings.setup import SAVE_DIRECTORY, PATH_WORKERS
 from Controller.gui import (
     run_gui_menu,
     user_choices,
@@ -431,6 +431,8 @@ def main():
         else:
             players = init_players(nb_bots, bot_level)
             game_map = GameMap(grid_w, grid_h, gold_c, players)
+        if PATH_WORKERS and not game_map.path_workers:
+            game_map.enable_path_workers(PATH_WORKERS)
 
         t_curses_started = False
         if mode_index in [1, 2]: